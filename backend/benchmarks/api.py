@@ -0,0 +1,581 @@
+"""
+Latency and throughput benchmark for every route in routers/.
+
+Boots the API against a freshly migrated and seeded database, stubs the
+classifier, and drives each scenario at several concurrency levels.
+Results are written as JSON so runs from two commits can be compared:
+
+    python -m backend.benchmarks.api --products 20000 --concurrency 1,8,32 --output new.json
+    python -m backend.benchmarks.api --compare old.json new.json --threshold 10
+
+Login latency against a large user table (seeded users can't log in; a few
+extra users with real keys do, and login_first gives each request a key gpg
+hasn't imported yet):
+
+    python -m backend.benchmarks.api --users 100000 --scenarios login,login_first
+
+By default the database is a temporary SQLite file. --database-url can point
+at a throwaway PostgreSQL database instead; it is migrated and filled, and
+the run refuses to start if it already holds products. Run from the
+repository root.
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Scenario:
+    """
+    One request type: ``call(client, rng)`` sends one request
+    """
+
+    def __init__(
+        self,
+        name: str,
+        route: str,
+        call: Callable[..., Awaitable],
+        expected: Sequence[int] = (200,),
+        limit: Optional[int] = None
+    ):
+        self.name = name
+        self.route = route
+        self.call = call
+        self.expected = set(expected)
+        # Requests this scenario can make per level at most (e.g. one per fresh key)
+        self.limit = limit
+
+def build_scenarios(context: Dict, register_requests: int, first_login_requests: int) -> List[Scenario]:
+    from .seed import CATEGORIES, WORDS
+
+    product_ids = context["product_ids"]
+    image_ids = context["image_product_ids"]
+    user_keys = context["user_keys"]
+    register_keys = context["register_keys"]
+    first_login_keys = context["first_login_keys"]
+    image = context["image"]
+    deep_offset = context["deep_offset"]
+    deep_cursor = context["deep_cursor"]
+
+    def form(rng: random.Random) -> Dict[str, str]:
+        return {
+            "name": " ".join(rng.choices(WORDS, k=3)),
+            "description": " ".join(rng.choices(WORDS, k=20)),
+            "price": f"{rng.uniform(1, 500):.2f}"
+        }
+
+    scenarios = [
+        Scenario(
+            "list_products", "GET /api/products/",
+            lambda c, rng: c.get("/api/products/", params={"limit": 20})
+        ),
+        Scenario(
+            "list_products_sync_db", "GET /bench/products/sync",
+            lambda c, rng: c.get("/bench/products/sync", params={"limit": 20})
+        ),
+        # The same deep page reached by OFFSET and by the cursor of the row before it
+        Scenario(
+            "list_products_offset_deep", "GET /api/products/",
+            lambda c, rng: c.get("/api/products/", params={"limit": 20, "skip": deep_offset})
+        ),
+        Scenario(
+            "list_products_cursor_deep", "GET /api/products/",
+            lambda c, rng: c.get("/api/products/", params={"limit": 20, "cursor": deep_cursor})
+        ),
+        Scenario(
+            "list_products_filtered", "GET /api/products/",
+            lambda c, rng: c.get("/api/products/", params={
+                "limit": 20,
+                "category": rng.choice(CATEGORIES),
+                "min_price": 10,
+                "max_price": 200,
+                "sort_by": "price",
+                "order": "asc"
+            })
+        ),
+        Scenario(
+            "search_products", "GET /api/products/search",
+            lambda c, rng: c.get("/api/products/search", params={"q": " ".join(rng.choices(WORDS, k=2))})
+        ),
+        Scenario(
+            "product_facets", "GET /api/products/facets",
+            lambda c, rng: c.get("/api/products/facets", params={"category": rng.choice(CATEGORIES)})
+        ),
+        Scenario(
+            "get_product", "GET /api/products/{product_id}",
+            lambda c, rng: c.get(f"/api/products/{rng.choice(product_ids)}")
+        ),
+        Scenario(
+            "list_reviews", "GET /api/comments/product/{product_id}",
+            lambda c, rng: c.get(f"/api/comments/product/{rng.choice(product_ids)}")
+        ),
+        Scenario(
+            "create_review", "POST /api/comments/",
+            lambda c, rng: c.post("/api/comments/", json={
+                "product_id": rng.choice(product_ids),
+                "rating": rng.randint(1, 5),
+                "comment": " ".join(rng.choices(WORDS, k=8))
+            })
+        ),
+        Scenario(
+            "create_product", "POST /api/products/",
+            lambda c, rng: c.post("/api/products/", data=form(rng))
+        ),
+        Scenario(
+            "create_product_image", "POST /api/products/",
+            lambda c, rng: c.post(
+                "/api/products/",
+                data=form(rng),
+                files={"image": ("photo.jpg", image, "image/jpeg")}
+            )
+        ),
+        Scenario(
+            "login", "POST /api/auth/login",
+            lambda c, rng: c.post("/api/auth/login", params={"pgp_key": rng.choice(user_keys)})
+        ),
+    ]
+    if image_ids:
+        scenarios.append(Scenario(
+            "get_image", "GET /api/products/{product_id}/image",
+            lambda c, rng: c.get(
+                f"/api/products/{rng.choice(image_ids)}/image",
+                params={"variant": rng.choice(["thumbnail", "card", "full"])}
+            )
+        ))
+    if first_login_keys:
+        # A key's first login has gpg import it; later ones hit the fingerprint cache
+        fresh = iter(first_login_keys)
+        scenarios.append(Scenario(
+            "login_first", "POST /api/auth/login",
+            lambda c, rng: c.post("/api/auth/login", params={"pgp_key": next(fresh)}),
+            limit=first_login_requests
+        ))
+    if register_keys:
+        # Every registration needs a key gpg hasn't seen; hand them out in order
+        keys = iter(register_keys)
+        scenarios.append(Scenario(
+            "register", "POST /api/auth/register",
+            lambda c, rng: c.post("/api/auth/register", json={"pgp_key": next(keys), "is_seller": False}),
+            limit=register_requests
+        ))
+    return scenarios
+
+def deep_page(offset: int) -> Tuple[int, Optional[str]]:
+    """
+    The listing offset to benchmark, clipped to the published products, and
+    the cursor that reaches the same page
+    """
+    from sqlalchemy import func, select
+    from ..config import SessionLocal
+    from ..models import Product
+    from ..utils.pagination import encode_cursor
+
+    db = SessionLocal()
+    try:
+        published = select(Product).where(Product.status == "published")
+        total = db.execute(select(func.count()).select_from(published.subquery())).scalar()
+        offset = max(0, min(offset, total - 20))
+        if not offset:
+            return 0, None
+        # The row just before the page: the last row of the previous page
+        previous = db.execute(
+            published.order_by(Product.created_at.desc(), Product.id.desc()).offset(offset - 1).limit(1)
+        ).scalar_one()
+        return offset, encode_cursor(previous.created_at, previous.id)
+    finally:
+        db.close()
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+async def run_level(client, scenario: Scenario, concurrency: int, requests: int, seed: int) -> Dict:
+    """
+    Send ``requests`` requests from ``concurrency`` concurrent clients
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = itertools.count()
+
+    async def worker(n: int):
+        rng = random.Random(seed * 1000 + n)
+        while next(counter) < requests:
+            start = time.perf_counter()
+            try:
+                response = await scenario.call(client, rng)
+                status = response.status_code
+            except Exception as e:
+                logger.debug(f"{scenario.name} request failed: {e}")
+                status = "exception"
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(n) for n in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status not in scenario.expected)
+    return {
+        "scenario": scenario.name,
+        "route": scenario.route,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p90": round(percentile(latencies, 0.90) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else None
+        }
+    }
+
+def sync_db_router():
+    """
+    GET /api/products/ (first page, uncached) as it ran before the async
+    database layer: the same query through a synchronous session inside the
+    async endpoint, blocking the event loop for each round trip. Compare
+    list_products_sync_db with list_products under --response-cache off.
+    """
+    from fastapi import APIRouter, Depends, Request
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+    from ..config import get_db
+    from ..models import Product
+    from ..routers import products
+    from ..utils.pagination import paginate
+
+    router = APIRouter()
+
+    @router.get("/products/sync", response_model=List[products.ProductResponse])
+    async def list_products_sync(request: Request, limit: int = 10, db: Session = Depends(get_db)):
+        query = select(Product).where(Product.status == "published")
+        rows = db.execute(paginate(query, Product.created_at, Product.id, limit, descending=True)).scalars().all()
+        return [products._product_response(request, product, "thumbnail") for product in rows]
+
+    return router
+
+def create_app():
+    """
+    The application as main.py assembles it, without the Tor/startup hooks,
+    plus the /bench baseline routes
+    """
+    from fastapi import FastAPI
+    from ..routers import auth, comments, products
+    from ..services.admission import AdmissionMiddleware
+    from ..utils.metrics import MetricsMiddleware
+
+    app = FastAPI(title="Zuno Marketplace API (benchmark)")
+    app.add_middleware(AdmissionMiddleware, routes=app.routes, identify=auth.client_id_for_token)
+    app.add_middleware(MetricsMiddleware, routes=app.routes)
+    app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
+    app.include_router(products.router, prefix="/api/products", tags=["Products"])
+    app.include_router(comments.router, prefix="/api/comments", tags=["Comments"])
+    app.include_router(sync_db_router(), prefix="/bench")
+    return app
+
+def stub_classifier(delay_ms: float):
+    """
+    Replace model inference with a fixed-cost stand-in so results measure
+    the API rather than whichever models happen to be downloaded
+    """
+    from ..services.ai_classifier import classifier
+    from .seed import CATEGORIES
+
+    def screen(descriptions: List[str]) -> Tuple[List[Dict], List[bool]]:
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        results = [
+            {"category": CATEGORIES[len(d) % len(CATEGORIES)], "confidence": 0.9, "flags": [], "is_safe": True}
+            for d in descriptions
+        ]
+        return results, [True] * len(descriptions)
+
+    classifier._screen = screen
+
+class _Server:
+    """uvicorn serving the app on a loopback port from a background thread"""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.05)
+        return f"http://127.0.0.1:{self.port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+async def run_benchmarks(args, context: Dict) -> List[Dict]:
+    import httpx
+    from ..services.search_index import search_backend
+
+    await search_backend.rebuild()
+    app = create_app()
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2, max_keepalive_connections=max(args.concurrency) * 2)
+
+    async def drive(client) -> List[Dict]:
+        results = []
+        for scenario in build_scenarios(context, args.register_requests, args.first_login_requests):
+            if args.scenarios and scenario.name not in args.scenarios:
+                continue
+            if scenario.limit is None and args.warmup:
+                await run_level(client, scenario, 1, args.warmup, args.seed)
+            for concurrency in args.concurrency:
+                requests = args.requests if scenario.limit is None else min(args.requests, scenario.limit)
+                result = await run_level(client, scenario, concurrency, requests, args.seed)
+                results.append(result)
+                latency = result["latency_ms"]
+                print(
+                    f"{scenario.name:<24} c={concurrency:<4} {result['throughput_rps']:>9.1f} req/s  "
+                    f"p50 {latency['p50']:>8.2f}ms  p99 {latency['p99']:>8.2f}ms  errors {result['errors']}",
+                    file=sys.stderr
+                )
+        return results
+
+    if args.transport == "http":
+        with _Server(app, args.port) as base_url:
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+                return await drive(client)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+        return await drive(client)
+
+def _git_revision() -> Dict:
+    def git(*command) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *command], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+def _prepare_environment(args, work_dir: str):
+    """
+    Point the application settings at the benchmark database and scratch
+    directories. Must run before anything under backend/ is imported.
+    """
+    uploads = os.path.join(work_dir, "uploads")
+    gpg_home = os.path.join(work_dir, "gpghome")
+    os.makedirs(gpg_home, mode=0o700)
+    os.environ.update({
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+        "UPLOAD_DIR": uploads,
+        "AI_MODEL_CACHE_DIR": os.path.join(work_dir, "models"),
+        "PGP_HOME_DIR": gpg_home,
+        "ENCRYPTION_KEY": base64.urlsafe_b64encode(os.urandom(32)).decode(),
+        "AI_WARM_ON_STARTUP": "false",
+        "MODERATION_WORKERS": "0",
+        "CLASSIFICATION_CACHE_PERSIST": "false",
+        "RESPONSE_CACHE_BACKEND": args.response_cache,
+        "PROFILER_ENABLED": "false"
+    })
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+def _migrate(database_url: str):
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BACKEND_DIR, check=True)
+
+    from sqlalchemy import func, select
+    from ..config import SessionLocal
+    from ..models import Product
+
+    db = SessionLocal()
+    try:
+        existing = db.scalar(select(func.count(Product.id)))
+    finally:
+        db.close()
+    if existing:
+        raise SystemExit(f"{database_url} already holds {existing} products; use a throwaway database")
+
+def run(args) -> Dict:
+    work_dir = tempfile.mkdtemp(prefix="zuno-bench-")
+    try:
+        _prepare_environment(args, work_dir)
+        _migrate(os.environ["DATABASE_URL"])
+
+        from .seed import generate_pgp_keys, sample_jpeg, seed_database
+        from ..services.image_pipeline import image_pipeline
+
+        # Seeded users hold keys gpg would reject; these real keys can log in
+        login_keys = generate_pgp_keys(args.login_keys, tempfile.mkdtemp(dir=work_dir))
+        first_login_keys = {}
+        if args.first_login_requests and (not args.scenarios or "login_first" in args.scenarios):
+            # One never-seen key per first login at every concurrency level
+            first_login_keys = generate_pgp_keys(
+                args.first_login_requests * len(args.concurrency),
+                tempfile.mkdtemp(dir=work_dir)
+            )
+
+        started = time.perf_counter()
+        context = seed_database(
+            args.users, args.products, args.reviews_per_product, args.image_ratio, args.seed,
+            login_keys={**login_keys, **first_login_keys}
+        )
+        seed_seconds = time.perf_counter() - started
+        context["user_keys"] = list(login_keys)
+        context["first_login_keys"] = list(first_login_keys)
+
+        register_keys = []
+        if args.register_requests and (not args.scenarios or "register" in args.scenarios):
+            # One fresh key per registration at every concurrency level
+            register_keys = list(generate_pgp_keys(
+                args.register_requests * len(args.concurrency),
+                tempfile.mkdtemp(dir=work_dir)
+            ))
+        context["register_keys"] = register_keys
+        context["image"] = sample_jpeg(1200)
+        context["deep_offset"], context["deep_cursor"] = deep_page(args.deep_offset)
+
+        stub_classifier(args.classifier_ms)
+        try:
+            results = asyncio.run(run_benchmarks(args, context))
+        finally:
+            image_pipeline.shutdown()
+
+        from sqlalchemy.engine import make_url
+
+        return {
+            "meta": {
+                "started_at": datetime.utcnow().isoformat(),
+                "git": _git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "database": make_url(os.environ["DATABASE_URL"]).get_backend_name(),
+                "transport": args.transport,
+                "response_cache": args.response_cache,
+                "classifier_ms": args.classifier_ms,
+                "scale": {
+                    "users": args.users,
+                    "products": args.products,
+                    "reviews_per_product": args.reviews_per_product,
+                    "image_ratio": args.image_ratio,
+                    "seed": args.seed
+                },
+                "deep_offset": context["deep_offset"],
+                "seed_seconds": round(seed_seconds, 2)
+            },
+            "results": results
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> int:
+    """
+    Print per scenario/concurrency changes and return the number of
+    regressions (p99 latency up or throughput down by more than ``threshold`` percent)
+    """
+    def load(path: str) -> Dict[Tuple[str, int], Dict]:
+        with open(path) as f:
+            return {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    def change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+        if not old or new is None:
+            return None
+        return (new - old) / old * 100
+
+    baseline, current = load(baseline_path), load(current_path)
+    regressions = 0
+    print(f"{'scenario':<24} {'c':>4} {'p50 ms':>18} {'p99 ms':>18} {'req/s':>20}")
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key], current[key]
+        p50 = change(old["latency_ms"]["p50"], new["latency_ms"]["p50"])
+        p99 = change(old["latency_ms"]["p99"], new["latency_ms"]["p99"])
+        rps = change(old["throughput_rps"], new["throughput_rps"])
+        regressed = (p99 is not None and p99 > threshold) or (rps is not None and rps < -threshold)
+        regressions += regressed
+
+        def cell(value: Optional[float], delta: Optional[float]) -> str:
+            return f"{value:.2f} ({delta:+.0f}%)" if delta is not None else f"{value}"
+
+        print(
+            f"{key[0]:<24} {key[1]:>4} {cell(new['latency_ms']['p50'], p50):>18} "
+            f"{cell(new['latency_ms']['p99'], p99):>18} {cell(new['throughput_rps'], rps):>20}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    for key in sorted(baseline.keys() ^ current.keys()):
+        print(f"{key[0]:<24} {key[1]:>4} only in {'baseline' if key in baseline else 'current'}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark every API route against a seeded database")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent for --compare")
+    parser.add_argument("--database-url", help="Throwaway database to use instead of a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--reviews-per-product", type=float, default=3.0)
+    parser.add_argument("--image-ratio", type=float, default=0.2, help="Share of seeded products with an image")
+    parser.add_argument("--deep-offset", type=int, default=100000,
+                        help="Listing offset for the deep-page scenarios (clipped to the published products)")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario and concurrency level")
+    parser.add_argument("--register-requests", type=int, default=10, help="Registrations per level (each needs a new gpg key)")
+    parser.add_argument("--login-keys", type=int, default=20, help="Seeded users with real keys for the login scenario")
+    parser.add_argument("--first-login-requests", type=int, default=10,
+                        help="First logins per level (each needs a new gpg key)")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenarios", help="Comma-separated subset of scenarios to run")
+    parser.add_argument("--classifier-ms", type=float, default=0.0, help="Simulated inference time per batch")
+    parser.add_argument("--response-cache", choices=["memory", "off"], default="memory")
+    parser.add_argument("--transport", choices=["asgi", "http"], default="asgi",
+                        help="asgi calls the app in-process; http serves it with uvicorn on --port")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    args.concurrency = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    args.scenarios = {name.strip() for name in args.scenarios.split(",")} if args.scenarios else None
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+PGP messages encrypted per second: one gpg keyring that imports the
+recipient's key on every call (the behaviour before the engine pool), then
+the pool sending one message at a time and in batches across its engines:
+
+    python -m backend.benchmarks.encryption --recipients 20 --messages 200 --pool-sizes 1,2,4
+
+Recipient keys are generated for the run (small RSA keys, so gpg's own
+work per message is a lower bound). Run from the repository root.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MESSAGE = "Your order has shipped. Tracking details are in your account."
+
+def _rate(messages: int, send: Callable[[], None]) -> Dict:
+    start = time.perf_counter()
+    send()
+    seconds = time.perf_counter() - start
+    return {"messages": messages, "seconds": round(seconds, 3), "messages_per_second": round(messages / seconds, 1)}
+
+def unpooled(recipients: List[str], home: str) -> Callable[[], None]:
+    """One shared keyring; every message imports its recipient's key first"""
+    import gnupg
+
+    gpg = gnupg.GPG(gnupghome=home)
+
+    def send():
+        for key in recipients:
+            fingerprint = gpg.import_keys(key).fingerprints[0]
+            if not gpg.encrypt(MESSAGE, fingerprint, always_trust=True).ok:
+                raise RuntimeError("gpg failed to encrypt")
+    return send
+
+def run(args) -> Dict:
+    from .seed import generate_pgp_keys
+    from ..utils.encryption import Encryption
+    from ..utils.pgp_pool import GPGPool
+
+    work_dir = tempfile.mkdtemp(prefix="zuno-bench-pgp-")
+    try:
+        keys = list(generate_pgp_keys(args.recipients, tempfile.mkdtemp(dir=work_dir)))
+        recipients = [keys[i % len(keys)] for i in range(args.messages)]
+
+        results = {"unpooled": _rate(args.messages, unpooled(recipients, tempfile.mkdtemp(dir=work_dir)))}
+        for size in args.pool_sizes:
+            encryption = Encryption()
+            encryption.gpg_pool = GPGPool(tempfile.mkdtemp(dir=work_dir), size=size)
+            # Create every engine and import every key outside the measurement
+            encryption.encrypt_messages(MESSAGE, keys * size)
+
+            if size == 1:
+                results["pool_sequential"] = _rate(
+                    args.messages,
+                    lambda: [encryption.encrypt_message(MESSAGE, key) for key in recipients]
+                )
+            results[f"pool_batch_{size}"] = _rate(
+                args.messages,
+                lambda: encryption.encrypt_messages(MESSAGE, recipients)
+            )
+            encryption.gpg_pool.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "recipients": args.recipients,
+            "messages": args.messages,
+            "cpus": os.cpu_count()
+        },
+        "results": results
+    }
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure PGP messages encrypted per second")
+    parser.add_argument("--recipients", type=int, default=20, help="Distinct recipient keys")
+    parser.add_argument("--messages", type=int, default=200, help="Messages per measurement")
+    parser.add_argument("--pool-sizes", default="1,2,4", help="Comma-separated engine pool sizes")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+    args.pool_sizes = [int(size) for size in args.pool_sizes.split(",")]
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    text = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
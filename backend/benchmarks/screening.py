@@ -0,0 +1,123 @@
+"""
+Per-listing classification latency of the tiered screening pipeline versus
+sending every description through the generative model (the behaviour
+before tiered screening), using the configured models:
+
+    python -m backend.benchmarks.screening --descriptions 200 --output screening.json
+
+Each description is classified on its own, as a single listing was, and
+bypasses the classification cache. Both runs use the same descriptions, so
+the report also shows how often the two pipelines agree on the flags.
+Run from the repository root.
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def build_descriptions(count: int, fraud_ratio: float, seed: int) -> List[str]:
+    """Listing-like descriptions, ``fraud_ratio`` of them containing a fraud term"""
+    from .seed import WORDS
+    from ..services.ai_classifier import classifier
+
+    rng = random.Random(seed)
+    descriptions = []
+    for _ in range(count):
+        words = rng.choices(WORDS, k=rng.randint(8, 40))
+        if classifier.fraud_terms.terms and rng.random() < fraud_ratio:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(classifier.fraud_terms.terms))
+        descriptions.append(" ".join(words))
+    return descriptions
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_pipeline(descriptions: List[str], escalation_threshold: float) -> Dict:
+    """Classify each description alone and report latency and escalations"""
+    from ..services.ai_classifier import classifier
+
+    classifier.escalation_threshold = escalation_threshold
+    classifier.screening.reset()
+    latencies = []
+    flags = []
+    for description in descriptions:
+        start = time.perf_counter()
+        result = classifier._run_models([description])[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        flags.append(sorted(result["flags"]))
+
+    stats = classifier.screening.stats()
+    return {
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50), 2),
+            "p95": round(_percentile(latencies, 0.95), 2),
+            "mean": round(sum(latencies) / len(latencies), 2)
+        },
+        "escalation_rate": round(stats["escalation_rate"], 4),
+        "rule_matches": stats["rule_matches"],
+        "flags": flags
+    }
+
+def run(args) -> Dict:
+    from ..services.ai_classifier import classifier
+
+    configured_threshold = classifier.escalation_threshold
+    started = time.perf_counter()
+    classifier.registry.warm()
+    load_seconds = time.perf_counter() - started
+    status = classifier.registry.status()
+    missing = [name for name, model in status["models"].items() if model["state"] != "ready"]
+    if missing:
+        raise SystemExit(f"Models failed to load: {', '.join(missing)}")
+
+    descriptions = build_descriptions(args.descriptions, args.fraud_ratio, args.seed)
+    # Warm kernels and tokenizers outside the measurement
+    run_pipeline(descriptions[:args.warmup], math.inf)
+
+    # Every score is below an infinite threshold, so everything escalates
+    baseline = run_pipeline(descriptions, math.inf)
+    tiered = run_pipeline(descriptions, configured_threshold)
+    agreement = sum(1 for old, new in zip(baseline.pop("flags"), tiered.pop("flags")) if old == new)
+    classifier.escalation_threshold = configured_threshold
+
+    return {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "descriptions": args.descriptions,
+            "fraud_ratio": args.fraud_ratio,
+            "seed": args.seed,
+            "escalation_threshold": configured_threshold,
+            "model_load_seconds": round(load_seconds, 1)
+        },
+        "escalate_all": baseline,
+        "tiered": tiered,
+        "p50_speedup": round(baseline["latency_ms"]["p50"] / tiered["latency_ms"]["p50"], 1),
+        "flag_agreement": round(agreement / len(descriptions), 4)
+    }
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare tiered screening against escalating every listing")
+    parser.add_argument("--descriptions", type=int, default=200)
+    parser.add_argument("--fraud-ratio", type=float, default=0.05, help="Share of descriptions containing a fraud term")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    text = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import base64
+import io
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from ..config import SessionLocal, UPLOAD_DIR
+from ..models import Product, Review, User
+from ..services.catalog_facets import rebuild_facets
+from ..utils.chunked_crypto import ChunkEncryptor
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ["electronics", "books", "clothing", "home", "toys", "sports", "art", "tools"]
+WORDS = (
+    "vintage handmade rare mint sealed original signed limited classic deluxe compact portable "
+    "wireless leather wooden ceramic steel cotton silk bundle set collection edition lamp camera "
+    "keyboard jacket novel poster board kit guitar watch bag mug print lens drone chair"
+).split()
+INSERT_BATCH = 5000
+
+# The routes still write these placeholder ids (see create_product/create_review);
+# they must exist where foreign keys are enforced
+PLACEHOLDER_USERS = ("temp_seller", "temp_user")
+
+def fake_pgp_key(rng: random.Random) -> str:
+    """
+    Armored-looking key text that gpg would reject. Users seeded with one
+    get a random fingerprint and can't log in; only ``login_keys`` can.
+    """
+    body = base64.b64encode(rng.randbytes(300)).decode()
+    lines = [body[i:i + 64] for i in range(0, len(body), 64)]
+    return "-----BEGIN PGP PUBLIC KEY BLOCK-----\n\n" + "\n".join(lines) + "\n-----END PGP PUBLIC KEY BLOCK-----\n"
+
+def sample_jpeg(size: int = 640) -> bytes:
+    from PIL import Image
+
+    image = Image.effect_mandelbrot((size, size), (-2.0, -1.5, 1.0, 1.5), 100).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def _write_encrypted(file_name: str, data: bytes):
+    encryptor = ChunkEncryptor()
+    with open(os.path.join(UPLOAD_DIR, file_name), "wb") as f:
+        f.write(encryptor.header)
+        f.write(encryptor.update(data))
+        f.write(encryptor.finalize())
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choices(WORDS, k=count))
+
+def seed_database(
+    users: int,
+    products: int,
+    reviews_per_product: float,
+    image_ratio: float = 0.2,
+    seed: int = 42,
+    login_keys: Optional[Dict[str, str]] = None
+) -> Dict[str, List]:
+    """
+    Insert synthetic users, products (mostly published, with consistent
+    review statistics) and reviews, then rebuild the facet counts.
+    ``login_keys`` (real public key -> its fingerprint) become extra users
+    who can log in.
+
+    Returns the ids and login keys the benchmark scenarios draw from.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    # Products with images share one set of encrypted derivatives
+    if image_ratio > 0:
+        data = sample_jpeg()
+        for variant in ("thumbnail", "card", "full"):
+            _write_encrypted(f"bench_{variant}.jpg", data)
+
+    user_rows = [
+        {"id": user_id, "pgp_key": fake_pgp_key(rng), "is_seller": True, "created_at": now}
+        for user_id in PLACEHOLDER_USERS
+    ]
+    for i in range(users):
+        user_rows.append({
+            "id": new_id(),
+            "pgp_key": fake_pgp_key(rng),
+            "is_seller": rng.random() < 0.2,
+            "created_at": now - timedelta(days=rng.uniform(0, 365))
+        })
+    for row in user_rows:
+        row["pgp_fingerprint"] = rng.randbytes(20).hex().upper()
+    login_keys = login_keys or {}
+    for pgp_key, fingerprint in login_keys.items():
+        user_rows.append({
+            "id": new_id(),
+            "pgp_key": pgp_key,
+            "pgp_fingerprint": fingerprint,
+            "is_seller": False,
+            "created_at": now
+        })
+    user_ids = [row["id"] for row in user_rows]
+    seller_ids = [row["id"] for row in user_rows if row["is_seller"]]
+
+    product_rows = []
+    review_rows = []
+    for i in range(products):
+        price = round(rng.lognormvariate(3.5, 1.2), 2) + 0.01
+        product_id = new_id()
+        row = {
+            "id": product_id,
+            "name": _words(rng, 3).title(),
+            "description": _words(rng, rng.randint(8, 40)),
+            "price": price,
+            "category": rng.choice(CATEGORIES),
+            "commission": price * 0.025,
+            "seller_id": rng.choice(seller_ids),
+            "status": "published" if rng.random() < 0.95 else "pending",
+            "flags": [],
+            "created_at": now - timedelta(seconds=rng.uniform(0, 90 * 86400)),
+            "review_count": 0,
+            "rating_sum": 0,
+            "rating_average": 0.0,
+            **{f"rating_{rating}_count": 0 for rating in range(1, 6)}
+        }
+        if rng.random() < image_ratio:
+            row["thumbnail_path"] = "bench_thumbnail.jpg"
+            row["card_path"] = "bench_card.jpg"
+            row["image_path"] = "bench_full.jpg"
+
+        # Poisson-ish review count around the requested mean
+        for _ in range(int(rng.expovariate(1 / reviews_per_product)) if reviews_per_product > 0 else 0):
+            rating = rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 2, 4, 5))[0]
+            review_rows.append({
+                "id": new_id(),
+                "user_id": rng.choice(user_ids),
+                "product_id": product_id,
+                "rating": rating,
+                "comment": _words(rng, rng.randint(3, 20)),
+                "created_at": row["created_at"] + timedelta(seconds=rng.uniform(0, 86400))
+            })
+            row["review_count"] += 1
+            row["rating_sum"] += rating
+            row[f"rating_{rating}_count"] += 1
+        if row["review_count"]:
+            row["rating_average"] = row["rating_sum"] / row["review_count"]
+        product_rows.append(row)
+
+    db = SessionLocal()
+    try:
+        for model, rows in ((User, user_rows), (Product, product_rows), (Review, review_rows)):
+            for start in range(0, len(rows), INSERT_BATCH):
+                db.execute(insert(model), rows[start:start + INSERT_BATCH])
+        db.commit()
+        rebuild_facets(db)
+    finally:
+        db.close()
+
+    logger.info(f"Seeded {len(user_rows)} users, {len(product_rows)} products, {len(review_rows)} reviews")
+    return {
+        "user_keys": list(login_keys),
+        "product_ids": [row["id"] for row in product_rows if row["status"] == "published"],
+        "image_product_ids": [
+            row["id"] for row in product_rows
+            if row["status"] == "published" and row.get("image_path")
+        ]
+    }
+
+def generate_pgp_keys(count: int, home_dir: str) -> Dict[str, str]:
+    """
+    Real (small, unprotected) public keys for the login and register
+    scenarios, which have gpg import every key they are given, mapped to
+    their fingerprints
+    """
+    import gnupg
+
+    gpg = gnupg.GPG(gnupghome=home_dir)
+    keys = {}
+    for i in range(count):
+        key = gpg.gen_key(gpg.gen_key_input(
+            name_email=f"bench{i}@example.invalid",
+            key_type="RSA",
+            key_length=1024,
+            no_protection=True
+        ))
+        keys[gpg.export_keys(str(key))] = str(key)
+    return keys
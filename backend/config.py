@@ -1,6 +1,7 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
@@ -13,17 +14,49 @@ DATABASE_URL = os.getenv(
     "postgresql://user:password@db:5432/zuno_db"
 )
 
+# Connection pool sizing (per process; the sync engine is used by the
+# moderation workers, the async engine by the API routes)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+def _async_database_url(url: str) -> str:
+    """Map a sync driver URL onto its asyncio driver (asyncpg / aiosqlite)"""
+    if url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url[len("postgresql+psycopg2://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_database_url(DATABASE_URL))
+
 # Create engine with connection pooling
 engine = create_engine(
     DATABASE_URL,
     poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
     pool_pre_ping=True,
     connect_args={} if "postgresql" in DATABASE_URL else {"check_same_thread": False}
 )
 
+# SQLite picks its own pool class for aiosqlite; sizing only applies to servers
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    **({} if ASYNC_DATABASE_URL.startswith("sqlite") else {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE
+    })
+)
+
 # SessionLocal class for database sessions
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -31,6 +64,12 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -39,6 +78,11 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Encryption settings
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
 if not ENCRYPTION_KEY:
@@ -55,16 +99,181 @@ PROJECT_NAME = "Zuno Marketplace"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Number of OpenPGP fingerprints kept in memory (by a digest of the key text)
+# so repeated logins and re-registrations skip the gpg import
+PGP_KEY_CACHE_SIZE = int(os.getenv("PGP_KEY_CACHE_SIZE", "10000"))
+
+# GPG engine pool: each process gets PGP_POOL_SIZE private keyrings under
+# PGP_HOME_DIR, each holding at most PGP_MAX_KEYS_PER_ENGINE public keys
+PGP_HOME_DIR = os.getenv("PGP_HOME_DIR", os.path.join(os.getcwd(), "gpghome"))
+PGP_POOL_SIZE = int(os.getenv("PGP_POOL_SIZE", "4"))
+PGP_MAX_KEYS_PER_ENGINE = int(os.getenv("PGP_MAX_KEYS_PER_ENGINE", "1000"))
+
 # Tor settings
 TOR_HOSTNAME_PATH = "/var/lib/tor/zuno_service/hostname"
 
 # AI Model settings
 AI_MODEL_PATH = os.getenv("AI_MODEL_PATH", "distilbert-base-uncased-finetuned-sst-2-english")
 AI_MODEL_CACHE_DIR = os.getenv("AI_MODEL_CACHE_DIR", "/app/data/models")
+AI_MODERATION_MODEL = os.getenv("AI_MODERATION_MODEL", "facebook/roberta-hate-speech-dynabench-r4-target")
+AI_GENERATION_MODEL = os.getenv("AI_GENERATION_MODEL", "gpt2")
+# Inference backend for the category and moderation classifiers:
+# "torch" (fp32), "quantized" (dynamic int8) or "onnx" (ONNX Runtime)
+AI_INFERENCE_BACKEND = os.getenv("AI_INFERENCE_BACKEND", "torch")
+# Load the torch models from one memory-mapped weights file under
+# AI_MODEL_CACHE_DIR/shared (exported on first use), so uvicorn workers share
+# a single physical copy instead of loading their own. Only applies to the
+# "torch" backend; quantized and ONNX weights stay per worker
+AI_SHARED_WEIGHTS = os.getenv("AI_SHARED_WEIGHTS", "false").lower() == "true"
+
+# Micro-batching for in-request classification (bulk imports): a batch is
+# dispatched once it holds AI_BATCH_MAX_SIZE descriptions or
+# AI_BATCH_MAX_WAIT_MS has passed, on AI_INFERENCE_WORKERS threads
+AI_BATCH_MAX_SIZE = int(os.getenv("AI_BATCH_MAX_SIZE", "16"))
+AI_BATCH_MAX_WAIT_MS = float(os.getenv("AI_BATCH_MAX_WAIT_MS", "10"))
+AI_INFERENCE_WORKERS = int(os.getenv("AI_INFERENCE_WORKERS", "1"))
+
+# Models load lazily on first use; when enabled the API process also warms
+# them in a background thread at startup. Listings are classified by the
+# moderation workers, so the API itself only needs them for bulk imports
+AI_WARM_ON_STARTUP = os.getenv("AI_WARM_ON_STARTUP", "false").lower() == "true"
+
+# Tiered screening: only descriptions containing one of FRAUD_TERMS, or whose
+# moderation confidence is below the threshold, are escalated to the
+# generative model (which alone sets the potential_fraud flag)
+FRAUD_TERMS = [
+    term.strip()
+    for term in os.getenv("FRAUD_TERMS", "free money,guaranteed profit,100% success").split(",")
+    if term.strip()
+]
+AI_ESCALATION_THRESHOLD = float(os.getenv("AI_ESCALATION_THRESHOLD", "0.9"))
+
+# Classification result cache (in-process LRU, optionally persisted under
+# AI_MODEL_CACHE_DIR so results survive restarts)
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "10000"))
+CLASSIFICATION_CACHE_TTL = int(os.getenv("CLASSIFICATION_CACHE_TTL", str(7 * 24 * 3600)))
+CLASSIFICATION_CACHE_PERSIST = os.getenv("CLASSIFICATION_CACHE_PERSIST", "true").lower() == "true"
+CLASSIFICATION_CACHE_PERSIST_SIZE = int(os.getenv("CLASSIFICATION_CACHE_PERSIST_SIZE", "200000"))
+
+# Moderation queue: listings are stored as pending and classified by a pool
+# of worker processes (MODERATION_WORKERS=0 disables the in-app pool, e.g.
+# when running `python -m backend.services.moderation_queue` separately)
+MODERATION_WORKERS = int(os.getenv("MODERATION_WORKERS", "1"))
+MODERATION_BATCH_SIZE = int(os.getenv("MODERATION_BATCH_SIZE", "16"))
+MODERATION_POLL_INTERVAL = float(os.getenv("MODERATION_POLL_INTERVAL", "0.5"))
+MODERATION_MAX_ATTEMPTS = int(os.getenv("MODERATION_MAX_ATTEMPTS", "5"))
+MODERATION_RETRY_BASE_SECONDS = float(os.getenv("MODERATION_RETRY_BASE_SECONDS", "5"))
+MODERATION_JOB_TIMEOUT = int(os.getenv("MODERATION_JOB_TIMEOUT", "300"))
 
 # File upload settings
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/app/data/uploads")
-MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(5 * 1024 * 1024)))  # 5MB
+# Uploads are read and encrypted this many bytes at a time
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+# Bulk imports are classified and inserted BULK_IMPORT_BATCH_SIZE rows per
+# transaction; one request may carry at most BULK_IMPORT_MAX_ROWS rows in at
+# most BULK_IMPORT_MAX_BYTES bytes (larger bodies are refused with 413)
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "100000"))
+BULK_IMPORT_MAX_BYTES = int(os.getenv("BULK_IMPORT_MAX_BYTES", str(100 * 1024 * 1024)))  # 100MB
+
+# In-memory LRU of decrypted images no larger than IMAGE_CACHE_MAX_ITEM_BYTES
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+IMAGE_CACHE_MAX_ITEM_BYTES = int(os.getenv("IMAGE_CACHE_MAX_ITEM_BYTES", str(256 * 1024)))
+
+# Uploaded images are re-encoded into thumbnail/card/full derivatives by a
+# pool of IMAGE_PIPELINE_WORKERS processes
+IMAGE_PIPELINE_WORKERS = int(os.getenv("IMAGE_PIPELINE_WORKERS", "2"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+
+# Product search: "postgres" (weighted tsvector + GIN index, maintained by
+# the database) or "memory" (in-process BM25 inverted index, rebuilt at
+# startup; each worker holds its own copy). Defaults to postgres on PostgreSQL
+SEARCH_BACKEND = os.getenv(
+    "SEARCH_BACKEND",
+    "postgres" if DATABASE_URL.startswith("postgresql") else "memory"
+)
+# The memory backend re-indexes listings the moderation workers have
+# classified since its last refresh, at most once per SEARCH_REFRESH_SECONDS
+SEARCH_REFRESH_SECONDS = float(os.getenv("SEARCH_REFRESH_SECONDS", "1"))
+
+# Read-through cache of product/review read responses: "memory" (per-process
+# LRU), "redis" (shared via REDIS_URL, falling back to memory when unset) or
+# "off". With the memory backend, writes made by other processes (moderation
+# workers, other uvicorn workers) show up once entries expire
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL")
+# Seconds a Redis call may take before the cache gives up and renders uncached
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+
+# Verified access tokens are cached per process (at most AUTH_CACHE_SIZE, for
+# AUTH_CACHE_TTL seconds and never past the token's expiry). With
+# AUTH_TRUST_TOKEN_CLAIMS the principal is built from the signed sub/is_seller
+# claims and the user row is never read; a seller status change then only
+# applies to tokens issued after it. Revocations are held in memory, per worker
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+# Prometheus metrics on /metrics (request latency, classifier, encryption,
+# file I/O and SQL timings). Each uvicorn worker keeps and serves its own
+# series, so scrape every worker or run one per container
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# User ids (comma-separated) allowed on the /api/admin routes
+ADMIN_USER_IDS = {
+    user_id.strip()
+    for user_id in os.getenv("ADMIN_USER_IDS", "").split(",")
+    if user_id.strip()
+}
+
+# On-demand sampling profiler for live workers (admin only). Disabled, it
+# adds no middleware and no routes. Sessions sample every
+# PROFILER_INTERVAL_MS, run at most PROFILER_MAX_SECONDS, and the last
+# PROFILER_MAX_RESULTS profiles are kept for download
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILER_MAX_RESULTS = int(os.getenv("PROFILER_MAX_RESULTS", "20"))
+
+# Admission control, per worker. Requests to ADMISSION_HEAVY_ROUTES ("METHOD
+# /path/template", comma-separated) and all other routes run in separate
+# pools of at most *_CONCURRENCY requests, with up to *_QUEUE_SIZE waiting.
+# A request that can't start within *_MAX_WAIT seconds (or is predicted not
+# to) gets an immediate 503 with Retry-After. ADMISSION_EXEMPT_PATHS (and
+# everything below them) bypass admission. Authenticated users also get a
+# token bucket per pool of *_RATE_PER_MINUTE with bursts of *_BURST (429 when
+# empty); anonymous requests are only bounded by the pools, since behind Tor
+# every client has the same address
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_HEAVY_ROUTES = {
+    route.strip()
+    for route in os.getenv(
+        "ADMISSION_HEAVY_ROUTES",
+        "POST /api/products/,POST /api/products/bulk,POST /api/auth/register"
+    ).split(",")
+    if route.strip()
+}
+ADMISSION_EXEMPT_PATHS = {
+    path.strip()
+    for path in os.getenv("ADMISSION_EXEMPT_PATHS", "/health,/metrics,/api/admin").split(",")
+    if path.strip()
+}
+ADMISSION_HEAVY_CONCURRENCY = int(os.getenv("ADMISSION_HEAVY_CONCURRENCY", "4"))
+ADMISSION_HEAVY_QUEUE_SIZE = int(os.getenv("ADMISSION_HEAVY_QUEUE_SIZE", "16"))
+ADMISSION_HEAVY_MAX_WAIT = float(os.getenv("ADMISSION_HEAVY_MAX_WAIT", "10"))
+ADMISSION_HEAVY_RATE_PER_MINUTE = float(os.getenv("ADMISSION_HEAVY_RATE_PER_MINUTE", "10"))
+ADMISSION_HEAVY_BURST = int(os.getenv("ADMISSION_HEAVY_BURST", "5"))
+ADMISSION_STANDARD_CONCURRENCY = int(os.getenv("ADMISSION_STANDARD_CONCURRENCY", "64"))
+ADMISSION_STANDARD_QUEUE_SIZE = int(os.getenv("ADMISSION_STANDARD_QUEUE_SIZE", "256"))
+ADMISSION_STANDARD_MAX_WAIT = float(os.getenv("ADMISSION_STANDARD_MAX_WAIT", "5"))
+ADMISSION_STANDARD_RATE_PER_MINUTE = float(os.getenv("ADMISSION_STANDARD_RATE_PER_MINUTE", "600"))
+ADMISSION_STANDARD_BURST = int(os.getenv("ADMISSION_STANDARD_BURST", "60"))
+# Per-pool limit on how many clients' buckets are remembered
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
 
 # Create necessary directories
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -1,9 +1,22 @@
 import logging
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import os
 from datetime import datetime
+from .config import AI_WARM_ON_STARTUP, MODERATION_WORKERS, PROFILER_ENABLED, engine, async_engine
+from .services.model_registry import model_registry
+from .services.ai_classifier import classifier
+from .services.moderation_queue import ModerationWorkerPool
+from .services.image_cache import image_cache
+from .services.image_pipeline import image_pipeline
+from .services.search_index import search_backend
+from .services.response_cache import response_cache
+from .services.auth_cache import token_cache, revocation_list
+from .services.admission import admission_controller, AdmissionMiddleware
+from .utils.metrics import metrics, instrument_engine, MetricsMiddleware
+from .routers.auth import client_id_for_token
 
 # Setup logging
 logging.basicConfig(
@@ -27,12 +40,31 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error reading Tor hostname: {e}")
     
-    # Database initialization would go here
-    
+    # Database schema is managed by Alembic (`alembic upgrade head`)
+
+    # The in-memory search index (if used) is rebuilt from the database
+    await search_backend.rebuild()
+
+    # Optionally warm the AI models without blocking startup; bulk imports
+    # (the only classification done in the API process) load them on demand
+    if AI_WARM_ON_STARTUP:
+        model_registry.warm_in_background()
+
+    # Moderation workers classify pending listings off the request path
+    moderation_pool = None
+    if MODERATION_WORKERS > 0:
+        moderation_pool = ModerationWorkerPool(MODERATION_WORKERS)
+        moderation_pool.start()
+
     yield
     
     # Cleanup
     logger.info("Shutting down application...")
+    if moderation_pool is not None:
+        moderation_pool.stop()
+    await classifier.batcher.stop()
+    image_pipeline.shutdown()
+    await async_engine.dispose()
 
 # Initialize FastAPI
 app = FastAPI(
@@ -42,6 +74,11 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Admission control: per-route-class concurrency pools and per-user rate
+# limits. Innermost, so preflights never queue and rejections still carry
+# CORS headers and are counted by the metrics middleware
+app.add_middleware(AdmissionMiddleware, routes=app.routes, identify=client_id_for_token)
+
 # CORS middleware - restrict in production to only allow .onion addresses
 app.add_middleware(
     CORSMiddleware,
@@ -49,25 +86,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Content-Range", "Accept-Ranges", "Retry-After"],
 )
 
+# Outermost, so latency covers the other middleware too
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+# SQL statement and pool checkout timings
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "classifier": model_registry.status(),
+        "batching": classifier.batcher.stats(),
+        "classification_cache": classifier.cache.stats(),
+        "screening": classifier.screening.stats(),
+        "image_cache": image_cache.stats(),
+        "search": search_backend.stats(),
+        "response_cache": response_cache.stats(),
+        "auth": {**token_cache.stats(), **revocation_list.stats()},
+        "admission": admission_controller.stats()
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Import and include routers
 # We'll create these files next
-from routers import products, comments, auth
+from .routers import products, comments, auth, admin
 
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(products.router, prefix="/api/products", tags=["Products"])
 app.include_router(comments.router, prefix="/api/comments", tags=["Comments"])
 
+# The profiler is only wired in when enabled, so it costs nothing otherwise
+if PROFILER_ENABLED:
+    from .services.profiler import ProfilerMiddleware
+
+    app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+    app.add_middleware(ProfilerMiddleware, routes=app.routes, authorize=auth.is_admin_token)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,102 @@
+"""Indexes for listing/review access patterns and PGP key fingerprints
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:30:00
+"""
+import logging
+import shutil
+import tempfile
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def _pgp_fingerprints(pgp_keys):
+    # OpenPGP fingerprints as gpg reports them on import, from a scratch
+    # keyring; None where gpg rejects the key. Computed here rather than with
+    # application code so the migration keeps working if that changes later.
+    import gnupg
+
+    home = tempfile.mkdtemp(prefix="migration-0002-")
+    try:
+        gpg = gnupg.GPG(gnupghome=home)
+        return [(gpg.import_keys(pgp_key).fingerprints or [None])[0] for pgp_key in pgp_keys]
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+
+def upgrade():
+    # Listing pages: published products newest first, and per-seller/category views
+    op.create_index("ix_products_status_created_at_id", "products", ["status", "created_at", "id"])
+    op.create_index("ix_products_seller_id_created_at", "products", ["seller_id", "created_at"])
+    op.create_index("ix_products_category_created_at", "products", ["category", "created_at"])
+
+    # Review pages for a product, newest first
+    op.create_index("ix_reviews_product_id_created_at_id", "reviews", ["product_id", "created_at", "id"])
+    op.create_index("ix_reviews_user_id", "reviews", ["user_id"])
+
+    # Moderation workers poll for due jobs; products look up their latest job
+    op.create_index("ix_moderation_jobs_status_next_attempt_at", "moderation_jobs", ["status", "next_attempt_at"])
+    op.create_index("ix_moderation_jobs_product_id_created_at", "moderation_jobs", ["product_id", "created_at"])
+    op.create_index("ix_moderation_jobs_claim_token", "moderation_jobs", ["claim_token"])
+
+    # Fixed-length fingerprint replaces the unique constraint on the full key text
+    op.add_column("users", sa.Column("pgp_fingerprint", sa.String(64), nullable=True))
+
+    connection = op.get_bind()
+    users = sa.table(
+        "users",
+        sa.column("id", sa.String),
+        sa.column("pgp_key", sa.Text),
+        sa.column("pgp_fingerprint", sa.String),
+        sa.column("created_at", sa.DateTime)
+    )
+    rows = connection.execute(
+        sa.select(users.c.id, users.c.pgp_key).order_by(users.c.created_at, users.c.id)
+    ).all()
+    fingerprints = _pgp_fingerprints([pgp_key for _, pgp_key in rows]) if rows else []
+    seen = set()
+    for (user_id, _), fingerprint in zip(rows, fingerprints):
+        if fingerprint is None:
+            logger.warning(f"User {user_id} has a PGP key gpg rejects; leaving its fingerprint unset")
+            continue
+        if fingerprint in seen:
+            # Another export of a key an older account registered: the unique
+            # index can't hold both, and the key logs in to the older account
+            logger.warning(f"User {user_id} shares PGP key {fingerprint} with an older account; leaving it unset")
+            continue
+        seen.add(fingerprint)
+        connection.execute(
+            users.update()
+            .where(users.c.id == user_id)
+            .values(pgp_fingerprint=fingerprint)
+        )
+
+    op.create_index("ix_users_pgp_fingerprint", "users", ["pgp_fingerprint"], unique=True)
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_constraint("uq_users_pgp_key", type_="unique")
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.create_unique_constraint("uq_users_pgp_key", ["pgp_key"])
+    op.drop_index("ix_users_pgp_fingerprint", table_name="users")
+    op.drop_column("users", "pgp_fingerprint")
+
+    op.drop_index("ix_moderation_jobs_claim_token", table_name="moderation_jobs")
+    op.drop_index("ix_moderation_jobs_product_id_created_at", table_name="moderation_jobs")
+    op.drop_index("ix_moderation_jobs_status_next_attempt_at", table_name="moderation_jobs")
+    op.drop_index("ix_reviews_user_id", table_name="reviews")
+    op.drop_index("ix_reviews_product_id_created_at_id", table_name="reviews")
+    op.drop_index("ix_products_category_created_at", table_name="products")
+    op.drop_index("ix_products_seller_id_created_at", table_name="products")
+    op.drop_index("ix_products_status_created_at_id", table_name="products")
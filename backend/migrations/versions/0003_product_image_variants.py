@@ -0,0 +1,26 @@
+"""Image derivative paths on products
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 14:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("products", sa.Column("thumbnail_path", sa.String(), nullable=True))
+    op.add_column("products", sa.Column("card_path", sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("card_path")
+        batch_op.drop_column("thumbnail_path")
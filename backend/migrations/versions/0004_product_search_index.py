@@ -0,0 +1,36 @@
+"""Full-text search index on products (PostgreSQL only)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 15:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Must match services.search_index.SEARCH_DOCUMENT_SQL. Copied rather than
+# imported so the migration keeps working if application code changes later.
+SEARCH_DOCUMENT_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade():
+    # Other databases use the in-process search index instead
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(f"CREATE INDEX ix_products_search ON products USING gin (({SEARCH_DOCUMENT_SQL}))")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_products_search")
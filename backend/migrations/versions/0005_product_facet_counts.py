@@ -0,0 +1,45 @@
+"""Facet count table and price sort index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 16:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Must match services.catalog_facets.PRICE_BUCKETS
+PRICE_BUCKETS = (0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def upgrade():
+    op.create_index("ix_products_status_price_id", "products", ["status", "price", "id"])
+
+    op.create_table(
+        "product_facet_counts",
+        sa.Column("category", sa.String(), primary_key=True),
+        sa.Column("price_bucket", sa.Integer(), primary_key=True),
+        sa.Column("product_count", sa.Integer(), nullable=False),
+    )
+
+    buckets = " ".join(
+        f"WHEN price >= {edge} THEN {index}"
+        for index, edge in reversed(list(enumerate(PRICE_BUCKETS)))
+    )
+    op.execute(
+        "INSERT INTO product_facet_counts (category, price_bucket, product_count) "
+        f"SELECT coalesce(category, ''), CASE {buckets} ELSE 0 END, count(id) "
+        "FROM products WHERE status = 'published' "
+        f"GROUP BY coalesce(category, ''), CASE {buckets} ELSE 0 END"
+    )
+
+
+def downgrade():
+    op.drop_table("product_facet_counts")
+    op.drop_index("ix_products_status_price_id", table_name="products")
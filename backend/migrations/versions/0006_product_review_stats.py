@@ -0,0 +1,49 @@
+"""Denormalized review statistics on products
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 17:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+COUNT_COLUMNS = ["review_count", "rating_sum"] + [f"rating_{rating}_count" for rating in range(1, 6)]
+
+
+def upgrade():
+    with op.batch_alter_table("products") as batch_op:
+        for column in COUNT_COLUMNS:
+            batch_op.add_column(sa.Column(column, sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("rating_average", sa.Float(), nullable=False, server_default="0"))
+
+    # Backfill from existing reviews
+    histogram = ", ".join(
+        f"rating_{rating}_count = (SELECT count(*) FROM reviews r WHERE r.product_id = products.id AND r.rating = {rating})"
+        for rating in range(1, 6)
+    )
+    op.execute(
+        "UPDATE products SET "
+        "review_count = (SELECT count(*) FROM reviews r WHERE r.product_id = products.id AND r.rating BETWEEN 1 AND 5), "
+        "rating_sum = (SELECT coalesce(sum(r.rating), 0) FROM reviews r WHERE r.product_id = products.id AND r.rating BETWEEN 1 AND 5), "
+        f"{histogram}"
+    )
+    op.execute(
+        "UPDATE products SET rating_average = CAST(rating_sum AS FLOAT) / review_count WHERE review_count > 0"
+    )
+
+    op.create_index("ix_products_status_rating_average_id", "products", ["status", "rating_average", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_products_status_rating_average_id", table_name="products")
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("rating_average")
+        for column in reversed(COUNT_COLUMNS):
+            batch_op.drop_column(column)
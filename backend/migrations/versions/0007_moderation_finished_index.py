@@ -0,0 +1,24 @@
+"""Index finished moderation jobs by completion time
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The in-memory search index picks up listings classified since its last refresh
+    op.create_index("ix_moderation_jobs_status_finished_at", "moderation_jobs", ["status", "finished_at"])
+
+
+def downgrade():
+    op.drop_index("ix_moderation_jobs_status_finished_at", table_name="moderation_jobs")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -13,7 +13,9 @@ class User(Base):
     __tablename__ = "users"
 
     id = Column(String, primary_key=True, default=generate_uuid)
-    pgp_key = Column(Text, nullable=False, unique=True)
+    pgp_key = Column(Text, nullable=False)
+    # OpenPGP fingerprint of the key as gpg reports it; logins look users up by this
+    pgp_fingerprint = Column(String(64), unique=True, index=True)
     is_seller = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -32,14 +34,47 @@ class Product(Base):
     description = Column(Text)
     price = Column(Float, nullable=False)
     category = Column(String)
+    # image_path holds the "full" derivative once the image pipeline has run
     image_path = Column(String)
+    thumbnail_path = Column(String)
+    card_path = Column(String)
     commission = Column(Float)
     seller_id = Column(String, ForeignKey('users.id'))
+    # pending until the moderation worker publishes or rejects the listing
+    status = Column(String, nullable=False, default="pending")
+    flags = Column(JSON, default=list)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Review aggregates, maintained by services.review_stats
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_average = Column(Float, nullable=False, default=0)
+    rating_1_count = Column(Integer, nullable=False, default=0)
+    rating_2_count = Column(Integer, nullable=False, default=0)
+    rating_3_count = Column(Integer, nullable=False, default=0)
+    rating_4_count = Column(Integer, nullable=False, default=0)
+    rating_5_count = Column(Integer, nullable=False, default=0)
     
     # Relationships
     seller = relationship("User", back_populates="products")
     reviews = relationship("Review", back_populates="product")
+    moderation_jobs = relationship(
+        "ModerationJob",
+        back_populates="product",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    __table_args__ = (
+        Index("ix_products_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_products_seller_id_created_at", "seller_id", "created_at"),
+        Index("ix_products_category_created_at", "category", "created_at"),
+        Index("ix_products_status_price_id", "status", "price", "id"),
+        Index("ix_products_status_rating_average_id", "status", "rating_average", "id"),
+    )
+
+    @property
+    def rating_histogram(self) -> dict:
+        return {str(rating): getattr(self, f"rating_{rating}_count") or 0 for rating in range(1, 6)}
 
     def __repr__(self):
         return f"<Product(id={self.id}, name={self.name}, price={self.price})>"
@@ -58,5 +93,52 @@ class Review(Base):
     user = relationship("User", back_populates="reviews")
     product = relationship("Product", back_populates="reviews")
 
+    __table_args__ = (
+        Index("ix_reviews_product_id_created_at_id", "product_id", "created_at", "id"),
+        Index("ix_reviews_user_id", "user_id"),
+    )
+
     def __repr__(self):
         return f"<Review(id={self.id}, rating={self.rating})>"
+
+class ModerationJob(Base):
+    __tablename__ = "moderation_jobs"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    product_id = Column(String, ForeignKey('products.id', ondelete="CASCADE"), nullable=False)
+    # queued -> running -> succeeded | failed (retried with backoff while attempts remain)
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    claim_token = Column(String)
+    last_error = Column(Text)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    # Relationships
+    product = relationship("Product", back_populates="moderation_jobs")
+
+    __table_args__ = (
+        Index("ix_moderation_jobs_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_moderation_jobs_product_id_created_at", "product_id", "created_at"),
+        Index("ix_moderation_jobs_claim_token", "claim_token"),
+        Index("ix_moderation_jobs_status_finished_at", "status", "finished_at"),
+    )
+
+    def __repr__(self):
+        return f"<ModerationJob(id={self.id}, product_id={self.product_id}, status={self.status})>"
+
+class ProductFacetCount(Base):
+    """
+    Number of published listings per (category, price bucket), kept in step
+    with the products table by services.catalog_facets
+    """
+    __tablename__ = "product_facet_counts"
+
+    category = Column(String, primary_key=True)
+    price_bucket = Column(Integer, primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ProductFacetCount(category={self.category}, price_bucket={self.price_bucket}, product_count={self.product_count})>"
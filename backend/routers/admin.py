@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+from ..services.auth_cache import Principal
+from ..services.profiler import profiler_manager
+from .auth import get_current_admin
+
+router = APIRouter()
+
+class ProfileRequest(BaseModel):
+    mode: Literal["wall", "cpu"] = "wall"
+    seconds: float = Field(10.0, gt=0)
+    # Path template, e.g. "/api/products/"; sample only while it is being served
+    route: Optional[str] = None
+
+@router.post("/profiles")
+async def start_profile(
+    profile: ProfileRequest,
+    admin: Principal = Depends(get_current_admin)
+) -> Dict:
+    """
+    Start a time-boxed sampling profile of this worker
+    """
+    try:
+        profiler = profiler_manager.start(profile.mode, profile.seconds, profile.route)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.summary()
+
+@router.get("/profiles")
+async def list_profiles(admin: Principal = Depends(get_current_admin)) -> List[Dict]:
+    """
+    Running and recent profiles of this worker, newest first
+    """
+    return profiler_manager.list()
+
+@router.post("/profiles/stop")
+async def stop_profile(admin: Principal = Depends(get_current_admin)) -> Dict:
+    """
+    End the running profile early
+    """
+    profiler = profiler_manager.stop()
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="No profile has been started")
+    return profiler.summary()
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    admin: Principal = Depends(get_current_admin)
+):
+    """
+    Download a finished profile as collapsed stacks (for flamegraph.pl,
+    speedscope or inferno)
+    """
+    profiler = profiler_manager.get(profile_id)
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="Profile is still running")
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed"'}
+    )
@@ -1,14 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime, timedelta
 from ..models import User
-from ..config import get_db, ALGORITHM
+from ..config import AsyncSessionLocal, get_async_db, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, AUTH_TRUST_TOKEN_CLAIMS, ADMIN_USER_IDS
+from ..services.auth_cache import Principal, token_cache, revocation_list
 from ..utils.encryption import encryption
 from pydantic import BaseModel, Field
-import jwt
+from jose import jwt, JWTError
 import uuid
 import os
+import time
 
 router = APIRouter()
 
@@ -38,28 +42,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti identifies the token for revocation, iat_ns (iat has whole-second
+    # resolution) for "log out everywhere"
+    issued_ns = time.time_ns()
+    to_encode.update({
+        "exp": expire,
+        "iat": issued_ns // 1_000_000_000,
+        "iat_ns": issued_ns,
+        "jti": uuid.uuid4().hex
+    })
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 @router.post("/register", response_model=UserResponse)
 async def register_user(
     user: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a new user with PGP key
     """
     try:
-        # Verify PGP key is valid
-        if not encryption.verify_pgp_key(user.pgp_key):
+        # Verify PGP key is valid and get its OpenPGP fingerprint; gpg runs
+        # as a subprocess, keep it off the event loop
+        fingerprint = await run_in_threadpool(encryption.pgp_fingerprint, user.pgp_key)
+        if fingerprint is None:
             raise HTTPException(
                 status_code=400,
                 detail="Invalid PGP key"
             )
 
-        # Check if PGP key already exists
-        existing_user = db.query(User).filter(User.pgp_key == user.pgp_key).first()
+        # Check if PGP key already exists, in any export of it
+        result = await db.execute(select(User.id).where(User.pgp_fingerprint == fingerprint))
+        existing_user = result.scalar_one_or_none()
         if existing_user:
             raise HTTPException(
                 status_code=400,
@@ -70,17 +85,20 @@ async def register_user(
         db_user = User(
             id=str(uuid.uuid4()),
             pgp_key=user.pgp_key,
+            pgp_fingerprint=fingerprint,
             is_seller=user.is_seller
         )
 
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
 
         return db_user
 
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error registering user: {str(e)}"
@@ -89,13 +107,17 @@ async def register_user(
 @router.post("/login", response_model=Token)
 async def login(
     pgp_key: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Login with PGP key and receive JWT token
     """
-    # Find user by PGP key
-    user = db.query(User).filter(User.pgp_key == pgp_key).first()
+    # Find user by PGP key fingerprint (cached after the key's first login)
+    fingerprint = await run_in_threadpool(encryption.pgp_fingerprint, pgp_key)
+    user = None
+    if fingerprint is not None:
+        result = await db.execute(select(User).where(User.pgp_fingerprint == fingerprint))
+        user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(
             status_code=401,
@@ -105,49 +127,130 @@ async def login(
     # Create access token
     access_token = create_access_token(
         data={"sub": user.id, "is_seller": user.is_seller},
-        expires_delta=timedelta(minutes=30)
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
 
-async def get_current_user(
-    token: str,
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Dependency to get current authenticated user
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except jwt.JWTError:
-        raise credentials_exception
+    except JWTError:
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+def _issued_at_ns(payload: dict) -> Optional[int]:
+    """
+    When the token was issued, in nanoseconds. Tokens from before ``iat_ns``
+    count from the start of their ``iat`` second, so a logout in that second
+    still revokes them.
+    """
+    if payload.get("iat_ns") is not None:
+        return int(payload["iat_ns"])
+    if payload.get("iat") is not None:
+        return int(payload["iat"]) * 1_000_000_000
+    return None
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    return user
+async def get_current_user(token: str) -> Principal:
+    """
+    Dependency to get current authenticated user. Opens a session only on a
+    cache miss, so cached requests never touch the database pool.
+    """
+    # Revoking a token or user drops its cache entries, so a hit is still valid
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = _decode_token(token)
+    user_id: str = payload["sub"]
+    if revocation_list.is_revoked(payload.get("jti"), user_id, _issued_at_ns(payload)):
+        raise _credentials_exception()
+
+    if AUTH_TRUST_TOKEN_CLAIMS:
+        principal = Principal(id=user_id, is_seller=bool(payload.get("is_seller")))
+    else:
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, user_id)
+        if user is None:
+            raise _credentials_exception()
+        principal = Principal(id=user.id, is_seller=user.is_seller)
+
+    token_cache.put(token, principal, payload["exp"])
+    return principal
+
+@router.post("/logout", status_code=204)
+async def logout(token: str, everywhere: bool = False):
+    """
+    Revoke this token, or with ``everywhere`` every token issued to the user so far
+    """
+    payload = _decode_token(token)
+    if everywhere:
+        revocation_list.revoke_user(payload["sub"])
+        token_cache.invalidate_user(payload["sub"])
+    else:
+        if payload.get("jti") is not None:
+            revocation_list.revoke_token(payload["jti"], payload["exp"])
+        token_cache.invalidate_token(token)
 
 # Dependency for protected routes
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     return current_user
 
 # Dependency for seller-only routes
 async def get_current_seller(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     if not current_user.is_seller:
         raise HTTPException(
             status_code=403,
             detail="Seller privileges required"
         )
     return current_user
+
+# Dependency for admin-only routes (users listed in ADMIN_USER_IDS)
+async def get_current_admin(
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
+    if current_user.id not in ADMIN_USER_IDS:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+async def is_admin_token(token: str) -> bool:
+    """
+    Whether ``token`` authenticates an admin, for checks outside dependencies
+    """
+    try:
+        principal = await get_current_user(token)
+    except HTTPException:
+        return False
+    return principal.id in ADMIN_USER_IDS
+
+async def client_id_for_token(token: str) -> Optional[str]:
+    """
+    The user id a valid, unrevoked ``token`` was issued to, or None, for
+    per-client limits applied outside dependencies. Admission runs before
+    any pool slot is held, so this never touches the database: a deleted
+    user's token is still limited under its id, then refused by the route.
+    """
+    try:
+        payload = _decode_token(token)
+    except HTTPException:
+        return None
+    user_id = payload["sub"]
+    if revocation_list.is_revoked(payload.get("jti"), user_id, _issued_at_ns(payload)):
+        return None
+    return user_id
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import datetime
 from ..models import Review, Product
-from ..config import get_db
+from ..config import get_async_db
+from ..utils.pagination import paginate, next_cursor
+from ..services.review_stats import review_stats_update
+from ..services.response_cache import response_cache, product_tag, reviews_tag, PRODUCTS_TAG
 from pydantic import BaseModel, Field
 import uuid
 
@@ -28,14 +32,14 @@ class ReviewResponse(BaseModel):
 @router.post("/", response_model=ReviewResponse)
 async def create_review(
     review: ReviewCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new review for a product
     """
     try:
         # Verify product exists
-        product = db.query(Product).filter(Product.id == review.product_id).first()
+        product = await db.get(Product, review.product_id)
         if not product:
             raise HTTPException(
                 status_code=404,
@@ -51,15 +55,21 @@ async def create_review(
             comment=review.comment
         )
 
-        # Save to database
+        # Save to database, updating the product's rating aggregates in the
+        # same transaction
         db.add(db_review)
-        db.commit()
-        db.refresh(db_review)
+        await db.execute(review_stats_update(review.product_id, review.rating, 1))
+        await db.commit()
+        await db.refresh(db_review)
+        # The review list and the product's inline rating stats changed
+        await response_cache.ainvalidate(reviews_tag(review.product_id), product_tag(review.product_id), PRODUCTS_TAG)
 
         return db_review
 
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error creating review: {str(e)}"
@@ -68,38 +78,53 @@ async def create_review(
 @router.get("/product/{product_id}", response_model=List[ReviewResponse])
 async def list_product_reviews(
     product_id: str,
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db)
+    request: Request,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    List all reviews for a specific product
+    List all reviews for a specific product, newest first.
+
+    Pass the X-Next-Cursor header of one page as ``cursor`` to fetch the next;
+    ``skip`` is still accepted for offset-based clients.
     """
-    # Verify product exists
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=404,
-            detail="Product not found"
+    async def render():
+        # Verify product exists
+        product = await db.get(Product, product_id)
+        if not product:
+            raise HTTPException(
+                status_code=404,
+                detail="Product not found"
+            )
+
+        result = await db.execute(
+            paginate(
+                select(Review).where(Review.product_id == product_id),
+                Review.created_at,
+                Review.id,
+                limit,
+                cursor=cursor,
+                skip=skip
+            )
         )
+        reviews = list(result.scalars().all())
+        next_page = next_cursor(reviews, limit)
+        headers = {"X-Next-Cursor": next_page} if next_page else {}
+        return [ReviewResponse.model_validate(review) for review in reviews], headers
 
-    reviews = db.query(Review)\
-        .filter(Review.product_id == product_id)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    
-    return reviews
+    return await response_cache.respond(request, [reviews_tag(product_id)], render)
 
 @router.get("/{review_id}", response_model=ReviewResponse)
 async def get_review(
     review_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific review by ID
     """
-    review = db.query(Review).filter(Review.id == review_id).first()
+    review = await db.get(Review, review_id)
     if not review:
         raise HTTPException(
             status_code=404,
@@ -110,12 +135,12 @@ async def get_review(
 @router.delete("/{review_id}")
 async def delete_review(
     review_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a review (owner or admin only)
     """
-    review = db.query(Review).filter(Review.id == review_id).first()
+    review = await db.get(Review, review_id)
     if not review:
         raise HTTPException(
             status_code=404,
@@ -125,6 +150,9 @@ async def delete_review(
     # TODO: Add authorization check here
     # Only allow review owner or admin to delete
 
-    db.delete(review)
-    db.commit()
+    await db.delete(review)
+    if review.rating is not None and 1 <= review.rating <= 5:
+        await db.execute(review_stats_update(review.product_id, review.rating, -1))
+    await db.commit()
+    await response_cache.ainvalidate(reviews_tag(review.product_id), product_tag(review.product_id), PRODUCTS_TAG)
     return {"message": "Review deleted successfully"}
@@ -1,18 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Literal, Optional, Tuple
+import mimetypes
 import os
 from datetime import datetime
-from ..models import Product, User
-from ..config import get_db, UPLOAD_DIR
-from ..utils.encryption import encrypt_data, decrypt_data
-from ..services.ai_classifier import classifier
+from ..models import Product, User, ModerationJob
+from ..config import get_async_db, UPLOAD_DIR, MAX_UPLOAD_SIZE, BULK_IMPORT_MAX_BYTES
+from ..utils.storage import (
+    save_encrypted_upload,
+    remove_file,
+    open_encrypted,
+    iter_decrypted,
+    read_decrypted,
+    UploadTooLarge
+)
+from ..services.image_cache import image_cache
+from ..services.image_pipeline import image_pipeline
+from ..services.search_index import search_backend
+from ..services.catalog_facets import facet_key, facet_updates, facet_summary
+from ..services.bulk_import import (
+    spool_body,
+    read_spool,
+    parse_csv,
+    parse_ndjson,
+    import_listings,
+    export_listings
+)
+from ..services.response_cache import (
+    response_cache,
+    etag_matches,
+    product_tag,
+    reviews_tag,
+    PRODUCTS_TAG
+)
+from ..utils.pagination import paginate, next_cursor
+from .auth import get_current_user
+from ..services.moderation_queue import enqueue_job, queue_stats
 from pydantic import BaseModel, Field
 import shutil
 import uuid
 
 router = APIRouter()
 
+ImageVariant = Literal["thumbnail", "card", "full"]
+
+SORT_COLUMNS = {
+    "created_at": Product.created_at,
+    "price": Product.price,
+    "rating": Product.rating_average,
+}
+
 class ProductCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     description: str = Field(..., min_length=10)
@@ -26,33 +66,75 @@ class ProductResponse(BaseModel):
     price: float
     category: Optional[str]
     image_path: Optional[str]
+    thumbnail_path: Optional[str] = None
+    card_path: Optional[str] = None
+    # Link to the decrypted image in the variant the endpoint chose
+    image_url: Optional[str] = None
     commission: float
     seller_id: str
+    status: str
+    flags: Optional[List[str]] = None
     created_at: datetime
+    review_count: int = 0
+    rating_sum: int = 0
+    rating_average: float = 0.0
+    # Number of reviews per star rating, keyed "1".."5"
+    rating_histogram: Dict[str, int] = {}
+
+    class Config:
+        from_attributes = True
+
+def _image_file(product: Product, variant: str) -> Optional[str]:
+    """
+    Stored file of an image variant, falling back to the full image while
+    the derivatives are still being rendered
+    """
+    if variant == "thumbnail" and product.thumbnail_path:
+        return product.thumbnail_path
+    if variant == "card" and product.card_path:
+        return product.card_path
+    return product.image_path
+
+def _product_response(request: Request, product: Product, variant: str) -> ProductResponse:
+    result = ProductResponse.model_validate(product)
+    if product.image_path:
+        url = request.app.url_path_for("get_product_image", product_id=product.id)
+        result.image_url = f"{url}?variant={variant}"
+    return result
+
+class ModerationJobResponse(BaseModel):
+    id: str
+    product_id: str
+    status: str
+    attempts: int
+    last_error: Optional[str]
+    next_attempt_at: Optional[datetime]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
 
     class Config:
         from_attributes = True
 
 @router.post("/", response_model=ProductResponse)
 async def create_product(
+    request: Request,
     name: str = Form(...),
     description: str = Form(...),
     price: float = Form(...),
     image: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Create a new product listing with optional image upload
+    Create a new product listing with optional image upload.
+
+    The listing is stored as pending and published once the moderation
+    worker has classified it; poll GET /{product_id}/moderation for progress.
+    The image is re-encoded into thumbnail/card/full derivatives in the
+    background, independently of this request.
     """
+    file_path = None
     try:
-        # AI Classification and safety check
-        classification = classifier.classify_product(description)
-        if not classification["is_safe"]:
-            raise HTTPException(
-                status_code=400,
-                detail="Content flagged as potentially unsafe"
-            )
-
         # Calculate commission (2.5%)
         commission = price * 0.025
 
@@ -62,9 +144,10 @@ async def create_product(
             name=name,
             description=description,
             price=price,
-            category=classification["category"],
             commission=commission,
-            seller_id="temp_seller"  # Replace with actual seller ID from auth
+            seller_id="temp_seller",  # Replace with actual seller ID from auth
+            status="pending",
+            flags=[]
         )
 
         # Handle image upload if provided
@@ -74,73 +157,394 @@ async def create_product(
             file_name = f"{product.id}{file_ext}"
             file_path = os.path.join(UPLOAD_DIR, file_name)
 
-            # Read and encrypt image data
-            image_data = await image.read()
-            encrypted_data = encrypt_data(image_data)
-
-            # Save encrypted image
-            with open(file_path, "wb") as f:
-                f.write(encrypted_data)
+            # Stream, encrypt and save the image chunk by chunk
+            try:
+                await save_encrypted_upload(image, file_path, MAX_UPLOAD_SIZE)
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
 
             product.image_path = file_name
 
-        # Save to database
+        # Save to database together with its moderation job
         db.add(product)
-        db.commit()
-        db.refresh(product)
+        enqueue_job(db, product.id)
+        await db.commit()
+        await db.refresh(product)
+
+        search_backend.add(product)
+        if product.image_path:
+            image_pipeline.submit(product.id, product.image_path)
 
-        return product
+        return _product_response(request, product, "full")
 
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        # Don't leave an orphaned image behind if the insert failed
+        if file_path:
+            await remove_file(file_path)
         raise HTTPException(
             status_code=500,
             detail=f"Error creating product: {str(e)}"
         )
 
+@router.post("/bulk")
+async def bulk_import_products(request: Request):
+    """
+    Import many listings from an NDJSON (default) or CSV (Content-Type:
+    text/csv) request body with name, description, price and optional
+    category per row.
+
+    The body is spooled to a temporary file, then rows are classified and
+    inserted in batches while the response streams one NDJSON result per
+    row followed by a summary line. Bodies over BULK_IMPORT_MAX_BYTES are
+    refused with 413.
+    """
+    try:
+        body = read_spool(await spool_body(request.stream(), BULK_IMPORT_MAX_BYTES))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if "csv" in request.headers.get("content-type", ""):
+        rows = parse_csv(body)
+    else:
+        rows = parse_ndjson(body)
+    return StreamingResponse(
+        import_listings(rows, "temp_seller"),  # Replace with actual seller ID from auth
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/export")
+async def export_products(
+    request: Request,
+    seller_id: str,
+    token: Optional[str] = None
+):
+    """
+    Stream a seller's published listings as NDJSON, oldest first. With the
+    seller's own ``token`` their pending and rejected listings are included.
+    """
+    include_unpublished = False
+    if token is not None:
+        principal = await get_current_user(token)
+        if principal.id != seller_id:
+            raise HTTPException(
+                status_code=403,
+                detail="Not authorized to export this seller's unpublished listings"
+            )
+        include_unpublished = True
+
+    return StreamingResponse(
+        export_listings(
+            seller_id,
+            lambda product: jsonable_encoder(_product_response(request, product, "full")),
+            include_unpublished
+        ),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="products-{seller_id}.ndjson"'}
+    )
+
 @router.get("/", response_model=List[ProductResponse])
 async def list_products(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db)
+    request: Request,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    image_variant: ImageVariant = "thumbnail",
+    category: Optional[str] = None,
+    seller_id: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    sort_by: Literal["created_at", "price", "rating"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List published products, newest first unless ``sort_by``/``order`` say
+    otherwise, optionally filtered by category, seller, price and date range.
+
+    Pass the X-Next-Cursor header of one page as ``cursor`` to fetch the next
+    (with the same filters and sort); ``skip`` is still accepted for
+    offset-based clients. Each ``image_url`` points at the ``image_variant``
+    derivative (the thumbnail by default). Responses are cached until a
+    listing changes.
+    """
+    return await response_cache.respond(
+        request,
+        [PRODUCTS_TAG],
+        lambda: _list_products(
+            request, db, cursor, skip, limit, image_variant, category, seller_id,
+            min_price, max_price, created_after, created_before, sort_by, order
+        )
+    )
+
+async def _list_products(
+    request: Request,
+    db: AsyncSession,
+    cursor: Optional[str],
+    skip: Optional[int],
+    limit: int,
+    image_variant: str,
+    category: Optional[str],
+    seller_id: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    created_after: Optional[datetime],
+    created_before: Optional[datetime],
+    sort_by: str,
+    order: str
+) -> Tuple[List[ProductResponse], Dict[str, str]]:
+    query = select(Product).where(Product.status == "published")
+    if category is not None:
+        query = query.where(Product.category == category)
+    if seller_id is not None:
+        query = query.where(Product.seller_id == seller_id)
+    if min_price is not None:
+        query = query.where(Product.price >= min_price)
+    if max_price is not None:
+        query = query.where(Product.price <= max_price)
+    if created_after is not None:
+        query = query.where(Product.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(Product.created_at < created_before)
+
+    sort_column = SORT_COLUMNS[sort_by]
+    result = await db.execute(
+        paginate(
+            query,
+            sort_column,
+            Product.id,
+            limit,
+            cursor=cursor,
+            skip=skip,
+            descending=order == "desc"
+        )
+    )
+    products = list(result.scalars().all())
+    cursor = next_cursor(products, limit, sort_column.key)
+    headers = {"X-Next-Cursor": cursor} if cursor else {}
+    return [_product_response(request, product, image_variant) for product in products], headers
+
+@router.get("/search", response_model=List[ProductResponse])
+async def search_products(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    image_variant: ImageVariant = "thumbnail",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Ranked keyword search over published listings' name, description and category
+    """
+    products = await search_backend.search(db, q, limit, offset=skip)
+    return [_product_response(request, product, image_variant) for product in products]
+
+@router.get("/facets")
+async def product_facets(
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    List all products with pagination
+    Published listing counts per category and a price histogram (of one
+    category if given), served from the precomputed facet counts
+    """
+    return await facet_summary(db, category)
+
+@router.get("/moderation/queue")
+async def moderation_queue_stats(
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    products = db.query(Product).offset(skip).limit(limit).all()
-    return products
+    Moderation queue depth and job latency
+    """
+    return await queue_stats(db)
+
+async def _viewable(product: Product, token: Optional[str]) -> bool:
+    """
+    Published listings are public; pending and rejected ones are only
+    shown to their seller
+    """
+    if product.status == "published":
+        return True
+    if token is None:
+        return False
+    try:
+        principal = await get_current_user(token)
+    except HTTPException:
+        return False
+    return principal.id == product.seller_id
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    image_variant: ImageVariant = "full",
+    token: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get a specific product by ID
+    Get a specific product by ID. Listings that aren't published are only
+    found with their seller's ``token``.
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    async def render():
+        product = await db.get(Product, product_id)
+        if not product or not await _viewable(product, token):
+            raise HTTPException(status_code=404, detail="Product not found")
+        return _product_response(request, product, image_variant), {}
+
+    if token is not None:
+        # A per-user view; keep it out of the shared response cache
+        return (await render())[0]
+    return await response_cache.respond(request, [product_tag(product_id)], render)
+
+def _parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive (start, end). Returns None
+    to serve the whole body (no header, multiple ranges or invalid syntax,
+    such as a last byte before the first).
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+    if not (start_text or end_text) or not all(text.isascii() and text.isdigit() for text in (start_text, end_text) if text):
+        return None
+    if start_text == "":
+        # Suffix range: the last N bytes (none for "-0": unsatisfiable)
+        suffix = int(end_text)
+        start, end = (max(size - suffix, 0), size - 1) if suffix else (size, size)
+    else:
+        start = int(start_text)
+        if end_text and int(end_text) < start:
+            return None
+        end = min(int(end_text), size - 1) if end_text else size - 1
+
+    if start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+@router.get("/{product_id}/image")
+async def get_product_image(
+    product_id: str,
+    request: Request,
+    variant: ImageVariant = "full",
+    token: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream a product's decrypted image, with Range and If-None-Match
+    support. Images of listings that aren't published need the seller's
+    ``token``.
+    """
+    product = await db.get(Product, product_id)
+    if product is not None and not await _viewable(product, token):
+        product = None
+    image_file = _image_file(product, variant) if product else None
+    if not image_file:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    file_path = os.path.join(UPLOAD_DIR, image_file)
+    try:
+        encrypted = await open_encrypted(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    headers = {
+        "ETag": encrypted.etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=86400"
+    }
+    if etag_matches(request.headers.get("if-none-match"), encrypted.etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(image_file)[0] or "application/octet-stream"
+
+    # Small images (and legacy single-token files) are decrypted whole and
+    # kept in memory; larger ones are streamed chunk by chunk
+    blob = None
+    if not encrypted.chunked or image_cache.accepts(encrypted.plaintext_size):
+        blob = image_cache.get(file_path, encrypted.etag)
+        if blob is None:
+            blob = await read_decrypted(encrypted)
+            image_cache.put(file_path, encrypted.etag, blob)
+
+    size = len(blob) if blob is not None else encrypted.plaintext_size
+    byte_range = _parse_range(request.headers.get("range"), size)
+    if_range = request.headers.get("if-range")
+    if byte_range is not None and if_range is not None and if_range != encrypted.etag:
+        byte_range = None
+
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(max(end - start + 1, 0))
+
+    if blob is not None:
+        return Response(
+            content=blob[start:end + 1],
+            status_code=status_code,
+            media_type=media_type,
+            headers=headers
+        )
+    return StreamingResponse(
+        iter_decrypted(encrypted, start, end),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
+
+@router.get("/{product_id}/moderation", response_model=ModerationJobResponse)
+async def get_moderation_status(
+    product_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the status of the latest moderation job for a product
+    """
+    result = await db.execute(
+        select(ModerationJob)
+        .where(ModerationJob.product_id == product_id)
+        .order_by(ModerationJob.created_at.desc())
+        .limit(1)
+    )
+    job = result.scalar_one_or_none()
+    if not job:
+        raise HTTPException(status_code=404, detail="Moderation job not found")
+    return job
 
 @router.delete("/{product_id}")
 async def delete_product(
     product_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a product (seller only)
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    # Delete associated image if exists
-    if product.image_path:
-        file_path = os.path.join(UPLOAD_DIR, product.image_path)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    # Delete the associated image and its derivatives
+    for image_file in (product.image_path, product.thumbnail_path, product.card_path):
+        if image_file:
+            file_path = os.path.join(UPLOAD_DIR, image_file)
+            image_cache.invalidate(file_path)
+            await remove_file(file_path)
 
-    db.delete(product)
-    db.commit()
+    for statement in facet_updates(db, facet_key(product), None):
+        await db.execute(statement)
+    await db.delete(product)
+    await db.commit()
+    search_backend.remove(product_id)
+    await response_cache.ainvalidate(PRODUCTS_TAG, product_tag(product_id), reviews_tag(product_id))
     return {"message": "Product deleted successfully"}
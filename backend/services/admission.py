@@ -0,0 +1,345 @@
+import asyncio
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from starlette.responses import JSONResponse
+from ..config import (
+    ADMISSION_ENABLED,
+    ADMISSION_HEAVY_ROUTES,
+    ADMISSION_EXEMPT_PATHS,
+    ADMISSION_HEAVY_CONCURRENCY,
+    ADMISSION_HEAVY_QUEUE_SIZE,
+    ADMISSION_HEAVY_MAX_WAIT,
+    ADMISSION_HEAVY_RATE_PER_MINUTE,
+    ADMISSION_HEAVY_BURST,
+    ADMISSION_STANDARD_CONCURRENCY,
+    ADMISSION_STANDARD_QUEUE_SIZE,
+    ADMISSION_STANDARD_MAX_WAIT,
+    ADMISSION_STANDARD_RATE_PER_MINUTE,
+    ADMISSION_STANDARD_BURST,
+    ADMISSION_MAX_CLIENTS
+)
+from ..utils.metrics import metrics, route_template, SPAN_BUCKETS
+
+ADMISSION_REQUESTS = metrics.counter(
+    "zuno_admission_requests_total",
+    "Admission decisions by pool: admitted, queued, shed_<reason> or rate_limited",
+    ["pool", "outcome"]
+)
+ADMISSION_WAIT_SECONDS = metrics.histogram(
+    "zuno_admission_wait_seconds",
+    "Time admitted requests spent queued for a slot",
+    ["pool"],
+    buckets=SPAN_BUCKETS
+)
+
+class AdmissionRejected(Exception):
+    """
+    A request turned away before running: 503 when its pool is saturated,
+    429 when the client's rate limit is exhausted
+    """
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+class ConcurrencyPool:
+    """
+    At most ``concurrency`` requests run at once; up to ``queue_size`` more
+    wait in FIFO order. A waiter that gets no slot within ``max_wait``
+    seconds is shed, and one whose predicted wait (queue position times the
+    moving average service time, spread over the slots) already exceeds
+    ``max_wait`` is shed on arrival rather than after the wait.
+
+    Used from one event loop; a freed slot is handed straight to the next
+    waiter so later arrivals can't overtake the queue.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.concurrency = max(concurrency, 1)
+        self.queue_size = max(queue_size, 0)
+        self.max_wait = max_wait
+        self.active = 0
+        # Moving average of how long a request holds its slot
+        self.service_time: Optional[float] = None
+        self.counts: Counter = Counter()
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self, position: int) -> float:
+        """Seconds until the request at queue ``position`` (1-based) gets a slot"""
+        if self.service_time is None:
+            return 0.0
+        return self.service_time * position / self.concurrency
+
+    def _record(self, outcome: str):
+        self.counts[outcome] += 1
+        ADMISSION_REQUESTS.inc(self.name, outcome)
+
+    def _shed(self, reason: str) -> AdmissionRejected:
+        self._record(f"shed_{reason}")
+        retry_after = self.estimated_wait(self.waiting + 1) or self.max_wait
+        return AdmissionRejected(503, f"Server busy ({reason})", retry_after)
+
+    async def acquire(self):
+        """
+        Wait for a slot, raising AdmissionRejected if none comes in time.
+        Every successful acquire must be paired with ``release``.
+        """
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self._record("admitted")
+            return
+
+        if self.waiting >= self.queue_size:
+            raise self._shed("queue_full")
+        if self.estimated_wait(self.waiting + 1) > self.max_wait:
+            raise self._shed("deadline")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._record("queued")
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over as the wait ended: pass it on
+                self._hand_over()
+            elif future in self._waiters:
+                # A release may already have popped (and skipped) the
+                # cancelled future before this task resumed
+                self._waiters.remove(future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed("timeout")
+            raise
+        self._record("admitted")
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start, self.name)
+
+    def release(self, held_seconds: float):
+        """Free the slot held for ``held_seconds``"""
+        self.service_time = held_seconds if self.service_time is None \
+            else 0.8 * self.service_time + 0.2 * held_seconds
+        self._hand_over()
+
+    def _hand_over(self):
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(True)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "max_wait_seconds": self.max_wait,
+            "active": self.active,
+            "waiting": self.waiting,
+            "service_time_ms": round(self.service_time * 1000, 2) if self.service_time is not None else None,
+            **self.counts
+        }
+
+class RateLimiter:
+    """
+    Token bucket per client: ``rate_per_minute`` tokens refill continuously
+    up to ``burst``. Buckets of the least recently seen clients are dropped
+    beyond ``max_clients`` (a dropped client starts again with a full bucket).
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_clients: int):
+        self.rate = rate_per_minute / 60
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def take(self, client: str) -> float:
+        """
+        Take a token for ``client``. Returns 0 if one was available, otherwise
+        the seconds until the next one is.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> Dict:
+        return {
+            "rate_per_minute": self.rate * 60,
+            "burst": self.burst,
+            "clients": len(self._buckets)
+        }
+
+class AdmissionController:
+    """
+    Sorts requests into pools by route, applies the client's rate limit for
+    that pool and then waits for a slot in it. Requests to ``heavy_routes``
+    ("METHOD /template") go to the "heavy" pool, the rest to "standard";
+    paths under ``exempt_paths`` bypass admission.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        heavy_routes: Iterable[str],
+        exempt_paths: Iterable[str],
+        pools: Dict[str, ConcurrencyPool],
+        limiters: Dict[str, RateLimiter]
+    ):
+        self.enabled = enabled
+        self.heavy_routes = set(heavy_routes)
+        self.exempt_paths = tuple(path.rstrip("/") for path in exempt_paths)
+        self.pools = pools
+        self.limiters = limiters
+
+    def pool_for(self, method: str, route: str, path: str) -> Optional[ConcurrencyPool]:
+        """The pool a request runs in, or None if it is exempt"""
+        for exempt in self.exempt_paths:
+            if path == exempt or path.startswith(exempt + "/"):
+                return None
+        return self.pools["heavy" if f"{method} {route}" in self.heavy_routes else "standard"]
+
+    async def admit(self, pool: ConcurrencyPool, client: Optional[str] = None):
+        """
+        Rate-limit ``client`` (if known) and acquire a slot in ``pool``;
+        raises AdmissionRejected otherwise
+        """
+        limiter = self.limiters.get(pool.name)
+        if client is not None and limiter is not None and limiter.enabled:
+            wait = limiter.take(client)
+            if wait > 0:
+                pool._record("rate_limited")
+                raise AdmissionRejected(429, "Rate limit exceeded", wait)
+        await pool.acquire()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "pools": {
+                name: {**pool.stats(), "rate_limit": self.limiters[name].stats()}
+                for name, pool in self.pools.items()
+            }
+        }
+
+# Create a global instance
+admission_controller = AdmissionController(
+    ADMISSION_ENABLED,
+    ADMISSION_HEAVY_ROUTES,
+    ADMISSION_EXEMPT_PATHS,
+    pools={
+        "heavy": ConcurrencyPool("heavy", ADMISSION_HEAVY_CONCURRENCY, ADMISSION_HEAVY_QUEUE_SIZE, ADMISSION_HEAVY_MAX_WAIT),
+        "standard": ConcurrencyPool("standard", ADMISSION_STANDARD_CONCURRENCY, ADMISSION_STANDARD_QUEUE_SIZE, ADMISSION_STANDARD_MAX_WAIT)
+    },
+    limiters={
+        "heavy": RateLimiter(ADMISSION_HEAVY_RATE_PER_MINUTE, ADMISSION_HEAVY_BURST, ADMISSION_MAX_CLIENTS),
+        "standard": RateLimiter(ADMISSION_STANDARD_RATE_PER_MINUTE, ADMISSION_STANDARD_BURST, ADMISSION_MAX_CLIENTS)
+    }
+)
+
+def _pool_gauge(attribute: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    return lambda: {(name,): getattr(pool, attribute) for name, pool in admission_controller.pools.items()}
+
+ADMISSION_ACTIVE = metrics.gauge(
+    "zuno_admission_active",
+    "Requests holding a slot in each admission pool",
+    ["pool"],
+    function=_pool_gauge("active")
+)
+ADMISSION_WAITING = metrics.gauge(
+    "zuno_admission_waiting",
+    "Requests queued for a slot in each admission pool",
+    ["pool"],
+    function=_pool_gauge("waiting")
+)
+
+def _request_token(scope) -> Optional[str]:
+    """The access token from the ``token`` query parameter or a Bearer header"""
+    from urllib.parse import parse_qs
+
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if query.get("token"):
+        return query["token"][0]
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+    return None
+
+class AdmissionMiddleware:
+    """
+    Runs each request through the admission controller. Rejected requests
+    get an immediate JSON error with ``Retry-After`` instead of queueing
+    behind work they would time out waiting for. Clients are identified by
+    ``identify(token)`` (the user id the token was issued to, or None; it
+    must not wait on the database pools being guarded) for rate limits.
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: List,
+        identify: Callable[[str], Awaitable[Optional[str]]],
+        controller: AdmissionController = admission_controller
+    ):
+        self.app = app
+        self.routes = routes
+        self.identify = identify
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        pool = self.controller.pool_for(scope["method"], route_template(self.routes, scope), scope["path"])
+        if pool is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = None
+        limiter = self.controller.limiters.get(pool.name)
+        if limiter is not None and limiter.enabled:
+            token = _request_token(scope)
+            if token:
+                client = await self.identify(token)
+
+        try:
+            await self.controller.admit(pool, client)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                {"detail": e.reason},
+                status_code=e.status_code,
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release(time.perf_counter() - start)
@@ -1,111 +1,283 @@
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-from langchain.llms import HuggingFacePipeline
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-import torch
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import os
-from ..config import AI_MODEL_PATH, AI_MODEL_CACHE_DIR
+from ..config import (
+    AI_MODEL_PATH,
+    AI_MODEL_CACHE_DIR,
+    AI_MODERATION_MODEL,
+    AI_GENERATION_MODEL,
+    AI_INFERENCE_BACKEND,
+    AI_SHARED_WEIGHTS,
+    AI_BATCH_MAX_SIZE,
+    AI_BATCH_MAX_WAIT_MS,
+    AI_INFERENCE_WORKERS,
+    AI_ESCALATION_THRESHOLD,
+    FRAUD_TERMS,
+    CLASSIFICATION_CACHE_SIZE,
+    CLASSIFICATION_CACHE_TTL,
+    CLASSIFICATION_CACHE_PERSIST,
+    CLASSIFICATION_CACHE_PERSIST_SIZE
+)
+from .batching import BatchingEngine
+from .classification_cache import ClassificationCache
+from .inference_backends import effective_backend, load_text_classifier
+from .model_registry import model_registry
+from .screening import ScreeningMetrics, TermMatcher
+from ..utils.metrics import metrics, span, SPAN_BUCKETS
+
+CLASSIFIER_SECONDS = metrics.histogram(
+    "zuno_classifier_duration_seconds",
+    "Model inference time per classified batch",
+    ["model"],
+    buckets=SPAN_BUCKETS
+)
+CLASSIFIER_DESCRIPTIONS = metrics.counter(
+    "zuno_classifier_descriptions_total",
+    "Descriptions sent through each model",
+    ["model"]
+)
 
 logger = logging.getLogger(__name__)
 
+# torch, transformers and langchain are imported inside the loaders below so
+# that importing this module (and therefore main.py) stays cheap.
+
 class AIClassifier:
     def __init__(self):
-        self.initialize_models()
-        self.setup_langchain()
+        self.registry = model_registry
+        self.registry.register("category", self.load_category_classifier)
+        self.registry.register("moderation", self.load_content_classifier)
+        self.registry.register("content_chain", self.load_content_chain)
+        self.batcher = BatchingEngine(
+            self.classify_batch,
+            max_batch_size=AI_BATCH_MAX_SIZE,
+            max_wait_ms=AI_BATCH_MAX_WAIT_MS,
+            workers=AI_INFERENCE_WORKERS
+        )
+        self.fraud_terms = TermMatcher(FRAUD_TERMS)
+        self.escalation_threshold = AI_ESCALATION_THRESHOLD
+        self.screening = ScreeningMetrics()
+        self.cache = ClassificationCache(
+            model_ids=self.model_ids(),
+            max_entries=CLASSIFICATION_CACHE_SIZE,
+            ttl_seconds=CLASSIFICATION_CACHE_TTL,
+            persist_path=(
+                os.path.join(AI_MODEL_CACHE_DIR, "classification_cache.sqlite3")
+                if CLASSIFICATION_CACHE_PERSIST else None
+            ),
+            persist_max_entries=CLASSIFICATION_CACHE_PERSIST_SIZE
+        )
 
-    def initialize_models(self):
-        """Initialize the classification model"""
-        try:
-            # Product category classifier
-            self.category_classifier = pipeline(
-                "text-classification",
-                model=AI_MODEL_PATH,
-                cache_dir=AI_MODEL_CACHE_DIR
-            )
+    def model_ids(self) -> List[str]:
+        """Identifiers of every model and screening setting that shapes a classification result"""
+        return [
+            AI_MODEL_PATH,
+            AI_MODERATION_MODEL,
+            AI_GENERATION_MODEL,
+            # What actually runs: an "onnx" setting without ONNX Runtime
+            # produces quantized results
+            effective_backend(AI_INFERENCE_BACKEND),
+            f"escalation={self.escalation_threshold}",
+            f"terms={','.join(self.fraud_terms.terms)}"
+        ]
 
-            # Content moderation classifier
-            self.content_classifier = pipeline(
-                "text-classification",
-                model="facebook/roberta-hate-speech-dynabench-r4-target",
-                cache_dir=AI_MODEL_CACHE_DIR
-            )
-        except Exception as e:
-            logger.error(f"Error initializing AI models: {e}")
-            # Fallback to simpler classification if needed
-            self.category_classifier = None
-            self.content_classifier = None
+    @property
+    def category_classifier(self):
+        return self.registry.get("category")
+
+    @property
+    def content_classifier(self):
+        return self.registry.get("moderation")
+
+    @property
+    def content_chain(self):
+        return self.registry.get("content_chain")
+
+    def load_category_classifier(self):
+        """Load the product category classifier"""
+        return load_text_classifier(AI_MODEL_PATH, AI_INFERENCE_BACKEND)
 
-    def setup_langchain(self):
+    def load_content_classifier(self):
+        """Load the content moderation classifier"""
+        return load_text_classifier(AI_MODERATION_MODEL, AI_INFERENCE_BACKEND)
+
+    def load_content_chain(self):
         """Setup LangChain for advanced content analysis"""
-        try:
-            # Initialize LangChain with our model
-            model = HuggingFacePipeline(
-                pipeline=pipeline(
-                    "text-generation",
-                    model="gpt2",
-                    cache_dir=AI_MODEL_CACHE_DIR
-                )
-            )
+        from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+        from langchain.llms import HuggingFacePipeline
+        from langchain.chains import LLMChain
+        from langchain.prompts import PromptTemplate
 
-            # Create content analysis prompt
-            self.content_prompt = PromptTemplate(
-                input_variables=["text"],
-                template="Analyze this marketplace listing for potential issues:\n{text}\nPotential issues:"
+        # Initialize LangChain with our model
+        if AI_SHARED_WEIGHTS:
+            from .shared_weights import load_shared_pipeline
+            generator = load_shared_pipeline(AI_GENERATION_MODEL, "text-generation")
+        else:
+            generator = pipeline(
+                "text-generation",
+                model=AutoModelForCausalLM.from_pretrained(AI_GENERATION_MODEL, cache_dir=AI_MODEL_CACHE_DIR),
+                tokenizer=AutoTokenizer.from_pretrained(AI_GENERATION_MODEL, cache_dir=AI_MODEL_CACHE_DIR)
             )
+        model = HuggingFacePipeline(pipeline=generator)
 
-            # Create the chain
-            self.content_chain = LLMChain(
-                llm=model,
-                prompt=self.content_prompt
-            )
-        except Exception as e:
-            logger.error(f"Error setting up LangChain: {e}")
-            self.content_chain = None
+        # Create content analysis prompt
+        content_prompt = PromptTemplate(
+            input_variables=["text"],
+            template="Analyze this marketplace listing for potential issues:\n{text}\nPotential issues:"
+        )
+
+        # Create the chain
+        return LLMChain(
+            llm=model,
+            prompt=content_prompt
+        )
 
     def classify_product(self, description: str) -> Dict:
         """
         Classify product description into categories and check for potential issues
         """
+        return self.classify_batch([description])[0]
+
+    async def classify_product_async(self, description: str) -> Dict:
+        """
+        Classify a product description through the micro-batching engine
+        """
+        # A miss is counted once, when the batch worker looks the description up
+        cached = self.cache.get(description, record_miss=False)
+        if cached is not None:
+            return cached
+        return await self.batcher.submit(description)
+
+    def classify_batch(self, descriptions: List[str]) -> List[Dict]:
+        """
+        Classify several product descriptions, serving repeats from the cache
+        and running the models once on the remaining batch
+        """
+        results: List[Optional[Dict]] = [self.cache.get(d) for d in descriptions]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            fresh, complete = self._screen([descriptions[i] for i in misses])
+            for i, result, cacheable in zip(misses, fresh, complete):
+                # A verdict reached without one of its models is a default,
+                # not a classification; don't keep it past this request
+                if cacheable:
+                    self.cache.set(descriptions[i], result)
+                results[i] = result
+        return results
+
+    def _run_models(self, descriptions: List[str]) -> List[Dict]:
+        """
+        Classify a batch without consulting the cache
+        """
+        return self._screen(descriptions)[0]
+
+    def _screen(self, descriptions: List[str]) -> Tuple[List[Dict], List[bool]]:
+        """
+        Screen a batch through increasingly expensive tiers: deterministic
+        rules, then the small classifiers, and only escalate descriptions the
+        classifiers are unsure about to the generative model.
+
+        Also returns, per description, whether every model its verdict
+        needed was available.
+        """
+        complete = [True] * len(descriptions)
         try:
-            results = {
-                "category": "unknown",
-                "confidence": 0.0,
-                "flags": [],
-                "is_safe": True
-            }
-
-            # Perform category classification
-            if self.category_classifier:
-                category_result = self.category_classifier(description)
-                if category_result:
-                    results["category"] = category_result[0]["label"]
-                    results["confidence"] = category_result[0]["score"]
-
-            # Check content safety
-            if self.content_classifier:
-                safety_result = self.content_classifier(description)
-                if safety_result:
-                    results["is_safe"] = safety_result[0]["label"] == "LABEL_0"
-                    if not results["is_safe"]:
-                        results["flags"].append("potentially_unsafe_content")
-
-            # Perform deeper content analysis with LangChain
-            if self.content_chain:
-                analysis = self.content_chain.run(description)
-                if "suspicious" in analysis.lower() or "scam" in analysis.lower():
-                    results["flags"].append("potential_fraud")
-
-            return results
+            results = [
+                {
+                    "category": "unknown",
+                    "confidence": 0.0,
+                    "flags": [],
+                    "is_safe": True
+                }
+                for _ in descriptions
+            ]
+            batch_size = len(descriptions)
+            # Moderation confidence per description; None means no verdict
+            moderation_scores: List[Optional[float]] = [None] * batch_size
+
+            # Tier 1: deterministic fraud rules. A match doesn't flag the
+            # listing by itself (only the generative model sets
+            # potential_fraud); it forces escalation
+            with self.screening.tier("rules"):
+                rule_matches = [self.fraud_terms.matches(description) for description in descriptions]
+
+            # Tier 2: category and moderation classifiers
+            with self.screening.tier("classifiers"):
+                category_classifier = self.category_classifier
+                if not category_classifier:
+                    complete = [False] * batch_size
+                else:
+                    with span(CLASSIFIER_SECONDS, "category"):
+                        category_results = category_classifier(
+                            descriptions,
+                            batch_size=batch_size,
+                            truncation=True
+                        )
+                    CLASSIFIER_DESCRIPTIONS.inc("category", amount=batch_size)
+                    for result, category_result in zip(results, category_results):
+                        if category_result:
+                            result["category"] = category_result["label"]
+                            result["confidence"] = category_result["score"]
+
+                content_classifier = self.content_classifier
+                if not content_classifier:
+                    complete = [False] * batch_size
+                else:
+                    with span(CLASSIFIER_SECONDS, "moderation"):
+                        safety_results = content_classifier(
+                            descriptions,
+                            batch_size=batch_size,
+                            truncation=True
+                        )
+                    CLASSIFIER_DESCRIPTIONS.inc("moderation", amount=batch_size)
+                    for i, (result, safety_result) in enumerate(zip(results, safety_results)):
+                        if safety_result:
+                            moderation_scores[i] = safety_result["score"]
+                            result["is_safe"] = safety_result["label"] == "LABEL_0"
+                            if not result["is_safe"]:
+                                result["flags"].append("potentially_unsafe_content")
+
+            # Tier 3: generative analysis, only where earlier tiers are uncertain
+            uncertain = [
+                i for i in range(batch_size)
+                if rule_matches[i]
+                or moderation_scores[i] is None
+                or moderation_scores[i] < self.escalation_threshold
+            ]
+            if uncertain:
+                with self.screening.tier("generative"):
+                    content_chain = self.content_chain
+                    if not content_chain:
+                        for i in uncertain:
+                            complete[i] = False
+                    else:
+                        with span(CLASSIFIER_SECONDS, "content_chain"):
+                            analyses = content_chain.apply(
+                                [{"text": descriptions[i]} for i in uncertain]
+                            )
+                        CLASSIFIER_DESCRIPTIONS.inc("content_chain", amount=len(uncertain))
+                        for i, analysis in zip(uncertain, analyses):
+                            text = analysis[content_chain.output_key].lower()
+                            if "suspicious" in text or "scam" in text:
+                                results[i]["flags"].append("potential_fraud")
+
+            self.screening.record(
+                screened=batch_size,
+                rule_matches=sum(rule_matches),
+                escalated=len(uncertain)
+            )
+            return results, complete
         except Exception as e:
             logger.error(f"Error in product classification: {e}")
-            return {
-                "category": "unknown",
-                "confidence": 0.0,
-                "flags": ["classification_error"],
-                "is_safe": False
-            }
+            return [
+                {
+                    "category": "unknown",
+                    "confidence": 0.0,
+                    "flags": ["classification_error"],
+                    "is_safe": False
+                }
+                for _ in descriptions
+            ], [False] * len(descriptions)
 
     def detect_fraud(self, data: Dict) -> List[str]:
         """
@@ -120,9 +292,7 @@ class AIClassifier:
                 flags.append("suspicious_price")
 
             # Description analysis
-            description = data.get("description", "").lower()
-            suspicious_terms = ["free money", "guaranteed profit", "100% success"]
-            if any(term in description for term in suspicious_terms):
+            if self.fraud_terms.matches(data.get("description", "")):
                 flags.append("suspicious_description")
 
             # Additional checks can be added here
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from pydantic import BaseModel
+from ..config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL, ACCESS_TOKEN_EXPIRE_MINUTES
+
+class Principal(BaseModel):
+    """
+    The authenticated user as seen by route dependencies
+    """
+    id: str
+    is_seller: bool
+
+class TokenCache:
+    """
+    Size-bounded LRU of verified token -> principal.
+
+    An entry lives for at most ``ttl_seconds`` and never past the token's own
+    expiry. Entries are also indexed by user so that a change to a user (or
+    revoking their sessions) drops every cached token of theirs.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at < time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: Principal, token_expires_at: float):
+        expires_at = min(time.time() + self.ttl_seconds, token_expires_at)
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (expires_at, principal)
+            self._by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._by_user.get(entry[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[entry[1].id]
+
+    def invalidate_token(self, token: str):
+        with self._lock:
+            self._remove(token)
+
+    def invalidate_user(self, user_id: str):
+        with self._lock:
+            for token in list(self._by_user.get(user_id, ())):
+                self._remove(token)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions
+            }
+
+class RevocationList:
+    """
+    In-memory token revocation: single tokens by ``jti`` until they would
+    have expired anyway, and whole users by "issued at or before" cut-off
+    (in nanoseconds, like the tokens' ``iat_ns`` claim) until every token
+    issued before it (living at most ``token_lifetime`` seconds) has expired
+    """
+
+    def __init__(self, token_lifetime: float):
+        self.token_lifetime = token_lifetime
+        self._tokens: Dict[str, float] = {}
+        self._users: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def revoke_token(self, jti: str, expires_at: float):
+        with self._lock:
+            self._tokens[jti] = expires_at
+            self._purge()
+
+    def revoke_user(self, user_id: str):
+        """
+        Reject every token of this user issued up to now. The cut-off has
+        nanosecond resolution, so the login right after still gets through.
+        """
+        with self._lock:
+            self._users[user_id] = time.time_ns()
+            self._purge()
+
+    def is_revoked(self, jti: Optional[str], user_id: str, issued_at_ns: Optional[int]) -> bool:
+        with self._lock:
+            if jti is not None and jti in self._tokens:
+                return True
+            cutoff = self._users.get(user_id)
+            return cutoff is not None and (issued_at_ns is None or issued_at_ns <= cutoff)
+
+    def _purge(self):
+        now = time.time()
+        for jti in [jti for jti, expires_at in self._tokens.items() if expires_at < now]:
+            del self._tokens[jti]
+        # Tokens issued before these cut-offs have all expired
+        for user_id in [user_id for user_id, cutoff in self._users.items() if cutoff / 1e9 + self.token_lifetime < now]:
+            del self._users[user_id]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"revoked_tokens": len(self._tokens), "revoked_users": len(self._users)}
+
+# Create global instances
+token_cache = TokenCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+revocation_list = RevocationList(ACCESS_TOKEN_EXPIRE_MINUTES * 60)
@@ -0,0 +1,292 @@
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import insert, select
+from ..config import AsyncSessionLocal, BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_MAX_ROWS, UPLOAD_CHUNK_SIZE
+from ..models import ModerationJob, Product
+from ..utils.storage import UploadTooLarge
+from .ai_classifier import classifier
+from .catalog_facets import facet_count_updates, facet_key
+from .response_cache import response_cache, PRODUCTS_TAG
+from .search_index import search_backend
+
+logger = logging.getLogger(__name__)
+
+CSV_FIELDS = ("name", "description", "price", "category")
+
+class ListingRow(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    description: str = Field(..., min_length=10)
+    price: float = Field(..., gt=0)
+    category: Optional[str] = None
+
+async def spool_body(
+    chunks: AsyncIterator[bytes],
+    max_size: int,
+    max_memory: int = 8 * 1024 * 1024
+) -> BinaryIO:
+    """
+    Receive a request body into a temporary file (kept in memory up to
+    ``max_memory`` bytes). The body has to be read before a streaming
+    response starts: Starlette then listens for client disconnects on the
+    same receive channel and would swallow body chunks.
+
+    Raises UploadTooLarge as soon as the body exceeds ``max_size`` bytes.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(max_size)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+async def read_spool(spool: BinaryIO, chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    try:
+        while True:
+            chunk = spool.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split a byte stream into decoded lines, newline included. A leading
+    UTF-8 byte order mark (as spreadsheet exports write) is dropped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yield (row number, dict or error message) for each non-blank NDJSON line
+    """
+    row = 0
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row, f"Invalid JSON: {e}"
+            continue
+        yield row, record if isinstance(record, dict) else "Each line must be a JSON object"
+
+async def parse_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yield (row number, dict or error message) for each CSV record after the
+    header. Quoted fields may span lines.
+    """
+    header: Optional[List[str]] = None
+    record = ""
+    row = 0
+    async for line in _lines(chunks):
+        record += line
+        # An odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} fields, got {len(values)}"
+            continue
+        yield row, {name: value for name, value in zip(header, values) if name in CSV_FIELDS}
+
+    if record.strip():
+        yield row + 1, "Unterminated quoted field"
+
+async def _insert_batch(seller_id: str, batch: List[Tuple[int, ListingRow]]) -> List[Dict]:
+    """
+    Classify, insert and index one batch of valid rows in a single transaction
+    """
+    try:
+        # Through the batcher, so concurrent imports share model batches
+        classifications = await asyncio.gather(
+            *(classifier.classify_product_async(listing.description) for _, listing in batch)
+        )
+    except Exception as e:
+        logger.error(f"Error classifying import batch: {e}")
+        classifications = [{"flags": ["classification_error"]}] * len(batch)
+
+    now = datetime.utcnow()
+    values = []
+    queued = []
+    for (_, listing), result in zip(batch, classifications):
+        product_id = str(uuid.uuid4())
+        row = {
+            "id": product_id,
+            "name": listing.name,
+            "description": listing.description,
+            "price": listing.price,
+            "category": listing.category,
+            "commission": listing.price * 0.025,
+            "seller_id": seller_id,
+            "status": "pending",
+            "flags": [],
+            "created_at": now
+        }
+        if "classification_error" in result["flags"]:
+            # Leave it to the moderation workers, which retry with backoff
+            queued.append(product_id)
+        else:
+            row["category"] = result["category"]
+            row["flags"] = result["flags"]
+            row["status"] = "published" if result["is_safe"] else "rejected"
+        values.append(row)
+
+    async with AsyncSessionLocal() as db:
+        inserted = (await db.execute(
+            insert(Product).returning(Product.id, Product.status, Product.category),
+            values
+        )).all()
+        if queued:
+            await db.execute(
+                insert(ModerationJob),
+                [{"id": str(uuid.uuid4()), "product_id": product_id, "status": "queued"} for product_id in queued]
+            )
+
+        published = Counter()
+        for row in values:
+            key = facet_key(Product(**row))
+            if key is not None:
+                published[key] += 1
+        for statement in facet_count_updates(db, published):
+            await db.execute(statement)
+        await db.commit()
+
+    for row in values:
+        search_backend.add(Product(**row))
+
+    # RETURNING order isn't guaranteed to follow the VALUES order on every
+    # backend, so match rows up by id
+    returned = {product_id: (status, category) for product_id, status, category in inserted}
+    results = []
+    for (row_number, _), row in zip(batch, values):
+        status, category = returned[row["id"]]
+        results.append({
+            "row": row_number,
+            "status": "created",
+            "id": row["id"],
+            "moderation": status,
+            "category": category
+        })
+    return results
+
+async def import_listings(
+    rows: AsyncIterator[Tuple[int, object]],
+    seller_id: str,
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+    max_rows: int = BULK_IMPORT_MAX_ROWS
+) -> AsyncIterator[bytes]:
+    """
+    Import parsed rows in batches, yielding one NDJSON result line per row
+    and a final summary line
+    """
+    started = time.perf_counter()
+    totals = Counter()
+    batch: List[Tuple[int, ListingRow]] = []
+
+    def line(result: Dict) -> bytes:
+        return json.dumps(result, separators=(",", ":")).encode() + b"\n"
+
+    async def flush() -> AsyncIterator[bytes]:
+        try:
+            results = await _insert_batch(seller_id, batch)
+        except Exception as e:
+            logger.error(f"Error importing batch: {e}")
+            results = [{"row": row, "status": "error", "error": f"Insert failed: {e}"} for row, _ in batch]
+        batch.clear()
+        for result in results:
+            totals[result["status"]] += 1
+            yield line(result)
+
+    async for row, record in rows:
+        if row > max_rows:
+            totals["error"] += 1
+            yield line({"row": row, "status": "error", "error": f"Imports are limited to {max_rows} rows"})
+            break
+        if isinstance(record, str):
+            totals["error"] += 1
+            yield line({"row": row, "status": "error", "error": record})
+            continue
+        try:
+            batch.append((row, ListingRow(**record)))
+        except ValidationError as e:
+            totals["error"] += 1
+            message = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            yield line({"row": row, "status": "error", "error": message})
+            continue
+
+        if len(batch) >= batch_size:
+            async for result in flush():
+                yield result
+
+    if batch:
+        async for result in flush():
+            yield result
+
+    if totals["created"]:
+        await response_cache.ainvalidate(PRODUCTS_TAG)
+    yield line({
+        "summary": {
+            "created": totals["created"],
+            "errors": totals["error"],
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+    })
+
+async def export_listings(
+    seller_id: str,
+    serialize,
+    include_unpublished: bool = False,
+    batch_size: int = 500
+) -> AsyncIterator[bytes]:
+    """
+    Stream a seller's published listings (or all of them with
+    ``include_unpublished``), oldest first, as NDJSON lines produced by
+    ``serialize(product)``
+    """
+    query = select(Product).where(Product.seller_id == seller_id)
+    if not include_unpublished:
+        query = query.where(Product.status == "published")
+    async with AsyncSessionLocal() as db:
+        result = await db.stream_scalars(
+            query
+            .order_by(Product.created_at, Product.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for product in result:
+            yield json.dumps(serialize(product), separators=(",", ":")).encode() + b"\n"
@@ -0,0 +1,157 @@
+import bisect
+import logging
+from typing import Dict, Optional, Tuple, Union
+from sqlalchemy import case, delete, exists, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models import Product, ProductFacetCount
+
+logger = logging.getLogger(__name__)
+
+# Lower edges of the price histogram buckets; the last bucket is open-ended.
+# Changing them requires rebuild_facets() (and migration 0005 copies them).
+PRICE_BUCKETS = (0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Facet key of a listing: (category, price bucket), or None if it isn't
+# published and so doesn't count
+FacetKey = Optional[Tuple[str, int]]
+
+def price_bucket(price: float) -> int:
+    return max(bisect.bisect_right(PRICE_BUCKETS, price) - 1, 0)
+
+def facet_key(product: Product) -> FacetKey:
+    if product.status != "published":
+        return None
+    return (product.category or "", price_bucket(product.price))
+
+def _increment(dialect_name: str, key: Tuple[str, int], delta: int) -> list:
+    """
+    Statements adding ``delta`` to the count of ``key``, creating its row if
+    needed: a single upsert where the dialect has one, otherwise an UPDATE
+    followed by an INSERT of the row if it still doesn't exist. The latter
+    can fail with an integrity error when two transactions create the same
+    row at once, failing that write rather than miscounting.
+    """
+    category, bucket = key
+    values = {"category": category, "price_bucket": bucket, "product_count": delta}
+    if dialect_name in ("postgresql", "sqlite"):
+        dialect = postgresql if dialect_name == "postgresql" else sqlite
+        statement = dialect.insert(ProductFacetCount).values(**values)
+        return [statement.on_conflict_do_update(
+            index_elements=["category", "price_bucket"],
+            set_={"product_count": ProductFacetCount.product_count + statement.excluded.product_count}
+        )]
+
+    matches = (ProductFacetCount.category == category) & (ProductFacetCount.price_bucket == bucket)
+    return [
+        update(ProductFacetCount)
+        .where(matches)
+        .values(product_count=ProductFacetCount.product_count + delta),
+        insert(ProductFacetCount).from_select(
+            ["category", "price_bucket", "product_count"],
+            select(literal(category), literal(bucket), literal(delta))
+            .where(~exists().where(matches))
+        )
+    ]
+
+def facet_updates(db: Union[Session, AsyncSession], before: FacetKey, after: FacetKey) -> list:
+    """
+    Statements moving one listing's contribution from ``before`` to ``after``.
+    Execute them in the transaction that changes the listing.
+    """
+    if before == after:
+        return []
+    dialect_name = db.get_bind().dialect.name
+    statements = []
+    if before is not None:
+        statements += _increment(dialect_name, before, -1)
+    if after is not None:
+        statements += _increment(dialect_name, after, 1)
+    return statements
+
+def facet_count_updates(db: Union[Session, AsyncSession], counts: Dict[Tuple[str, int], int]) -> list:
+    """
+    Statements adding ``counts`` (facet key -> number of listings) at once,
+    for bulk inserts
+    """
+    dialect_name = db.get_bind().dialect.name
+    return [
+        statement
+        for key, delta in counts.items() if delta
+        for statement in _increment(dialect_name, key, delta)
+    ]
+
+def _bucket_expression():
+    return case(
+        *[(Product.price >= edge, literal(index)) for index, edge in reversed(list(enumerate(PRICE_BUCKETS)))],
+        else_=literal(0)
+    )
+
+def rebuild_facets(db: Session) -> int:
+    """
+    Recompute every facet count from the products table. Returns the number
+    of (category, bucket) rows written.
+    """
+    bucket = _bucket_expression()
+    rows = db.execute(
+        select(func.coalesce(Product.category, ""), bucket, func.count(Product.id))
+        .where(Product.status == "published")
+        .group_by(func.coalesce(Product.category, ""), bucket)
+    ).all()
+
+    db.execute(delete(ProductFacetCount))
+    if rows:
+        db.execute(
+            insert(ProductFacetCount),
+            [
+                {"category": category, "price_bucket": bucket, "product_count": count}
+                for category, bucket, count in rows
+            ]
+        )
+    db.commit()
+    return len(rows)
+
+async def facet_summary(db: AsyncSession, category: Optional[str] = None) -> Dict:
+    """
+    Per-category counts and the price histogram (optionally of one category),
+    read from the facet count table
+    """
+    rows = (await db.execute(
+        select(ProductFacetCount.category, ProductFacetCount.price_bucket, ProductFacetCount.product_count)
+        .where(ProductFacetCount.product_count > 0)
+    )).all()
+
+    categories: Dict[str, int] = {}
+    histogram = [0] * len(PRICE_BUCKETS)
+    for row_category, bucket, count in rows:
+        categories[row_category] = categories.get(row_category, 0) + count
+        if category is None or row_category == category:
+            histogram[bucket] += count
+
+    return {
+        "total": sum(categories.values()),
+        "categories": [
+            {"category": name or None, "count": count}
+            for name, count in sorted(categories.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        "price_histogram": [
+            {
+                "min": edge,
+                "max": PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None,
+                "count": histogram[index]
+            }
+            for index, edge in enumerate(PRICE_BUCKETS)
+        ]
+    }
+
+if __name__ == "__main__":
+    # Reconcile the facet counts, e.g. after restoring a backup
+    from ..config import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        logger.info(f"Rebuilt {rebuild_facets(db)} facet count rows")
+    finally:
+        db.close()
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_LOOKUPS = metrics.counter(
+    "zuno_classification_cache_lookups_total",
+    "Classification cache lookups by result (hit, disk_hit or miss)",
+    ["result"]
+)
+CACHE_REMOVALS = metrics.counter(
+    "zuno_classification_cache_removals_total",
+    "Classification cache entries dropped by reason (eviction or expiration)",
+    ["reason"]
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_description(description: str) -> str:
+    """
+    Normalize a description so trivially different re-posts share a cache entry
+    """
+    text = unicodedata.normalize("NFKC", description or "")
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+class ClassificationCache:
+    """
+    Two-tier cache of classification results.
+
+    Keys hash the normalized description together with the identifiers of the
+    models that produced the result, so changing a model never serves stale
+    entries. The in-process tier is an LRU bounded by size and TTL; the optional
+    persistent tier is a SQLite file that survives restarts.
+    """
+
+    def __init__(
+        self,
+        model_ids: Iterable[str],
+        max_entries: int = 10000,
+        ttl_seconds: float = 86400.0,
+        persist_path: Optional[str] = None,
+        persist_max_entries: int = 100000
+    ):
+        self.model_version = hashlib.sha256(
+            "|".join(model_ids).encode()
+        ).hexdigest()[:16]
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_max_entries = persist_max_entries
+
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes_since_trim = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if persist_path:
+            self._open_persistent(persist_path)
+
+    def _open_persistent(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                "key TEXT PRIMARY KEY, model_version TEXT NOT NULL, "
+                "result TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            # Entries written by other model versions can never be hit again
+            removed = self._db.execute(
+                "DELETE FROM classifications WHERE model_version != ?",
+                (self.model_version,)
+            ).rowcount
+            self._db.commit()
+            if removed:
+                logger.info(f"Dropped {removed} cached classifications from previous models")
+        except Exception as e:
+            logger.error(f"Error opening persistent classification cache: {e}")
+            self._db = None
+
+    def key(self, description: str) -> str:
+        normalized = normalize_description(description)
+        return hashlib.sha256(f"{self.model_version}:{normalized}".encode()).hexdigest()
+
+    def get(self, description: str, record_miss: bool = True) -> Optional[Dict]:
+        """
+        Return a copy of the cached result for a description, or None
+        """
+        key = self.key(description)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, result = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc("hit")
+                    return _copy(result)
+                del self._entries[key]
+                self.expirations += 1
+                CACHE_REMOVALS.inc("expiration")
+
+        result = self._get_persistent(key, now)
+        if result is not None:
+            self.disk_hits += 1
+            CACHE_LOOKUPS.inc("disk_hit")
+            self._put_memory(key, result, now)
+            return _copy(result)
+
+        if record_miss:
+            self.misses += 1
+            CACHE_LOOKUPS.inc("miss")
+        return None
+
+    def set(self, description: str, result: Dict):
+        """
+        Cache a classification result. Error results are never cached.
+        """
+        if "classification_error" in result.get("flags", []):
+            return
+
+        key = self.key(description)
+        now = time.time()
+        self._put_memory(key, _copy(result), now)
+        self._set_persistent(key, result, now)
+
+    def _put_memory(self, key: str, result: Dict, created_at: float):
+        with self._lock:
+            self._entries[key] = (created_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                CACHE_REMOVALS.inc("eviction")
+
+    def _get_persistent(self, key: str, now: float) -> Optional[Dict]:
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT result, created_at FROM classifications WHERE key = ?",
+                    (key,)
+                ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self.expirations += 1
+                CACHE_REMOVALS.inc("expiration")
+                return None
+            return json.loads(row[0])
+        except Exception as e:
+            logger.error(f"Error reading persistent classification cache: {e}")
+            return None
+
+    def _set_persistent(self, key: str, result: Dict, created_at: float):
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO classifications (key, model_version, result, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, self.model_version, json.dumps(result), created_at)
+                )
+                self._writes_since_trim += 1
+                if self._writes_since_trim >= 1000:
+                    self._trim_persistent(created_at)
+                self._db.commit()
+        except Exception as e:
+            logger.error(f"Error writing persistent classification cache: {e}")
+
+    def _trim_persistent(self, now: float):
+        """Drop expired rows and keep only the newest persist_max_entries"""
+        self._writes_since_trim = 0
+        expired = self._db.execute(
+            "DELETE FROM classifications WHERE created_at < ?",
+            (now - self.ttl_seconds,)
+        ).rowcount
+        evicted = self._db.execute(
+            "DELETE FROM classifications WHERE key IN ("
+            "SELECT key FROM classifications ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.persist_max_entries,)
+        ).rowcount
+        self.expirations += expired
+        self.evictions += evicted
+        CACHE_REMOVALS.inc("expiration", amount=expired)
+        CACHE_REMOVALS.inc("eviction", amount=evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM classifications")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "model_version": self.model_version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": self._db is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": ((self.hits + self.disk_hits) / lookups) if lookups else 0.0
+        }
+
+def _copy(result: Dict) -> Dict:
+    return {**result, "flags": list(result.get("flags", []))}
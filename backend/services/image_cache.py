@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from ..config import IMAGE_CACHE_MAX_BYTES, IMAGE_CACHE_MAX_ITEM_BYTES
+
+class DecryptedBlobCache:
+    """
+    LRU of small decrypted images, bounded by total bytes.
+
+    Entries are keyed on (path, etag) so a replaced file is never served
+    from a stale entry.
+    """
+
+    def __init__(self, max_bytes: int, max_item_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def accepts(self, size: Optional[int]) -> bool:
+        return size is not None and size <= self.max_item_bytes
+
+    def get(self, path: str, etag: str) -> Optional[bytes]:
+        with self._lock:
+            blob = self._entries.get((path, etag))
+            if blob is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((path, etag))
+            self.hits += 1
+            return blob
+
+    def put(self, path: str, etag: str, blob: bytes):
+        if len(blob) > self.max_item_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop((path, etag), None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[(path, etag)] = blob
+            self._size += len(blob)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, path: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self._size -= len(self._entries.pop(key))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+# Create a global instance
+image_cache = DecryptedBlobCache(IMAGE_CACHE_MAX_BYTES, IMAGE_CACHE_MAX_ITEM_BYTES)
@@ -0,0 +1,216 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+from ..config import AsyncSessionLocal, ENCRYPTION_KEY, UPLOAD_DIR, IMAGE_PIPELINE_WORKERS, IMAGE_JPEG_QUALITY
+from ..models import Product
+from ..utils.chunked_crypto import ChunkEncryptor, decrypt_stream, is_chunked_file, set_file_key
+from ..utils.storage import remove_file
+from .image_cache import image_cache
+from .response_cache import response_cache, product_tag, PRODUCTS_TAG
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each derivative, smallest first
+VARIANTS = {
+    "thumbnail": 160,
+    "card": 480,
+    "full": 1600,
+}
+
+def _init_worker(encryption_key: str):
+    """
+    Use the parent's encryption key in a pool process. A spawned child
+    re-imports config, which makes up a key of its own when ENCRYPTION_KEY
+    isn't set, and could then decrypt nothing the parent wrote.
+    """
+    from .. import config
+
+    config.ENCRYPTION_KEY = encryption_key
+    set_file_key(encryption_key)
+
+def _read_plaintext(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        if is_chunked_file(f.read(4)):
+            f.seek(0)
+            return b"".join(decrypt_stream(f))
+        f.seek(0)
+        token = f.read()
+
+    # Uploads stored before the chunked format are single Fernet tokens
+    from ..utils.encryption import decrypt_data
+    return decrypt_data(token)
+
+def _write_encrypted(file_path: str, data: bytes):
+    encryptor = ChunkEncryptor()
+    temp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(encryptor.header)
+            f.write(encryptor.update(data))
+            f.write(encryptor.finalize())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def render_derivatives(source_path: str, dest_dir: str, stem: str, quality: int = IMAGE_JPEG_QUALITY) -> Dict[str, str]:
+    """
+    Decrypt an uploaded image, strip its metadata and write one encrypted,
+    resized JPEG per variant. Runs inside a pool process.
+
+    Returns the stored file name of each variant.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(_read_plaintext(source_path))) as original:
+        # Apply the EXIF orientation before the metadata is discarded
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "L"):
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            image = image.convert("RGBA")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+
+    paths = {}
+    for variant, max_edge in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        # A fresh save without exif/icc/info arguments carries no metadata
+        buffer = io.BytesIO()
+        resized.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+
+        file_name = f"{stem}_{variant}.jpg"
+        _write_encrypted(os.path.join(dest_dir, file_name), buffer.getvalue())
+        paths[variant] = file_name
+    return paths
+
+class ImagePipeline:
+    """
+    Process pool that turns uploads into metadata-free derivatives
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Running process_product_image tasks (the loop only keeps weak references)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(ENCRYPTION_KEY,)
+            )
+        return self._executor
+
+    async def render(self, source_path: str, stem: str) -> Dict[str, str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool(),
+            render_derivatives,
+            source_path,
+            UPLOAD_DIR,
+            stem
+        )
+
+    def submit(self, product_id: str, file_name: str):
+        """
+        Process a product's image on the running loop without tying it to
+        the request: the response (and its admission slot and latency
+        metrics) finishes while the derivatives render
+        """
+        task = asyncio.get_running_loop().create_task(self.process_product_image(product_id, file_name))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def process_product_image(self, product_id: str, file_name: str):
+        """
+        Render a product's derivatives, record them on the product and drop
+        the original upload (which may still carry EXIF/GPS metadata)
+        """
+        source_path = os.path.join(UPLOAD_DIR, file_name)
+        try:
+            paths = await self.render(source_path, product_id)
+        except Exception as e:
+            logger.error(f"Error processing image for product {product_id}: {e}")
+            return
+
+        async with AsyncSessionLocal() as db:
+            product = await db.get(Product, product_id)
+            if product is None or product.image_path != file_name:
+                # Deleted or replaced while rendering
+                for derivative in paths.values():
+                    await remove_file(os.path.join(UPLOAD_DIR, derivative))
+                return
+
+            product.thumbnail_path = paths["thumbnail"]
+            product.card_path = paths["card"]
+            product.image_path = paths["full"]
+            await db.commit()
+
+        await response_cache.ainvalidate(PRODUCTS_TAG, product_tag(product_id))
+        image_cache.invalidate(source_path)
+        await remove_file(source_path)
+
+    def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Create a global instance
+image_pipeline = ImagePipeline(IMAGE_PIPELINE_WORKERS)
+
+def _sample_images(count: int, size: int) -> List[bytes]:
+    from PIL import Image
+
+    images = []
+    for i in range(count):
+        image = Image.effect_mandelbrot((size, size), (-2.0 + i * 0.01, -1.5, 1.0, 1.5), 100).convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=95)
+        images.append(buffer.getvalue())
+    return images
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Benchmark the image derivative pipeline")
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--size", type=int, default=3000, help="Edge length of the sample images")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    sources = []
+    for i, data in enumerate(_sample_images(args.images, args.size)):
+        path = os.path.join(work_dir, f"source-{i}.jpg")
+        _write_encrypted(path, data)
+        sources.append(path)
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(ENCRYPTION_KEY,)
+    ) as pool:
+        start = time.perf_counter()
+        list(pool.map(render_derivatives, sources, [work_dir] * len(sources), [f"p{i}" for i in range(len(sources))]))
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.images} images of {args.size}px with {args.workers} workers: "
+          f"{elapsed:.2f}s, {args.images / elapsed:.1f} images/s")
@@ -0,0 +1,193 @@
+"""
+Inference backends for the text classifiers, plus a comparison of load
+time, memory, latency and label agreement with the fp32 model:
+
+    python -m backend.services.inference_backends --backend quantized --backend onnx
+
+Run from the repository root.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+from typing import Dict, List, Optional
+from ..config import AI_MODEL_CACHE_DIR, AI_MODEL_PATH, AI_MODERATION_MODEL, AI_SHARED_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "quantized", "onnx")
+
+# Representative listing texts used for parity checks and benchmarks
+SAMPLE_TEXTS = [
+    "Brand new wireless headphones with noise cancellation, still sealed in the box.",
+    "Vintage leather jacket, size M, lightly worn with minor scuffs on the sleeves.",
+    "Guaranteed profit! Send me money now and I will double it within 24 hours.",
+    "Handmade ceramic coffee mug, dishwasher safe, ships worldwide in two days.",
+    "Used mountain bike, 21 gears, new brakes and tyres fitted last month.",
+    "Limited edition trading cards, complete set with certificate of authenticity.",
+    "I hate people who buy from other sellers, they are all idiots and should leave.",
+    "Organic loose leaf green tea, 250g resealable pouch, harvested this spring.",
+]
+
+def _onnx_available() -> bool:
+    from importlib.util import find_spec
+
+    # Without importing onnxruntime itself; find_spec of a submodule
+    # imports its (light) parent package, so check that exists first
+    return (
+        find_spec("onnxruntime") is not None
+        and find_spec("optimum") is not None
+        and find_spec("optimum.onnxruntime") is not None
+    )
+
+def effective_backend(backend: str) -> str:
+    """
+    The backend ``load_text_classifier`` actually builds for ``backend``:
+    ``onnx`` falls back to ``quantized`` when optimum[onnxruntime] is not
+    installed. Cache keys and reports use this name.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+    if backend == "onnx" and not _onnx_available():
+        return "quantized"
+    return backend
+
+def load_text_classifier(model_name: str, backend: str = "torch"):
+    """
+    Build a text-classification pipeline on the requested inference backend.
+
+    ``torch`` is the full-precision model, ``quantized`` applies dynamic int8
+    quantization to its Linear layers, and ``onnx`` runs an exported graph on
+    ONNX Runtime (exported once and kept under AI_MODEL_CACHE_DIR).
+    """
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+
+    requested, backend = backend, effective_backend(backend)
+    if backend != requested:
+        logger.warning(f"optimum[onnxruntime] is not installed; loading {model_name} on the {backend} backend instead of {requested}")
+
+    if backend == "torch" and AI_SHARED_WEIGHTS:
+        from .shared_weights import load_shared_pipeline
+        return load_shared_pipeline(model_name, "text-classification")
+
+    if AI_SHARED_WEIGHTS:
+        logger.warning(f"AI_SHARED_WEIGHTS only applies to the torch backend; {backend} weights are loaded per worker")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=AI_MODEL_CACHE_DIR)
+
+    if backend == "torch":
+        # Loaded explicitly: pipeline() forwards an unknown cache_dir argument
+        # to the tokenizer on every call, which rejects it
+        model = AutoModelForSequenceClassification.from_pretrained(
+            model_name,
+            cache_dir=AI_MODEL_CACHE_DIR
+        )
+        return pipeline("text-classification", model=model, tokenizer=tokenizer)
+
+    if backend == "onnx":
+        model = _load_onnx_model(model_name)
+        return pipeline("text-classification", model=model, tokenizer=tokenizer)
+
+    import torch
+
+    model = AutoModelForSequenceClassification.from_pretrained(
+        model_name,
+        cache_dir=AI_MODEL_CACHE_DIR
+    )
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return pipeline("text-classification", model=model, tokenizer=tokenizer)
+
+def _load_onnx_model(model_name: str):
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    export_dir = os.path.join(AI_MODEL_CACHE_DIR, "onnx", model_name.replace("/", "--"))
+    if os.path.exists(os.path.join(export_dir, "model.onnx")):
+        return ORTModelForSequenceClassification.from_pretrained(export_dir)
+
+    logger.info(f"Exporting {model_name} to ONNX under {export_dir}")
+    model = ORTModelForSequenceClassification.from_pretrained(
+        model_name,
+        export=True,
+        cache_dir=AI_MODEL_CACHE_DIR
+    )
+    model.save_pretrained(export_dir)
+    return model
+
+def parity_report(model_name: str, backend: str, texts: Optional[List[str]] = None) -> Dict:
+    """
+    Compare a backend's predictions with the fp32 torch model on the same texts
+    """
+    texts = texts or SAMPLE_TEXTS
+    reference = load_text_classifier(model_name, "torch")(texts, truncation=True)
+    candidate = load_text_classifier(model_name, backend)(texts, truncation=True)
+
+    matches = sum(1 for r, c in zip(reference, candidate) if r["label"] == c["label"])
+    score_deltas = [
+        abs(r["score"] - c["score"])
+        for r, c in zip(reference, candidate)
+        if r["label"] == c["label"]
+    ]
+    return {
+        "model": model_name,
+        "backend": effective_backend(backend),
+        "requested_backend": backend,
+        "samples": len(texts),
+        "label_agreement": matches / len(texts),
+        "max_score_delta": max(score_deltas) if score_deltas else None
+    }
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def benchmark(model_name: str, backend: str, texts: Optional[List[str]] = None, rounds: int = 20) -> Dict:
+    """
+    Measure load cost, resident memory and per-call latency of a backend
+    """
+    texts = texts or SAMPLE_TEXTS
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    classifier = load_text_classifier(model_name, backend)
+    load_seconds = time.perf_counter() - start
+    rss_after = _rss_bytes()
+
+    classifier(texts, truncation=True)  # warm up
+
+    single, batched = [], []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        classifier(texts[0], truncation=True)
+        single.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        classifier(texts, batch_size=len(texts), truncation=True)
+        batched.append(time.perf_counter() - start)
+
+    return {
+        "model": model_name,
+        "backend": effective_backend(backend),
+        "requested_backend": backend,
+        "load_seconds": load_seconds,
+        "rss_delta_mb": (rss_after - rss_before) / (1024 * 1024),
+        "single_p50_ms": statistics.median(single) * 1000,
+        "batch_p50_ms": statistics.median(batched) * 1000,
+        "batch_size": len(texts)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare classifier inference backends")
+    parser.add_argument("--model", action="append", help="Model to test (repeatable)")
+    parser.add_argument("--backend", action="append", choices=BACKENDS, help="Backend to test (repeatable)")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    for model_name in args.model or [AI_MODEL_PATH, AI_MODERATION_MODEL]:
+        for backend in args.backend or BACKENDS:
+            # RSS deltas are cumulative within one process; pass a single
+            # --model/--backend pair for an isolated memory figure
+            print(json.dumps(benchmark(model_name, backend, rounds=args.rounds)))
+            if backend != "torch":
+                print(json.dumps(parity_report(model_name, backend)))
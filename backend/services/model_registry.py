@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+class ModelRegistry:
+    """
+    Lazily-initialised registry of named models.
+
+    Loaders are registered up front but only run on the first ``get`` (or when
+    warmed), so importing the application never pulls in torch/transformers.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._states: Dict[str, str] = {}
+        self._errors: Dict[str, str] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._warmup_thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """
+        Register a loader to be called the first time ``name`` is requested
+        """
+        self._loaders[name] = loader
+        self._states[name] = NOT_LOADED
+        self._locks[name] = threading.Lock()
+
+    def get(self, name: str) -> Optional[Any]:
+        """
+        Return the model, loading it on first use. Returns None if loading failed.
+        """
+        if self._states.get(name) == READY:
+            return self._models[name]
+
+        with self._locks[name]:
+            state = self._states[name]
+            if state == READY:
+                return self._models[name]
+            if state == FAILED:
+                return None
+
+            self._states[name] = LOADING
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                logger.error(f"Error loading model '{name}': {e}")
+                self._errors[name] = str(e)
+                self._states[name] = FAILED
+                return None
+
+            self._models[name] = model
+            self._load_seconds[name] = time.perf_counter() - start
+            self._states[name] = READY
+            logger.info(f"Loaded model '{name}' in {self._load_seconds[name]:.1f}s")
+            return model
+
+    def warm(self, names: Optional[Iterable[str]] = None):
+        """
+        Load the given models (all registered models by default)
+        """
+        for name in list(names or self._loaders):
+            self.get(name)
+
+    def warm_in_background(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        """
+        Start loading models in a daemon thread so startup isn't blocked
+        """
+        if self._warmup_thread is None or not self._warmup_thread.is_alive():
+            self._warmup_thread = threading.Thread(
+                target=self.warm,
+                args=(names,),
+                name="model-warmup",
+                daemon=True
+            )
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    def state(self, name: str) -> str:
+        return self._states[name]
+
+    @property
+    def ready(self) -> bool:
+        """True once every registered model has finished loading (or failed)"""
+        return all(state in (READY, FAILED) for state in self._states.values())
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "models": {
+                name: {
+                    "state": state,
+                    "load_seconds": self._load_seconds.get(name),
+                    "error": self._errors.get(name)
+                }
+                for name, state in self._states.items()
+            }
+        }
+
+# Create a global instance
+model_registry = ModelRegistry()
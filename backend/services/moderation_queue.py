@@ -0,0 +1,271 @@
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models import ModerationJob, Product
+from .catalog_facets import facet_key, facet_updates
+from .response_cache import response_cache, product_tag, PRODUCTS_TAG
+from ..config import (
+    SessionLocal,
+    MODERATION_BATCH_SIZE,
+    MODERATION_MAX_ATTEMPTS,
+    MODERATION_POLL_INTERVAL,
+    MODERATION_RETRY_BASE_SECONDS,
+    MODERATION_JOB_TIMEOUT,
+    MODERATION_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+def enqueue_job(db: Union[Session, AsyncSession], product_id: str) -> ModerationJob:
+    """
+    Add a classification job for a product to the session (committed by the caller)
+    """
+    job = ModerationJob(
+        id=str(uuid.uuid4()),
+        product_id=product_id,
+        status="queued",
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(job)
+    return job
+
+def claim_jobs(db: Session, limit: int) -> List[ModerationJob]:
+    """
+    Atomically claim up to ``limit`` due jobs for this worker.
+
+    Candidates are selected with FOR UPDATE SKIP LOCKED on Postgres; the
+    conditional UPDATE on status keeps the claim safe on SQLite as well.
+    """
+    now = datetime.utcnow()
+
+    # Jobs whose worker died mid-run count the run as an attempt: requeue
+    # them while attempts remain, otherwise fail them so a listing that
+    # crashes its worker isn't retried forever
+    stuck = (
+        update(ModerationJob)
+        .where(ModerationJob.status == "running")
+        .where(ModerationJob.started_at < now - timedelta(seconds=MODERATION_JOB_TIMEOUT))
+        .execution_options(synchronize_session=False)
+    )
+    timed_out = f"Worker did not finish within {MODERATION_JOB_TIMEOUT}s"
+    db.execute(
+        stuck.where(ModerationJob.attempts >= MODERATION_MAX_ATTEMPTS)
+        .values(status="failed", claim_token=None, last_error=timed_out, finished_at=now)
+    )
+    db.execute(
+        stuck.where(ModerationJob.attempts < MODERATION_MAX_ATTEMPTS)
+        .values(status="queued", claim_token=None, last_error=timed_out)
+    )
+
+    candidates = (
+        select(ModerationJob.id)
+        .where(ModerationJob.status == "queued")
+        .where(ModerationJob.next_attempt_at <= now)
+        .order_by(ModerationJob.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    token = str(uuid.uuid4())
+    db.execute(
+        update(ModerationJob)
+        .where(ModerationJob.id.in_(candidates.scalar_subquery()))
+        .where(ModerationJob.status == "queued")
+        .values(
+            status="running",
+            claim_token=token,
+            started_at=now,
+            attempts=ModerationJob.attempts + 1
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    return db.query(ModerationJob).filter(ModerationJob.claim_token == token).all()
+
+def process_jobs(db: Session, jobs: List[ModerationJob]):
+    """
+    Classify the products behind a batch of claimed jobs and publish or reject them
+    """
+    from .ai_classifier import classifier
+
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(
+            Product.id.in_([job.product_id for job in jobs])
+        )
+    }
+    runnable = [job for job in jobs if job.product_id in products]
+    for job in jobs:
+        if job.product_id not in products:
+            _finish(db, job, "failed", "Product no longer exists")
+
+    # classify_batch logs and flags its own failures; only an exception
+    # escaping it carries a message worth recording on the job
+    error = "Classification failed"
+    try:
+        results = classifier.classify_batch(
+            [products[job.product_id].description or "" for job in runnable]
+        )
+    except Exception as e:
+        error = f"Classification failed: {e}"
+        results = [{"flags": ["classification_error"]}] * len(runnable)
+
+    for job, result in zip(runnable, results):
+        if "classification_error" in result["flags"]:
+            _retry_or_fail(db, job, error)
+            continue
+
+        # A job requeued as stuck may have been claimed again; only the
+        # current claim holder publishes the product
+        if not _finish(db, job, "succeeded"):
+            logger.warning(f"Moderation job {job.id} was reclaimed; discarding this result")
+            continue
+        product = products[job.product_id]
+        before = facet_key(product)
+        product.category = result["category"]
+        product.flags = result["flags"]
+        product.status = "published" if result["is_safe"] else "rejected"
+        for statement in facet_updates(db, before, facet_key(product)):
+            db.execute(statement)
+
+    db.commit()
+    # Reaches API processes when the response cache uses a shared store
+    response_cache.invalidate(PRODUCTS_TAG, *[product_tag(job.product_id) for job in runnable])
+
+def _update_claimed(db: Session, job: ModerationJob, **values) -> bool:
+    """
+    Update ``job`` only if this worker's claim still holds (it is cleared
+    when a stuck job is requeued). Returns whether it did.
+    """
+    return db.execute(
+        update(ModerationJob)
+        .where(ModerationJob.id == job.id)
+        .where(ModerationJob.claim_token == job.claim_token)
+        .values(claim_token=None, **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+def _finish(db: Session, job: ModerationJob, status: str, error: Optional[str] = None) -> bool:
+    return _update_claimed(db, job, status=status, last_error=error, finished_at=datetime.utcnow())
+
+def _retry_or_fail(db: Session, job: ModerationJob, error: str) -> bool:
+    if job.attempts >= MODERATION_MAX_ATTEMPTS:
+        logger.error(f"Moderation job {job.id} failed after {job.attempts} attempts: {error}")
+        return _finish(db, job, "failed", error)
+
+    delay = MODERATION_RETRY_BASE_SECONDS * (2 ** (job.attempts - 1))
+    return _update_claimed(
+        db,
+        job,
+        status="queued",
+        last_error=error,
+        next_attempt_at=datetime.utcnow() + timedelta(seconds=delay)
+    )
+
+def run_once(db: Session, batch_size: int = MODERATION_BATCH_SIZE) -> int:
+    """
+    Claim and process one batch of jobs. Returns the number of jobs handled.
+    """
+    jobs = claim_jobs(db, batch_size)
+    if jobs:
+        process_jobs(db, jobs)
+    return len(jobs)
+
+def worker_loop(stop_event=None):
+    """
+    Poll the queue until ``stop_event`` is set
+    """
+    logger.info(f"Moderation worker {os.getpid()} started")
+    while stop_event is None or not stop_event.is_set():
+        db = SessionLocal()
+        try:
+            handled = run_once(db)
+        except Exception as e:
+            logger.error(f"Error in moderation worker: {e}")
+            db.rollback()
+            handled = 0
+        finally:
+            db.close()
+
+        if not handled:
+            time.sleep(MODERATION_POLL_INTERVAL)
+
+async def queue_stats(db: AsyncSession) -> Dict:
+    """
+    Queue depth per status and latency of recently finished jobs
+    """
+    counts = dict(
+        (await db.execute(
+            select(ModerationJob.status, func.count(ModerationJob.id))
+            .group_by(ModerationJob.status)
+        )).all()
+    )
+    recent = (await db.execute(
+        select(ModerationJob.created_at, ModerationJob.started_at, ModerationJob.finished_at)
+        .where(ModerationJob.status == "succeeded")
+        .order_by(ModerationJob.finished_at.desc())
+        .limit(100)
+    )).all()
+    latencies = [(finished - created).total_seconds() for created, _, finished in recent]
+    waits = [(started - created).total_seconds() for created, started, _ in recent]
+    return {
+        "depth": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "succeeded": counts.get("succeeded", 0),
+        "failed": counts.get("failed", 0),
+        "avg_job_latency_seconds": (sum(latencies) / len(latencies)) if latencies else None,
+        "max_job_latency_seconds": max(latencies) if latencies else None,
+        "avg_queue_wait_seconds": (sum(waits) / len(waits)) if waits else None
+    }
+
+class ModerationWorkerPool:
+    """
+    Pool of worker processes draining the moderation queue
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._processes: List[multiprocessing.Process] = []
+
+    def start(self):
+        for i in range(self.size):
+            process = self._context.Process(
+                target=worker_loop,
+                args=(self._stop_event,),
+                name=f"moderation-worker-{i}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        logger.info(f"Started {self.size} moderation worker(s)")
+
+    def join(self):
+        for process in self._processes:
+            process.join()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+if __name__ == "__main__":
+    # Run workers standalone, e.g. as a separate container
+    logging.basicConfig(level=logging.INFO)
+    pool = ModerationWorkerPool(max(1, MODERATION_WORKERS))
+    pool.start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pool.stop()
@@ -0,0 +1,284 @@
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+from ..config import PROFILER_INTERVAL_MS, PROFILER_MAX_SECONDS, PROFILER_MAX_RESULTS
+from ..utils.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+MODES = ("wall", "cpu")
+
+# Python functions a thread sits in while blocked (selector, locks, sleeps,
+# idle executor workers). In "cpu" mode a thread found there is treated as
+# idle: its CPU time was spent before it blocked, somewhere the sample can't see.
+IDLE_FUNCTIONS = frozenset({"select", "poll", "wait", "sleep", "accept", "_worker", "_wait_for_tstate_lock"})
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of every thread in this process from a
+    background thread and aggregates them as collapsed stacks
+    (``thread;outer;...;inner count``), the input format of flamegraph.pl
+    and speedscope.
+
+    In "wall" mode each sample counts 1 for every thread, idle or not. In
+    "cpu" mode a thread's stack is weighted by the CPU microseconds it used
+    since the previous sample, and threads blocked in IDLE_FUNCTIONS are
+    skipped, so the profile shows where CPU goes.
+
+    With a ``gate``, samples are only taken while ``gate()`` is true (e.g.
+    while a filtered route has requests in flight).
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        seconds: float,
+        interval: float = PROFILER_INTERVAL_MS / 1000,
+        route: Optional[str] = None,
+        gate: Optional[Callable[[], bool]] = None
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}")
+        if mode == "cpu" and not hasattr(time, "pthread_getcpuclockid"):
+            raise ValueError("CPU profiling needs per-thread CPU clocks, which this platform lacks")
+
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.seconds = seconds
+        self.interval = interval
+        self.route = route
+        self.gate = gate
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+        self._labels: Dict[object, str] = {}
+        self._cpu_clocks: Dict[int, int] = {}
+        self._cpu_last: Dict[int, float] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.started_at = datetime.utcnow()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = False):
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            file_name = os.path.join(*code.co_filename.split(os.sep)[-2:])
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{name} ({file_name}:{code.co_firstlineno})"
+        return label
+
+    def _collapse(self, ident: int, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(self._thread_names.get(ident, f"thread-{ident}"))
+        labels.reverse()
+        # ';' separates frames and the last space precedes the count
+        return ";".join(labels).replace("\n", " ")
+
+    def _cpu_weight(self, ident: int) -> int:
+        """CPU microseconds thread ``ident`` used since the last sample"""
+        try:
+            clock = self._cpu_clocks.get(ident)
+            if clock is None:
+                clock = self._cpu_clocks[ident] = time.pthread_getcpuclockid(ident)
+            now = time.clock_gettime(clock)
+        except (OSError, OverflowError):
+            return 0
+        last = self._cpu_last.get(ident)
+        self._cpu_last[ident] = now
+        return 0 if last is None else int((now - last) * 1_000_000)
+
+    def _run(self):
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        names_refreshed = 0.0
+        try:
+            while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+                if self.gate is not None and not self.gate():
+                    # Don't bill the gated-off time to the next sample
+                    self._cpu_last.clear()
+                    continue
+                if time.monotonic() - names_refreshed > 1.0:
+                    self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    names_refreshed = time.monotonic()
+
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    if self.mode == "cpu":
+                        weight = self._cpu_weight(ident)
+                        if frame.f_code.co_name in IDLE_FUNCTIONS:
+                            continue
+                    else:
+                        weight = 1
+                    if weight > 0:
+                        self.stacks[self._collapse(ident, frame)] += weight
+                self.samples += 1
+        except Exception as e:
+            logger.error(f"Error in sampling profiler: {e}")
+        finally:
+            self.finished_at = datetime.utcnow()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "route": self.route,
+            "seconds": self.seconds,
+            "interval_ms": self.interval * 1000,
+            "running": self.running,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "samples": self.samples,
+            "unit": "cpu_microseconds" if self.mode == "cpu" else "samples"
+        }
+
+class ProfilerManager:
+    """
+    Runs at most one profile at a time in this worker and keeps the most
+    recent results for download
+    """
+
+    def __init__(self, max_seconds: float, max_results: int):
+        self.max_seconds = max_seconds
+        self.max_results = max_results
+        self.current: Optional[SamplingProfiler] = None
+        # Requests to the current profile's route that are in flight
+        self.route_in_flight = 0
+        self._results: "OrderedDict[str, SamplingProfiler]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _begin(self, profiler: SamplingProfiler) -> SamplingProfiler:
+        with self._lock:
+            if self.current is not None and self.current.running:
+                raise RuntimeError(f"Profile {self.current.id} is still running")
+            self.current = profiler
+            self.route_in_flight = 0
+            self._results[profiler.id] = profiler
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        profiler.start()
+        return profiler
+
+    def start(self, mode: str, seconds: float, route: Optional[str] = None) -> SamplingProfiler:
+        """
+        Start a time-boxed profile, optionally sampling only while requests
+        to ``route`` (a path template) are in flight
+        """
+        seconds = min(max(seconds, 0.1), self.max_seconds)
+        gate = (lambda: self.route_in_flight > 0) if route else None
+        return self._begin(SamplingProfiler(mode, seconds, route=route, gate=gate))
+
+    def start_request(self, mode: str, path: str) -> SamplingProfiler:
+        """
+        Start profiling one request; the caller stops it when the request ends
+        """
+        return self._begin(SamplingProfiler(mode, self.max_seconds, route=path))
+
+    def stop(self) -> Optional[SamplingProfiler]:
+        profiler = self.current
+        if profiler is not None:
+            profiler.stop()
+        return profiler
+
+    def get(self, profile_id: str) -> Optional[SamplingProfiler]:
+        with self._lock:
+            return self._results.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            profilers = list(self._results.values())
+        return [profiler.summary() for profiler in reversed(profilers)]
+
+# Create a global instance
+profiler_manager = ProfilerManager(PROFILER_MAX_SECONDS, PROFILER_MAX_RESULTS)
+
+class ProfilerMiddleware:
+    """
+    Tracks requests to the route a running profile is filtered to, and
+    profiles single requests that carry ``X-Profile: wall|cpu`` together with
+    an admin access token in ``X-Profile-Token``. The profile id comes back
+    in ``X-Profile-Id``; samples cover every thread while that request runs.
+    """
+
+    def __init__(self, app, routes: List, authorize: Callable[[str], Awaitable[bool]], manager: ProfilerManager = profiler_manager):
+        self.app = app
+        self.routes = routes
+        self.authorize = authorize
+        self.manager = manager
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        mode = headers.get(b"x-profile")
+        if mode is not None:
+            await self._profile_request(scope, receive, send, mode.decode("latin-1"), headers)
+            return
+
+        current = self.manager.current
+        if current is None or current.route is None or not current.running \
+                or route_template(self.routes, scope) != current.route:
+            await self.app(scope, receive, send)
+            return
+
+        self.manager.route_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.manager.route_in_flight -= 1
+
+    async def _profile_request(self, scope, receive, send, mode: str, headers: Dict[bytes, bytes]):
+        token = headers.get(b"x-profile-token", b"").decode("latin-1")
+        profiler = None
+        status = "unauthorized"
+        if token and await self.authorize(token):
+            try:
+                profiler = self.manager.start_request(mode, scope["path"])
+                status = "started"
+            except ValueError:
+                status = "invalid-mode"
+            except RuntimeError:
+                status = "busy"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                extra = [(b"x-profile-status", status.encode())]
+                if profiler is not None:
+                    extra.append((b"x-profile-id", profiler.id.encode()))
+                message = {**message, "headers": list(message.get("headers", [])) + extra}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.stop()
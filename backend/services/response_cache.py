@@ -0,0 +1,299 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from ..config import (
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL,
+    REDIS_URL,
+    REDIS_SOCKET_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+def product_tag(product_id: str) -> str:
+    return f"product:{product_id}"
+
+def reviews_tag(product_id: str) -> str:
+    return f"reviews:{product_id}"
+
+# Every listing page depends on this tag
+PRODUCTS_TAG = "products"
+
+class MemoryStore:
+    """
+    In-process LRU with per-entry TTL. Tag versions are kept apart from the
+    entries so evicting entries never resets a version.
+    """
+
+    # Calls never wait on I/O, so they run on the event loop
+    blocking = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def versions(self, tags: Iterable[str]) -> list:
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class RedisStore:
+    """
+    Shared store, so invalidations from any process (other API workers, the
+    moderation workers) reach every reader. The client is synchronous (the
+    moderation workers invalidate from plain threads); the cache runs its
+    reads and writes in the threadpool.
+    """
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "zuno:rc:", timeout: float = REDIS_SOCKET_TIMEOUT):
+        import redis
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self._redis.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def versions(self, tags: Iterable[str]) -> list:
+        tags = list(tags)
+        if not tags:
+            return []
+        values = self._redis.mget([f"{self.prefix}v:{tag}" for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, tags: Iterable[str]):
+        pipeline = self._redis.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(f"{self.prefix}v:{tag}")
+        pipeline.execute()
+
+    def clear(self):
+        for key in self._redis.scan_iter(f"{self.prefix}*"):
+            self._redis.delete(key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+class ResponseCache:
+    """
+    Read-through cache of serialized JSON responses.
+
+    Entries are keyed on path + sorted query parameters + the current version
+    of every tag the response depends on. Writes bump the versions of the
+    tags they touch, which makes exactly the affected entries unreachable;
+    those then age out through TTL/LRU.
+    """
+
+    def __init__(self, store, ttl: float, enabled: bool = True):
+        self.store = store
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.errors = 0
+        self._hit_seconds = 0.0
+        self._miss_seconds = 0.0
+
+    async def _call(self, method: Callable, *args):
+        """Call a store method, off the event loop if the store blocks"""
+        if self.store.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    def _failed(self, action: str, error: Exception):
+        logger.warning(f"Response cache {action} failed: {error}")
+        with self._lock:
+            self.errors += 1
+
+    async def _key(self, request: Request, tags: Tuple[str, ...]) -> str:
+        query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        versions = ",".join(f"{tag}={version}" for tag, version in zip(tags, await self._call(self.store.versions, tags)))
+        return hashlib.sha256(f"{request.url.path}?{query}|{versions}".encode()).hexdigest()
+
+    def _respond(self, request: Request, body: bytes, headers: Dict[str, str]) -> Response:
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        headers = {**headers, "ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def respond(
+        self,
+        request: Request,
+        tags: Iterable[str],
+        render: Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]]
+    ) -> Response:
+        """
+        Serve the cached response for this request, or call ``render`` for
+        (payload, headers), cache its JSON and serve that. If the store
+        fails, the response is rendered and served uncached.
+        """
+        if not self.enabled:
+            payload, headers = await render()
+            body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+            return self._respond(request, body, headers)
+
+        started = time.perf_counter()
+        try:
+            key = await self._key(request, tuple(tags))
+            cached = await self._call(self.store.get, key)
+        except Exception as e:
+            self._failed("lookup", e)
+            key = cached = None
+        if cached is not None:
+            header_line, _, body = cached.partition(b"\n")
+            response = self._respond(request, body, json.loads(header_line))
+            with self._lock:
+                self.hits += 1
+                self._hit_seconds += time.perf_counter() - started
+            return response
+
+        payload, headers = await render()
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        if key is not None:
+            try:
+                await self._call(self.store.set, key, json.dumps(headers).encode() + b"\n" + body, self.ttl)
+            except Exception as e:
+                self._failed("store", e)
+        with self._lock:
+            self.misses += 1
+            self._miss_seconds += time.perf_counter() - started
+        return self._respond(request, body, headers)
+
+    def _invalidated(self, tags: Tuple[str, ...], error: Optional[Exception]):
+        if error is not None:
+            # A failed invalidation must not fail the write; entries still expire
+            logger.error(f"Error invalidating response cache tags {tags}: {error}")
+        with self._lock:
+            if error is not None:
+                self.errors += 1
+            else:
+                self.invalidations += 1
+
+    def invalidate(self, *tags: str):
+        """
+        Invalidate everything cached under ``tags``. Blocks on the store, so
+        use ``ainvalidate`` on the event loop.
+        """
+        if not self.enabled or not tags:
+            return
+        try:
+            self.store.bump(tags)
+        except Exception as e:
+            self._invalidated(tags, e)
+            return
+        self._invalidated(tags, None)
+
+    async def ainvalidate(self, *tags: str):
+        """``invalidate`` for async code, off the event loop if the store blocks"""
+        if not self.enabled or not tags:
+            return
+        try:
+            await self._call(self.store.bump, tags)
+        except Exception as e:
+            self._invalidated(tags, e)
+            return
+        self._invalidated(tags, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_hit = self._hit_seconds / self.hits if self.hits else None
+            avg_miss = self._miss_seconds / self.misses if self.misses else None
+            saved = (avg_miss - avg_hit) * self.hits if avg_hit is not None and avg_miss is not None else 0.0
+            return {
+                "backend": type(self.store).__name__ if self.enabled else "off",
+                "entries": self.store.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+                "evictions": self.store.evictions,
+                "avg_hit_ms": avg_hit * 1000 if avg_hit is not None else None,
+                "avg_miss_ms": avg_miss * 1000 if avg_miss is not None else None,
+                "saved_seconds": round(max(saved, 0.0), 3)
+            }
+
+def create_response_cache(backend: str) -> ResponseCache:
+    if backend == "redis":
+        if REDIS_URL:
+            try:
+                return ResponseCache(RedisStore(REDIS_URL), RESPONSE_CACHE_TTL)
+            except ImportError:
+                logger.warning("redis is not installed; using the in-process response cache")
+        else:
+            logger.warning("REDIS_URL is not set; using the in-process response cache")
+    return ResponseCache(
+        MemoryStore(RESPONSE_CACHE_MAX_ENTRIES),
+        RESPONSE_CACHE_TTL,
+        enabled=backend != "off"
+    )
+
+# Create a global instance
+response_cache = create_response_cache(RESPONSE_CACHE_BACKEND)
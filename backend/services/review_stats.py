@@ -0,0 +1,107 @@
+import logging
+from sqlalchemy import Float, case, cast, func, or_, select, update
+from sqlalchemy.orm import Session
+from ..models import Product, Review
+from .response_cache import response_cache, product_tag, PRODUCTS_TAG
+
+logger = logging.getLogger(__name__)
+
+RATINGS = range(1, 6)
+
+def review_stats_update(product_id: str, rating: int, delta: int):
+    """
+    UPDATE adding (delta=1) or removing (delta=-1) one review's rating to its
+    product's aggregates. The increments happen in SQL, so concurrent reviews
+    of the same product don't lose updates.
+    """
+    new_count = Product.review_count + delta
+    new_sum = Product.rating_sum + delta * rating
+    return (
+        update(Product)
+        .where(Product.id == product_id)
+        .values({
+            Product.review_count: new_count,
+            Product.rating_sum: new_sum,
+            Product.rating_average: case(
+                (new_count > 0, cast(new_sum, Float) / new_count),
+                else_=0.0
+            ),
+            getattr(Product, f"rating_{rating}_count"): getattr(Product, f"rating_{rating}_count") + delta
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+def _from_reviews(aggregate, *criteria):
+    """Scalar subquery aggregating the current product's reviews (1-5 stars)"""
+    return (
+        select(aggregate)
+        .where(Review.product_id == Product.id, Review.rating.between(1, 5), *criteria)
+        .scalar_subquery()
+    )
+
+def reconcile_review_stats(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recompute every product's review aggregates from the reviews table and
+    fix the ones that drifted. Returns the number of products corrected.
+
+    Each batch is one UPDATE whose new values are subqueries over reviews,
+    so the counts are read and written under the row locks it takes; a
+    review stored concurrently is counted here or by its own increment,
+    never overwritten.
+    """
+    review_count = _from_reviews(func.count(Review.id))
+    rating_sum = _from_reviews(func.coalesce(func.sum(Review.rating), 0))
+    expected = {
+        Product.review_count: review_count,
+        Product.rating_sum: rating_sum,
+        **{
+            getattr(Product, f"rating_{rating}_count"): _from_reviews(func.count(Review.id), Review.rating == rating)
+            for rating in RATINGS
+        }
+    }
+    rating_average = case(
+        (review_count > 0, cast(rating_sum, Float) / review_count),
+        else_=0.0
+    )
+    # The average is a float; allow for rounding, not for a stale value
+    drifted = or_(
+        *[column != value for column, value in expected.items()],
+        func.abs(Product.rating_average - rating_average) > 1e-9
+    )
+
+    corrected = 0
+    last_id = ""
+    while True:
+        ids = db.execute(
+            select(Product.id)
+            .where(Product.id > last_id)
+            .order_by(Product.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        changed = db.execute(
+            update(Product)
+            .where(Product.id.in_(ids), drifted)
+            .values({**expected, Product.rating_average: rating_average})
+            .returning(Product.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.commit()
+        if changed:
+            response_cache.invalidate(PRODUCTS_TAG, *[product_tag(product_id) for product_id in changed])
+            corrected += len(changed)
+    return corrected
+
+if __name__ == "__main__":
+    # Recompute review aggregates in bulk, e.g. after importing reviews
+    from ..config import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        logger.info(f"Corrected review stats of {reconcile_review_stats(db)} products")
+    finally:
+        db.close()
@@ -0,0 +1,84 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List
+
+class TermMatcher:
+    """
+    Case-insensitive substring matcher (the semantics of the original
+    ``term in description.lower()`` checks) compiled into a single regex
+    alternation, so the description is scanned once regardless of list size.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = sorted({t.strip().lower() for t in terms if t.strip()}, key=len, reverse=True)
+        if self.terms:
+            alternation = "|".join(re.escape(term) for term in self.terms)
+            self._pattern = re.compile(alternation, re.IGNORECASE)
+        else:
+            self._pattern = None
+
+    def find(self, text: str) -> List[str]:
+        if self._pattern is None or not text:
+            return []
+        return sorted({match.group(0).lower() for match in self._pattern.finditer(text)})
+
+    def matches(self, text: str) -> bool:
+        return self._pattern is not None and bool(text) and self._pattern.search(text) is not None
+
+class ScreeningMetrics:
+    """
+    Per-tier timing and escalation counters for the screening pipeline
+    """
+
+    TIERS = ("rules", "classifiers", "generative")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.screened = 0
+            self.escalated = 0
+            self.rule_matches = 0
+            self.tier_calls = {tier: 0 for tier in self.TIERS}
+            self.tier_seconds = {tier: 0.0 for tier in self.TIERS}
+
+    @contextmanager
+    def tier(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.tier_calls[name] += 1
+                self.tier_seconds[name] += elapsed
+
+    def record(self, screened: int, rule_matches: int, escalated: int):
+        with self._lock:
+            self.screened += screened
+            self.rule_matches += rule_matches
+            self.escalated += escalated
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "screened": self.screened,
+                "rule_matches": self.rule_matches,
+                "escalated": self.escalated,
+                "escalation_rate": (self.escalated / self.screened) if self.screened else 0.0,
+                "tiers": {
+                    tier: {
+                        "calls": self.tier_calls[tier],
+                        "seconds": self.tier_seconds[tier],
+                        "avg_ms": (
+                            self.tier_seconds[tier] / self.tier_calls[tier] * 1000
+                            if self.tier_calls[tier] else 0.0
+                        )
+                    }
+                    for tier in self.TIERS
+                }
+            }
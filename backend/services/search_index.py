@@ -0,0 +1,374 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Select, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from ..config import AsyncSessionLocal, SEARCH_BACKEND, SEARCH_REFRESH_SECONDS
+from ..models import ModerationJob, Product
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it of on or that the this to with".split()
+)
+
+# Each field's terms count this many times towards a listing's term frequency
+FIELD_WEIGHTS = {
+    "name": 3,
+    "category": 2,
+    "description": 1,
+}
+
+# Weighted document searched by the Postgres backend. It must stay textually
+# identical to the expression of the ix_products_search GIN index
+# (migration 0004), or the planner won't use the index.
+SEARCH_DOCUMENT_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [
+        token for token in _TOKEN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+class InvertedIndex:
+    """
+    In-memory inverted index with BM25 ranking.
+
+    Postings map each term to {document number: weighted term frequency}.
+    Documents are numbered internally so postings hold small ints instead of
+    UUID strings; numbers of removed documents are reused.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_ids: List[Optional[str]] = []
+        self._doc_numbers: Dict[str, int] = {}
+        self._doc_lengths: List[int] = []
+        self._doc_terms: List[Tuple[str, ...]] = []
+        self._free: List[int] = []
+        self._total_length = 0
+        # Per-document BM25 length normalization, recomputed when the
+        # average document length has drifted
+        self._norms: List[float] = []
+        self._norms_average = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_numbers)
+
+    def add(self, doc_id: str, name: Optional[str], description: Optional[str], category: Optional[str]):
+        """
+        Index a listing, replacing any previous version of it
+        """
+        frequencies = Counter()
+        for field, text in (("name", name), ("category", category), ("description", description)):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                frequencies[token] += weight
+        length = sum(frequencies.values())
+
+        with self._lock:
+            self.remove(doc_id)
+            if self._free:
+                number = self._free.pop()
+                self._doc_ids[number] = doc_id
+                self._doc_lengths[number] = length
+                self._doc_terms[number] = tuple(frequencies)
+                self._norms[number] = self._norm(length)
+            else:
+                number = len(self._doc_ids)
+                self._doc_ids.append(doc_id)
+                self._doc_lengths.append(length)
+                self._doc_terms.append(tuple(frequencies))
+                self._norms.append(self._norm(length))
+            self._doc_numbers[doc_id] = number
+            self._total_length += length
+
+            for term, frequency in frequencies.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                postings[number] = frequency
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            number = self._doc_numbers.pop(doc_id, None)
+            if number is None:
+                return
+            for term in self._doc_terms[number]:
+                postings = self._postings[term]
+                del postings[number]
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._doc_lengths[number]
+            self._doc_ids[number] = None
+            self._doc_lengths[number] = 0
+            self._doc_terms[number] = ()
+            self._free.append(number)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_ids.clear()
+            self._doc_numbers.clear()
+            self._doc_lengths.clear()
+            self._doc_terms.clear()
+            self._free.clear()
+            self._total_length = 0
+            self._norms = []
+            self._norms_average = 0.0
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """
+        Return up to ``limit`` (doc_id, score) pairs, best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._doc_numbers)
+            if not terms or count == 0:
+                return []
+            norms = self._length_norms(count)
+            k1 = self.k1
+
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                boost = math.log(1 + (count - df + 0.5) / (df + 0.5)) * (k1 + 1)
+                get = scores.get
+                for number, frequency in postings.items():
+                    scores[number] = get(number, 0.0) + boost * frequency / (frequency + norms[number])
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self._doc_ids[number], score) for number, score in best]
+
+    def _norm(self, length: int) -> float:
+        if not self._norms_average:
+            self._norms_average = float(length or 1)
+        return self.k1 * (1 - self.b + self.b * length / self._norms_average)
+
+    def _length_norms(self, count: int) -> List[float]:
+        average_length = self._total_length / count or 1.0
+        if abs(average_length - self._norms_average) > 0.01 * self._norms_average:
+            self._norms_average = average_length
+            self._norms = [self._norm(length) for length in self._doc_lengths]
+        return self._norms
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": len(self._doc_numbers),
+                "terms": len(self._postings)
+            }
+
+def classified_since(since: datetime) -> Select:
+    """Ids of listings whose moderation succeeded at or after ``since``"""
+    return select(ModerationJob.product_id).where(
+        ModerationJob.status == "succeeded",
+        ModerationJob.finished_at >= since
+    )
+
+class MemorySearchBackend:
+    """
+    Search served from an in-process InvertedIndex. Listings are added and
+    removed by the product routes and the index is rebuilt from the database
+    at startup. Listings the moderation workers classify (which sets their
+    category) are re-indexed on the next search. Every API process holds its
+    own copy, so this suits single-worker and test deployments.
+    """
+
+    name = "memory"
+    # Jobs finishing shortly before a refresh may commit after it; look back
+    # this far so they are still picked up (re-indexing is idempotent)
+    REFRESH_OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, refresh_seconds: float = SEARCH_REFRESH_SECONDS):
+        self.index = InvertedIndex()
+        self.refresh_seconds = refresh_seconds
+        self._synced_at = datetime.utcnow()
+        self._next_refresh = 0.0
+        self.refreshed = 0
+
+    def add(self, product: Product):
+        self.index.add(product.id, product.name, product.description, product.category)
+
+    def remove(self, product_id: str):
+        self.index.remove(product_id)
+
+    async def rebuild(self, batch_size: int = 5000):
+        started = time.perf_counter()
+        self._synced_at = datetime.utcnow()
+        self.index.clear()
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                select(Product.id, Product.name, Product.description, Product.category)
+                .execution_options(yield_per=batch_size)
+            )
+            async for row in result:
+                self.index.add(row.id, row.name, row.description, row.category)
+        logger.info(f"Search index rebuilt with {len(self.index)} listings in {time.perf_counter() - started:.1f}s")
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """
+        Re-index listings whose moderation finished since the last refresh.
+        Returns the number re-indexed.
+        """
+        synced_at = datetime.utcnow()
+        rows = (await db.execute(
+            select(Product.id, Product.name, Product.description, Product.category)
+            .where(Product.id.in_(classified_since(self._synced_at - self.REFRESH_OVERLAP)))
+        )).all()
+        for row in rows:
+            self.index.add(row.id, row.name, row.description, row.category)
+        self._synced_at = synced_at
+        self.refreshed += len(rows)
+        return len(rows)
+
+    async def search(self, db: AsyncSession, query: str, limit: int, offset: int = 0) -> List[Product]:
+        if time.monotonic() >= self._next_refresh:
+            self._next_refresh = time.monotonic() + self.refresh_seconds
+            await self.refresh(db)
+
+        # The index also holds pending and rejected listings (moderation runs
+        # in other processes), so rank a wider window until the page is full
+        wanted = offset + limit
+        window = max(wanted, 1)
+        while True:
+            # Scoring is CPU-bound; keep it off the event loop
+            ranked = await run_in_threadpool(self.index.search, query, window)
+            if not ranked:
+                return []
+            result = await db.execute(
+                select(Product).where(
+                    Product.id.in_([doc_id for doc_id, _ in ranked]),
+                    Product.status == "published"
+                )
+            )
+            published = {product.id: product for product in result.scalars()}
+            products = [published[doc_id] for doc_id, _ in ranked if doc_id in published]
+            if len(products) >= wanted or len(ranked) < window:
+                return products[offset:wanted]
+            window *= 2
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, **self.index.stats(), "refreshed": self.refreshed}
+
+class PostgresSearchBackend:
+    """
+    Search over a weighted tsvector of name/category/description, served by
+    a GIN expression index that Postgres keeps up to date on every write
+    """
+
+    name = "postgres"
+
+    def add(self, product: Product):
+        pass
+
+    def remove(self, product_id: str):
+        pass
+
+    async def rebuild(self):
+        pass
+
+    async def search(self, db: AsyncSession, query: str, limit: int, offset: int = 0) -> List[Product]:
+        document = literal_column(f"({SEARCH_DOCUMENT_SQL})")
+        ts_query = func.websearch_to_tsquery(literal_column("'english'"), query)
+        rank = func.ts_rank_cd(document, ts_query)
+        result = await db.execute(
+            select(Product)
+            .where(Product.status == "published", document.op("@@")(ts_query))
+            .order_by(rank.desc(), Product.created_at.desc(), Product.id.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    def stats(self) -> Dict:
+        return {"backend": self.name}
+
+def create_search_backend(name: str):
+    if name == "postgres":
+        return PostgresSearchBackend()
+    if name == "memory":
+        return MemorySearchBackend()
+    raise ValueError(f"Unknown search backend: {name}")
+
+# Create a global instance
+search_backend = create_search_backend(SEARCH_BACKEND)
+
+def _synthetic_listings(count: int, seed: int = 0):
+    import itertools
+    import random
+
+    rng = random.Random(seed)
+    # Zipf-like vocabulary so a few terms are common and most are rare
+    vocabulary = [f"term{i}" for i in range(50000)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    categories = ["electronics", "books", "clothing", "home", "toys", "garden", "sports", "music"]
+    for i in range(count):
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=40)
+        yield (
+            f"listing-{i}",
+            " ".join(words[:5]),
+            " ".join(words[5:]),
+            rng.choice(categories)
+        )
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import statistics
+
+    parser = argparse.ArgumentParser(description="Benchmark in-memory search query latency")
+    parser.add_argument("--listings", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--terms", type=int, default=2, help="Terms per query")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    index = InvertedIndex()
+    started = time.perf_counter()
+    for listing in _synthetic_listings(args.listings):
+        index.add(*listing)
+    print(f"Indexed {args.listings} listings in {time.perf_counter() - started:.1f}s ({index.stats()['terms']} terms)")
+
+    rng = random.Random(1)
+    vocabulary_size = 50000
+    latencies = []
+    for _ in range(args.queries):
+        # Mix of frequent and rare terms
+        query = " ".join(
+            f"term{int(rng.paretovariate(1.0)) % vocabulary_size}"
+            for _ in range(args.terms)
+        )
+        started = time.perf_counter()
+        index.search(query, args.limit)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    print(
+        f"{args.queries} queries: "
+        f"p50 {statistics.median(latencies):.2f}ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95)]:.2f}ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)]:.2f}ms, "
+        f"max {latencies[-1]:.2f}ms"
+    )
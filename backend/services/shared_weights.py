@@ -0,0 +1,210 @@
+import fcntl
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from ..config import AI_MODEL_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Model head to rebuild for each task the classifier uses
+TASKS = {
+    "text-classification": "AutoModelForSequenceClassification",
+    "text-generation": "AutoModelForCausalLM",
+}
+
+WEIGHTS_FILE = "weights.pt"
+
+def shared_model_dir(model_name: str) -> str:
+    return os.path.join(AI_MODEL_CACHE_DIR, "shared", model_name.replace("/", "--"))
+
+@contextmanager
+def _export_lock(directory: str):
+    """Serialize the one-time export across workers starting together"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _auto_class(task: str):
+    import transformers
+
+    if task not in TASKS:
+        raise ValueError(f"Unsupported task '{task}', expected one of {tuple(TASKS)}")
+    return getattr(transformers, TASKS[task])
+
+def export_shared_model(model_name: str, task: str) -> str:
+    """
+    Write ``model_name`` once as config + tokenizer + a single torch
+    state-dict file that workers can memory-map. Returns the directory.
+    """
+    directory = shared_model_dir(model_name)
+    weights_path = os.path.join(directory, WEIGHTS_FILE)
+    if os.path.exists(weights_path):
+        return directory
+
+    with _export_lock(directory):
+        if os.path.exists(weights_path):
+            return directory
+
+        import torch
+        from transformers import AutoTokenizer
+
+        logger.info(f"Exporting {model_name} for shared loading under {directory}")
+        model = _auto_class(task).from_pretrained(model_name, cache_dir=AI_MODEL_CACHE_DIR)
+        model.config.save_pretrained(directory)
+        AutoTokenizer.from_pretrained(model_name, cache_dir=AI_MODEL_CACHE_DIR).save_pretrained(directory)
+
+        # Contiguous tensors so every storage maps straight from the file
+        state = {name: tensor.contiguous() for name, tensor in model.state_dict().items()}
+        temp_path = f"{weights_path}.{os.getpid()}.tmp"
+        torch.save(state, temp_path)
+        os.replace(temp_path, weights_path)
+    return directory
+
+def load_shared_model(model_name: str, task: str):
+    """
+    Build the model with its parameters memory-mapped read-only from the
+    exported weights file. Every worker maps the same file, so the weights
+    live once in the page cache instead of once per process.
+    """
+    import torch
+
+    directory = export_shared_model(model_name, task)
+    auto_class = _auto_class(task)
+
+    from transformers import AutoConfig
+
+    config = AutoConfig.from_pretrained(directory)
+    try:
+        # Skip random initialisation: the parameters are replaced below, and
+        # untouched torch.empty pages never become resident
+        from transformers.modeling_utils import no_init_weights
+    except ImportError:
+        model = auto_class.from_config(config)
+    else:
+        with no_init_weights():
+            model = auto_class.from_config(config)
+
+    state = torch.load(os.path.join(directory, WEIGHTS_FILE), mmap=True, weights_only=True, map_location="cpu")
+    # assign=True keeps the mapped tensors instead of copying into the
+    # freshly allocated ones (which are then freed)
+    model.load_state_dict(state, assign=True)
+    model.tie_weights()
+    model.eval()
+    # Inference never writes the weights, so the private mapping stays
+    # shared with the page cache; gradients must not be tracked either
+    for parameter in model.parameters():
+        parameter.requires_grad_(False)
+    return model
+
+def load_shared_pipeline(model_name: str, task: str):
+    """
+    A transformers pipeline for ``task`` around the memory-mapped model
+    """
+    from transformers import AutoTokenizer, pipeline
+
+    model = load_shared_model(model_name, task)
+    tokenizer = AutoTokenizer.from_pretrained(shared_model_dir(model_name))
+    return pipeline(task, model=model, tokenizer=tokenizer)
+
+def memory_usage(pid: Optional[int] = None) -> Dict[str, int]:
+    """
+    Resident (RSS), proportional (PSS) and unique (USS: private pages only)
+    memory of a process in bytes, from /proc/<pid>/smaps_rollup
+    """
+    path = f"/proc/{pid or 'self'}/smaps_rollup"
+    fields = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+def _warm_up(name: str, model):
+    """One inference so lazily allocated buffers are counted too"""
+    text = "Brand new wireless headphones, still sealed in the box."
+    if name == "content_chain":
+        model.apply([{"text": text}])
+    else:
+        model([text], truncation=True)
+
+def _worker(ready, release, shared: bool, models: List[str]):
+    """Load the classifier models the way an API worker would, then wait"""
+    from .. import config
+
+    # Before ai_classifier (and inference_backends) import the setting
+    config.AI_SHARED_WEIGHTS = shared
+    from .ai_classifier import classifier
+
+    for name in models:
+        model = classifier.registry.get(name)
+        # Not through the classifier's tiers: those would load the
+        # generative model for anything they're unsure about
+        if model is not None:
+            _warm_up(name, model)
+    ready.put((os.getpid(), classifier.registry.status()))
+    release.wait()
+
+def measure_workers(workers: int, shared: bool, models: List[str]) -> Dict:
+    """
+    Start ``workers`` spawned processes (as uvicorn --workers does), load
+    only ``models`` in each and report per-worker RSS/PSS/USS
+    """
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    release = context.Event()
+    processes = [context.Process(target=_worker, args=(ready, release, shared, models)) for _ in range(workers)]
+
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    try:
+        statuses = [ready.get(timeout=1800) for _ in processes]
+        load_seconds = time.perf_counter() - started
+        usage = [{"pid": pid, **memory_usage(pid)} for pid, _ in statuses]
+    finally:
+        release.set()
+        for process in processes:
+            process.join()
+
+    mb = 1024 * 1024
+    return {
+        "shared_weights": shared,
+        "workers": workers,
+        "models": models,
+        "load_seconds": round(load_seconds, 1),
+        "model_status": statuses[0][1],
+        "per_worker_mb": [
+            {key: round(value / mb, 1) if key != "pid" else value for key, value in worker.items()}
+            for worker in usage
+        ],
+        "total_uss_mb": round(sum(worker["uss"] for worker in usage) / mb, 1),
+        "total_pss_mb": round(sum(worker["pss"] for worker in usage) / mb, 1)
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure per-worker memory with and without shared model weights")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--models", default="category,moderation", help="Registry names to load (add content_chain for GPT-2)")
+    parser.add_argument("--mode", choices=["shared", "private", "both"], default="both")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    models = [name.strip() for name in args.models.split(",") if name.strip()]
+    for shared in ([True, False] if args.mode == "both" else [args.mode == "shared"]):
+        print(json.dumps(measure_workers(args.workers, shared, models)))
@@ -0,0 +1,35 @@
+import base64
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings are read when backend.config is first imported, so point them at
+# scratch storage before any test imports the application
+_work_dir = tempfile.mkdtemp(prefix="zuno-tests-")
+os.makedirs(os.path.join(_work_dir, "gpghome"), mode=0o700)
+os.environ.update({
+    "DATABASE_URL": os.getenv("TEST_DATABASE_URL", f"sqlite:///{os.path.join(_work_dir, 'test.db')}"),
+    "UPLOAD_DIR": os.path.join(_work_dir, "uploads"),
+    "AI_MODEL_CACHE_DIR": os.path.join(_work_dir, "models"),
+    "PGP_HOME_DIR": os.path.join(_work_dir, "gpghome"),
+    "ENCRYPTION_KEY": base64.urlsafe_b64encode(os.urandom(32)).decode(),
+    "AI_WARM_ON_STARTUP": "false",
+    "MODERATION_WORKERS": "0",
+    "CLASSIFICATION_CACHE_PERSIST": "false",
+    "PROFILER_ENABLED": "false"
+})
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_work_dir, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def migrated_database() -> str:
+    """The test database with every Alembic migration applied"""
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BACKEND_DIR, check=True)
+    return os.environ["DATABASE_URL"]
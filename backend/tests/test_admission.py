@@ -0,0 +1,234 @@
+import asyncio
+from datetime import timedelta
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from backend.routers import auth
+from backend.routers.auth import client_id_for_token, create_access_token
+from backend.services.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected,
+    ConcurrencyPool,
+    RateLimiter
+)
+from backend.services.auth_cache import RevocationList
+
+def _no_database():
+    raise AssertionError("admission opened a database session")
+
+def test_client_id_comes_from_the_token_alone(monkeypatch):
+    monkeypatch.setattr(auth, "AsyncSessionLocal", _no_database)
+    monkeypatch.setattr(auth, "revocation_list", RevocationList(token_lifetime=60))
+    token = create_access_token({"sub": "never-seen-user"}, timedelta(minutes=5))
+
+    assert asyncio.run(client_id_for_token(token)) == "never-seen-user"
+    assert asyncio.run(client_id_for_token("not-a-token")) is None
+    assert asyncio.run(client_id_for_token(create_access_token({"sub": "late"}, timedelta(minutes=-1)))) is None
+
+    auth.revocation_list.revoke_token(auth._decode_token(token)["jti"], 2 ** 31)
+    assert asyncio.run(client_id_for_token(token)) is None
+
+def test_pool_admits_up_to_its_concurrency_then_queues_in_order():
+    async def scenario():
+        pool = ConcurrencyPool("test", concurrency=2, queue_size=2, max_wait=5)
+        await pool.acquire()
+        await pool.acquire()
+        order = []
+
+        async def waiter(name):
+            await pool.acquire()
+            order.append(name)
+
+        tasks = [asyncio.create_task(waiter("first")), asyncio.create_task(waiter("second"))]
+        await asyncio.sleep(0)
+        assert (pool.active, pool.waiting) == (2, 2)
+
+        pool.release(0.01)
+        pool.release(0.01)
+        await asyncio.gather(*tasks)
+        assert order == ["first", "second"]
+        # The slots were handed over, not freed and re-taken
+        assert (pool.active, pool.waiting) == (2, 0)
+        pool.release(0.01)
+        pool.release(0.01)
+        assert pool.active == 0
+
+    asyncio.run(scenario())
+
+def test_full_queue_is_shed():
+    async def scenario():
+        pool = ConcurrencyPool("test", concurrency=1, queue_size=1, max_wait=5)
+        await pool.acquire()
+        queued = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await pool.acquire()
+        assert (rejected.value.status_code, rejected.value.reason) == (503, "Server busy (queue_full)")
+
+        pool.release(0.01)
+        await queued
+        assert pool.counts["shed_queue_full"] == 1
+
+    asyncio.run(scenario())
+
+def test_predicted_deadline_miss_is_shed_on_arrival():
+    async def scenario():
+        pool = ConcurrencyPool("test", concurrency=1, queue_size=10, max_wait=1)
+        pool.service_time = 2.0
+        await pool.acquire()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await pool.acquire()
+        assert rejected.value.reason == "Server busy (deadline)"
+        assert rejected.value.retry_after == 2.0
+        assert pool.waiting == 0
+
+    asyncio.run(scenario())
+
+def test_waiter_without_a_slot_in_time_is_shed():
+    async def scenario():
+        pool = ConcurrencyPool("test", concurrency=1, queue_size=1, max_wait=0.05)
+        await pool.acquire()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await pool.acquire()
+        assert rejected.value.reason == "Server busy (timeout)"
+        assert pool.waiting == 0
+
+        pool.release(0.01)
+        assert pool.active == 0
+
+    asyncio.run(scenario())
+
+def test_cancelled_waiter_popped_by_a_release_is_not_removed_twice():
+    async def scenario():
+        pool = ConcurrencyPool("test", concurrency=1, queue_size=2, max_wait=5)
+        await pool.acquire()
+        cancelled = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+
+        # Cancel the waiter and release before it resumes: the release skips
+        # its cancelled future and frees the slot
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        pool.release(0.01)
+
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert (pool.active, pool.waiting) == (0, 0)
+
+    asyncio.run(scenario())
+
+def test_token_bucket_limits_each_client():
+    limiter = RateLimiter(rate_per_minute=60, burst=2, max_clients=10)
+
+    assert limiter.take("alice") == limiter.take("alice") == 0
+    assert 0 < limiter.take("alice") <= 1
+    assert limiter.take("bob") == 0
+
+def _controller(rate_per_minute=0, max_wait=5):
+    return AdmissionController(
+        enabled=True,
+        heavy_routes={"POST /items/{item_id}"},
+        exempt_paths={"/health"},
+        pools={
+            "heavy": ConcurrencyPool("heavy", 1, 0, max_wait),
+            "standard": ConcurrencyPool("standard", 1, 0, max_wait)
+        },
+        limiters={
+            "heavy": RateLimiter(rate_per_minute, 1, 10),
+            "standard": RateLimiter(rate_per_minute, 1, 10)
+        }
+    )
+
+def test_rate_limited_client_gets_429():
+    async def scenario():
+        controller = _controller(rate_per_minute=6)
+        pool = controller.pools["standard"]
+        await controller.admit(pool, "alice")
+        pool.release(0.01)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.admit(pool, "alice")
+        assert rejected.value.status_code == 429
+        assert 9 < rejected.value.retry_after <= 10
+        # Anonymous requests are only bounded by the pool
+        await controller.admit(pool, None)
+        assert pool.counts["rate_limited"] == 1
+
+    asyncio.run(scenario())
+
+def _app(controller, identify=None):
+    release = asyncio.Event()
+
+    async def item(request):
+        if request.query_params.get("hold"):
+            await release.wait()
+        return PlainTextResponse("ok")
+
+    async def identify_token(token):
+        return token
+
+    inner = Starlette(routes=[
+        Route("/items/{item_id}", item, methods=["GET", "POST"]),
+        Route("/health", item)
+    ])
+    app = AdmissionMiddleware(inner, inner.routes, identify or identify_token, controller)
+    return app, release
+
+def test_middleware_maps_routes_to_pools():
+    controller = _controller()
+    app, _ = _app(controller)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.post("/items/1")).status_code == 200
+            assert (await client.get("/items/1")).status_code == 200
+            assert (await client.get("/health")).status_code == 200
+            assert (await client.get("/nowhere")).status_code == 404
+
+    asyncio.run(scenario())
+    assert controller.pools["heavy"].counts["admitted"] == 1
+    # The GET and the unmatched path ran in the standard pool; /health is exempt
+    assert controller.pools["standard"].counts["admitted"] == 2
+
+def test_middleware_sheds_with_retry_after():
+    controller = _controller()
+    app, release = _app(controller)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            held = asyncio.create_task(client.post("/items/1", params={"hold": "1"}))
+            while controller.pools["heavy"].active == 0:
+                await asyncio.sleep(0.01)
+
+            busy = await client.post("/items/2")
+            assert busy.status_code == 503
+            assert busy.json() == {"detail": "Server busy (queue_full)"}
+            assert busy.headers["Retry-After"] == "5"
+            # Other pools are unaffected
+            assert (await client.get("/items/2")).status_code == 200
+
+            release.set()
+            assert (await held).status_code == 200
+
+    asyncio.run(scenario())
+
+def test_middleware_rate_limits_identified_clients():
+    controller = _controller(rate_per_minute=6)
+    app, _ = _app(controller)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            headers = {"Authorization": "Bearer alice"}
+            assert (await client.get("/items/1", headers=headers)).status_code == 200
+            limited = await client.get("/items/1", headers=headers)
+            assert limited.status_code == 429
+            assert limited.headers["Retry-After"] == "10"
+            assert (await client.get("/items/1", params={"token": "bob"})).status_code == 200
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from datetime import timedelta
+from jose import jwt
+from backend.config import ALGORITHM
+from backend.routers import auth
+from backend.routers.auth import SECRET_KEY, client_id_for_token, create_access_token, logout
+from backend.services.auth_cache import RevocationList
+
+def _claims(user_id: str) -> dict:
+    token = create_access_token({"sub": user_id}, timedelta(minutes=5))
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+def test_tokens_issued_up_to_logout_everywhere_are_revoked(monkeypatch):
+    revocations = RevocationList(token_lifetime=60)
+    now = 1_700_000_000_750_000_000
+    monkeypatch.setattr(time, "time_ns", lambda: now)
+    monkeypatch.setattr(time, "time", lambda: now / 1e9)
+
+    revocations.revoke_user("user")
+
+    # Issued at the very same instant: revocation wins
+    assert revocations.is_revoked(None, "user", now)
+    assert revocations.is_revoked(None, "user", now - 1)
+    assert revocations.is_revoked(None, "user", None)
+    # The login right after
+    assert not revocations.is_revoked(None, "user", now + 1)
+    assert not revocations.is_revoked(None, "someone-else", now - 1)
+
+def test_issued_at_claims():
+    claims = _claims("user")
+
+    # iat stays whole seconds for JWT libraries; iat_ns carries the precision
+    assert isinstance(claims["iat"], int)
+    assert claims["iat"] == claims["iat_ns"] // 1_000_000_000
+
+def test_logout_everywhere_revokes_tokens_from_the_same_second(monkeypatch):
+    monkeypatch.setattr(auth, "revocation_list", RevocationList(token_lifetime=300))
+    earlier = create_access_token({"sub": "user"}, timedelta(minutes=5))
+    legacy_claims = {"sub": "user", "exp": _claims("user")["exp"], "iat": int(time.time())}
+    legacy = jwt.encode(legacy_claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    asyncio.run(logout(earlier, everywhere=True))
+    later = create_access_token({"sub": "user"}, timedelta(minutes=5))
+
+    assert asyncio.run(client_id_for_token(earlier)) is None
+    # Tokens without iat_ns count from the start of their second
+    assert asyncio.run(client_id_for_token(legacy)) is None
+    assert asyncio.run(client_id_for_token(later)) == "user"
+
+def test_user_cutoffs_are_dropped_after_the_token_lifetime(monkeypatch):
+    revocations = RevocationList(token_lifetime=60)
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    monkeypatch.setattr(time, "time_ns", lambda: int(now[0] * 1e9))
+    revocations.revoke_user("old")
+
+    now[0] += 61
+    revocations.revoke_user("new")
+
+    assert revocations.stats()["revoked_users"] == 1
+    assert not revocations.is_revoked(None, "old", int((now[0] - 120) * 1e9))
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+import pytest
+from backend.services.batching import BatchingEngine
+
+class Handler:
+    """Records each batch it is given and the thread it runs on"""
+
+    def __init__(self, seconds: float = 0.0):
+        self.seconds = seconds
+        self.batches = []
+        self.threads = set()
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.threads.add(threading.get_ident())
+        time.sleep(self.seconds)
+        return [item.upper() for item in items]
+
+def _run(engine: BatchingEngine, coroutine):
+    async def run():
+        try:
+            return await coroutine()
+        finally:
+            await engine.stop()
+    return asyncio.run(run())
+
+def test_concurrent_requests_share_a_batch():
+    handler = Handler()
+    engine = BatchingEngine(handler, max_batch_size=4, max_wait_ms=50)
+
+    async def submit():
+        return await asyncio.gather(*(engine.submit(item) for item in "abcdef"))
+
+    assert _run(engine, submit) == list("ABCDEF")
+    assert handler.batches == [list("abcd"), list("ef")]
+    assert threading.get_ident() not in handler.threads
+
+def test_partial_batch_is_flushed_after_the_wait():
+    handler = Handler()
+    engine = BatchingEngine(handler, max_batch_size=16, max_wait_ms=20)
+
+    async def submit():
+        started = time.perf_counter()
+        result = await engine.submit("a")
+        return result, time.perf_counter() - started
+
+    result, seconds = _run(engine, submit)
+    assert result == "A"
+    assert 0.02 <= seconds < 1
+    assert engine.stats()["batches"] == 1
+
+def test_requests_queue_up_behind_a_busy_worker():
+    handler = Handler(seconds=0.1)
+    engine = BatchingEngine(handler, max_batch_size=16, max_wait_ms=0)
+
+    async def submit():
+        first = asyncio.ensure_future(engine.submit("a"))
+        await asyncio.sleep(0.02)
+        # While "a" runs, these accumulate into the next batch
+        return await asyncio.gather(first, *(engine.submit(item) for item in "bcd"))
+
+    assert _run(engine, submit) == list("ABCD")
+    assert handler.batches == [["a"], list("bcd")]
+
+def test_handler_errors_reach_every_caller():
+    def fail(items):
+        raise ValueError("model crashed")
+
+    engine = BatchingEngine(fail, max_batch_size=4, max_wait_ms=10)
+
+    async def submit():
+        return await asyncio.gather(*(engine.submit(item) for item in "ab"), return_exceptions=True)
+
+    assert [type(result) for result in _run(engine, submit)] == [ValueError, ValueError]
+
+def test_mismatched_result_count_is_an_error():
+    engine = BatchingEngine(lambda items: [], max_batch_size=4, max_wait_ms=10)
+
+    async def submit():
+        return await engine.submit("a")
+
+    with pytest.raises(RuntimeError):
+        _run(engine, submit)
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import uuid
+from datetime import timedelta
+import httpx
+import pytest
+from backend.config import SessionLocal, async_engine
+from backend.main import app
+from backend.models import Product, User
+from backend.routers import products
+from backend.routers.auth import create_access_token
+from backend.services.ai_classifier import classifier
+from backend.services.bulk_import import parse_csv, spool_body
+from backend.utils.storage import UploadTooLarge
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+async def _collect(rows) -> list:
+    return [row async for row in rows]
+
+def _request(method: str, path: str, **kwargs) -> httpx.Response:
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.request(method, path, **kwargs)
+        await async_engine.dispose()
+        return response
+    return asyncio.run(send())
+
+def test_csv_with_byte_order_mark():
+    body = "\ufeffname,description,price\nLamp,A brass desk lamp,20\n".encode("utf-8")
+
+    rows = asyncio.run(_collect(parse_csv(_chunks(body[:2], body[2:]))))
+
+    assert rows == [(1, {"name": "Lamp", "description": "A brass desk lamp", "price": "20"})]
+
+def test_spool_stops_past_the_limit():
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_body(_chunks(b"x" * 60, b"x" * 60), max_size=100))
+
+def test_oversized_import_is_refused(migrated_database, monkeypatch):
+    monkeypatch.setattr(products, "BULK_IMPORT_MAX_BYTES", 100)
+    body = b'{"name": "Lamp", "description": "A brass desk lamp", "price": 20}\n' * 3
+
+    assert _request("POST", "/api/products/bulk", content=body).status_code == 413
+
+@pytest.fixture
+def seller(migrated_database):
+    db = SessionLocal()
+    seller = User(id=str(uuid.uuid4()), pgp_key="key", is_seller=True)
+    db.add(seller)
+    db.add_all([
+        Product(id=str(uuid.uuid4()), name=status, description="A brass desk lamp", price=10.0,
+                commission=0.25, seller_id=seller.id, status=status)
+        for status in ("published", "pending", "rejected")
+    ])
+    db.commit()
+    try:
+        yield seller.id
+    finally:
+        db.query(Product).filter(Product.seller_id == seller.id).delete()
+        db.delete(seller)
+        db.commit()
+        db.close()
+
+def _export(seller_id: str, token=None) -> httpx.Response:
+    params = {"seller_id": seller_id, **({"token": token} if token else {})}
+    return _request("GET", "/api/products/export", params=params)
+
+def _token(user_id: str) -> str:
+    return create_access_token({"sub": user_id, "is_seller": True}, timedelta(minutes=5))
+
+def test_export_without_token_is_published_only(seller):
+    response = _export(seller)
+
+    assert response.status_code == 200
+    assert [json.loads(line)["name"] for line in response.text.splitlines()] == ["published"]
+
+def test_export_with_own_token_includes_unpublished(seller):
+    response = _export(seller, _token(seller))
+
+    assert sorted(json.loads(line)["name"] for line in response.text.splitlines()) == ["pending", "published", "rejected"]
+
+def test_export_with_another_sellers_token_is_refused(seller):
+    assert _export(seller, _token(str(uuid.uuid4()))).status_code in (401, 403)
+
+@pytest.fixture
+def placeholder_seller(migrated_database):
+    # The import route still writes this id; PostgreSQL enforces the foreign key
+    db = SessionLocal()
+    db.merge(User(id="temp_seller", pgp_key="placeholder", is_seller=True))
+    db.commit()
+    try:
+        yield "temp_seller"
+    finally:
+        db.query(Product).filter(Product.seller_id == "temp_seller").delete()
+        db.commit()
+        db.close()
+
+def test_import_classifies_through_the_batcher(placeholder_seller, monkeypatch):
+    batches = []
+
+    def classify(descriptions):
+        batches.append(list(descriptions))
+        return [{"category": "lamps", "confidence": 0.9, "flags": [], "is_safe": True} for _ in descriptions]
+
+    monkeypatch.setattr(classifier.batcher, "handler", classify)
+    body = b"".join(
+        json.dumps({"name": f"Lamp {i}", "description": f"A brass desk lamp, number {i}", "price": 20}).encode() + b"\n"
+        for i in range(3)
+    )
+
+    lines = [json.loads(line) for line in _request("POST", "/api/products/bulk", content=body).text.splitlines()]
+
+    assert [(line["moderation"], line["category"]) for line in lines[:3]] == [("published", "lamps")] * 3
+    # One model batch for the three rows, not one call each
+    assert batches == [[f"A brass desk lamp, number {i}" for i in range(3)]]
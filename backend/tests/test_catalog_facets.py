@@ -0,0 +1,136 @@
+import asyncio
+import uuid
+from collections import Counter
+import pytest
+from sqlalchemy import func, select
+from backend.config import AsyncSessionLocal, SessionLocal, async_engine
+from backend.models import Product, ProductFacetCount
+from backend.services import catalog_facets
+from backend.services.catalog_facets import (
+    PRICE_BUCKETS,
+    facet_count_updates,
+    facet_key,
+    facet_summary,
+    facet_updates,
+    price_bucket,
+    rebuild_facets
+)
+
+@pytest.fixture
+def db(migrated_database):
+    session = SessionLocal()
+    session.query(Product).delete()
+    session.query(ProductFacetCount).delete()
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.query(Product).delete()
+        session.query(ProductFacetCount).delete()
+        session.commit()
+        session.close()
+
+@pytest.fixture(params=["upsert", "generic"])
+def increments(request, monkeypatch):
+    """Run with the dialect's upsert and with the generic UPDATE + INSERT path"""
+    if request.param == "generic":
+        original = catalog_facets._increment
+        monkeypatch.setattr(catalog_facets, "_increment", lambda dialect_name, key, delta: original("generic", key, delta))
+    return request.param
+
+def _counted(db) -> dict:
+    return {
+        (category, bucket): count
+        for category, bucket, count in db.execute(
+            select(ProductFacetCount.category, ProductFacetCount.price_bucket, ProductFacetCount.product_count)
+        )
+        if count
+    }
+
+def _expected(db) -> dict:
+    """The facet counts recomputed with a GROUP BY over products"""
+    rows = db.execute(
+        select(func.coalesce(Product.category, ""), Product.price, func.count())
+        .where(Product.status == "published")
+        .group_by(func.coalesce(Product.category, ""), Product.price)
+    )
+    expected = Counter()
+    for category, price, count in rows:
+        expected[(category, price_bucket(price))] += count
+    return dict(expected)
+
+def _change(db, product: Product, **values):
+    before = facet_key(product)
+    for name, value in values.items():
+        setattr(product, name, value)
+    for statement in facet_updates(db, before, facet_key(product)):
+        db.execute(statement)
+    db.commit()
+
+def test_price_buckets():
+    assert [price_bucket(price) for price in (0.5, 9.99, 10, 4999, 5000, 10 ** 6)] == [0, 0, 1, 8, 9, 9]
+    assert len(PRICE_BUCKETS) == 10
+
+def test_counts_follow_the_listing_lifecycle(db, increments):
+    created = [
+        Product(id=str(uuid.uuid4()), name=f"Item {index}", price=price, category=category, status="pending")
+        for index, (price, category) in enumerate([(5, "books"), (15, "books"), (15, "books"), (300, "art"), (40, None)])
+    ]
+    db.add_all(created)
+    db.commit()
+    # Pending listings don't count
+    assert _counted(db) == _expected(db) == {}
+
+    for product in created:
+        _change(db, product, status="published")
+    assert _counted(db) == _expected(db) == {("books", 0): 1, ("books", 1): 2, ("art", 5): 1, ("", 2): 1}
+
+    _change(db, created[1], status="rejected")
+    _change(db, created[4], category="garden", price=60)
+    assert _counted(db) == _expected(db)
+
+    for product in created[:3]:
+        before = facet_key(product)
+        db.delete(product)
+        for statement in facet_updates(db, before, None):
+            db.execute(statement)
+        db.commit()
+    assert _counted(db) == _expected(db) == {("art", 5): 1, ("garden", 3): 1}
+
+def test_bulk_counts_add_up(db, increments):
+    imported = [
+        Product(id=str(uuid.uuid4()), name="Print", price=price, category="art", status=status)
+        for price, status in [(30, "published"), (35, "published"), (30, "rejected"), (900, "published")]
+    ]
+    db.add_all(imported)
+    published = Counter(facet_key(product) for product in imported if facet_key(product) is not None)
+    for statement in facet_count_updates(db, published):
+        db.execute(statement)
+    db.commit()
+
+    assert _counted(db) == _expected(db) == {("art", 2): 2, ("art", 6): 1}
+
+def test_rebuild_and_summary(db):
+    db.add_all([
+        Product(id=str(uuid.uuid4()), name="Mug", price=12, category="home", status="published"),
+        Product(id=str(uuid.uuid4()), name="Lamp", price=80, category="home", status="published"),
+        Product(id=str(uuid.uuid4()), name="Novel", price=8, category="books", status="published"),
+        Product(id=str(uuid.uuid4()), name="Draft", price=8, category="books", status="pending")
+    ])
+    db.commit()
+
+    assert rebuild_facets(db) == 3
+    assert _counted(db) == _expected(db)
+
+    async def summarize():
+        async with AsyncSessionLocal() as session:
+            summary = await facet_summary(session, "home")
+        await async_engine.dispose()
+        return summary
+
+    summary = asyncio.run(summarize())
+    assert summary["total"] == 3
+    assert summary["categories"] == [{"category": "home", "count": 2}, {"category": "books", "count": 1}]
+    assert [bucket["count"] for bucket in summary["price_histogram"]][:5] == [0, 1, 0, 1, 0]
+    assert summary["price_histogram"][-1] == {"min": 5000, "max": None, "count": 0}
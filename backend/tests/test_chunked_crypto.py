@@ -0,0 +1,120 @@
+import asyncio
+import io
+import os
+import struct
+import pytest
+from fastapi import UploadFile
+from backend.utils.chunked_crypto import (
+    HEADER_SIZE,
+    ChunkEncryptor,
+    DecryptionError,
+    decrypt_stream,
+    read_frame
+)
+from backend.utils.storage import UploadTooLarge, iter_decrypted, open_encrypted, read_decrypted, save_encrypted_upload
+
+CHUNK = 64
+
+def _encrypt(data: bytes, feed: int = 7) -> bytes:
+    """Encrypt ``data`` fed to the encryptor ``feed`` bytes at a time"""
+    encryptor = ChunkEncryptor(chunk_size=CHUNK)
+    parts = [encryptor.header]
+    for i in range(0, len(data), feed):
+        parts.append(encryptor.update(data[i:i + feed]))
+    parts.append(encryptor.finalize())
+    return b"".join(parts)
+
+def _decrypt(blob: bytes) -> bytes:
+    return b"".join(decrypt_stream(io.BytesIO(blob)))
+
+def _frames(blob: bytes) -> tuple:
+    f = io.BytesIO(blob)
+    header = f.read(HEADER_SIZE)
+    frames = []
+    while (frame := read_frame(f)) is not None:
+        frames.append(frame)
+    return header, frames
+
+def _join(header: bytes, frames: list) -> bytes:
+    return header + b"".join(struct.pack(">I", len(frame)) + frame for frame in frames)
+
+@pytest.mark.parametrize("size, frames", [(0, 1), (1, 1), (CHUNK, 1), (CHUNK + 1, 2), (3 * CHUNK, 3), (3 * CHUNK + 1, 4)])
+def test_round_trip_across_chunk_boundaries(size, frames):
+    data = os.urandom(size)
+    blob = _encrypt(data)
+
+    assert _decrypt(blob) == data
+    assert len(_frames(blob)[1]) == frames
+
+def test_flipped_ciphertext_bit_is_detected():
+    blob = bytearray(_encrypt(os.urandom(3 * CHUNK)))
+    # Inside the second frame's ciphertext
+    blob[HEADER_SIZE + (4 + CHUNK + 16) + 10] ^= 1
+
+    with pytest.raises(DecryptionError):
+        _decrypt(bytes(blob))
+
+@pytest.mark.parametrize("offset", [5, 9, 15], ids=["chunk_size", "nonce_prefix", "nonce_prefix_end"])
+def test_tampered_header_is_detected(offset):
+    blob = bytearray(_encrypt(os.urandom(2 * CHUNK)))
+    blob[offset] ^= 1
+
+    with pytest.raises(DecryptionError):
+        _decrypt(bytes(blob))
+
+def test_dropped_final_chunk_is_detected():
+    header, frames = _frames(_encrypt(os.urandom(3 * CHUNK + 5)))
+
+    with pytest.raises(DecryptionError):
+        _decrypt(_join(header, frames[:-1]))
+
+def test_reordered_chunks_are_detected():
+    header, frames = _frames(_encrypt(os.urandom(3 * CHUNK + 5)))
+    frames[0], frames[1] = frames[1], frames[0]
+
+    with pytest.raises(DecryptionError):
+        _decrypt(_join(header, frames))
+
+def test_chunks_cannot_be_spliced_between_files():
+    data = os.urandom(2 * CHUNK + 5)
+    header, frames = _frames(_encrypt(data))
+    _, other_frames = _frames(_encrypt(data))
+
+    with pytest.raises(DecryptionError):
+        _decrypt(_join(header, [other_frames[0]] + frames[1:]))
+
+def test_truncated_frame_is_detected():
+    blob = _encrypt(os.urandom(2 * CHUNK))
+
+    with pytest.raises(DecryptionError):
+        _decrypt(blob[:-3])
+
+def test_file_without_frames_is_rejected():
+    with pytest.raises(DecryptionError):
+        _decrypt(ChunkEncryptor(chunk_size=CHUNK).header)
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="image.jpg")
+
+def test_upload_round_trips_with_ranges(tmp_path):
+    data = os.urandom(200 * 1024 + 3)
+    path = str(tmp_path / "image.enc")
+
+    async def run():
+        assert await save_encrypted_upload(_upload(data), path, max_size=len(data)) == len(data)
+        encrypted = await open_encrypted(path)
+        assert encrypted.plaintext_size == len(data)
+        assert await read_decrypted(encrypted) == data
+        # A range spanning a chunk boundary only decrypts the chunks it touches
+        start, end = encrypted.decryptor.chunk_size - 10, encrypted.decryptor.chunk_size + 10
+        return b"".join([chunk async for chunk in iter_decrypted(encrypted, start, end)]), start, end
+
+    ranged, start, end = asyncio.run(run())
+    assert ranged == data[start:end + 1]
+
+def test_oversized_upload_is_refused_and_leaves_no_file(tmp_path):
+    path = str(tmp_path / "image.enc")
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(save_encrypted_upload(_upload(os.urandom(1001)), path, max_size=1000))
+    assert os.listdir(tmp_path) == []
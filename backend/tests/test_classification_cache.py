@@ -0,0 +1,128 @@
+import pytest
+from backend.services.ai_classifier import classifier
+from backend.services import classification_cache
+from backend.services.classification_cache import CACHE_LOOKUPS, ClassificationCache
+from backend.services.model_registry import ModelRegistry
+from backend.utils.metrics import metrics
+
+DESCRIPTION = "Hand-thrown ceramic mug, glazed in deep blue, dishwasher safe."
+
+class FakeTextClassifier:
+    def __init__(self, label: str, score: float):
+        self.label = label
+        self.score = score
+
+    def __call__(self, descriptions, **kwargs):
+        return [{"label": self.label, "score": self.score} for _ in descriptions]
+
+def _unavailable():
+    raise RuntimeError("model download failed")
+
+@pytest.fixture
+def isolated_classifier(monkeypatch):
+    """The global classifier with its own registry and an empty in-memory cache"""
+    registry = ModelRegistry()
+    monkeypatch.setattr(classifier, "registry", registry)
+    monkeypatch.setattr(classifier, "cache", ClassificationCache(model_ids=["test"]))
+    return registry
+
+def test_results_without_a_model_are_not_cached(isolated_classifier):
+    isolated_classifier.register("category", _unavailable)
+    isolated_classifier.register("moderation", lambda: FakeTextClassifier("LABEL_0", 0.99))
+    isolated_classifier.register("content_chain", _unavailable)
+
+    result = classifier.classify_batch([DESCRIPTION])[0]
+
+    assert result["category"] == "unknown"
+    assert classifier.cache.get(DESCRIPTION) is None
+
+def test_unescalated_results_are_cached_without_the_generative_model(isolated_classifier):
+    isolated_classifier.register("category", lambda: FakeTextClassifier("home", 0.8))
+    isolated_classifier.register("moderation", lambda: FakeTextClassifier("LABEL_0", 0.99))
+    # Confident moderation never escalates, so the chain isn't needed
+    isolated_classifier.register("content_chain", _unavailable)
+
+    result = classifier.classify_batch([DESCRIPTION])[0]
+
+    assert result == {"category": "home", "confidence": 0.8, "flags": [], "is_safe": True}
+    assert classifier.cache.get(DESCRIPTION) == result
+
+def test_escalated_results_need_the_generative_model(isolated_classifier):
+    isolated_classifier.register("category", lambda: FakeTextClassifier("home", 0.8))
+    isolated_classifier.register("moderation", lambda: FakeTextClassifier("LABEL_0", 0.5))
+    isolated_classifier.register("content_chain", _unavailable)
+
+    classifier.classify_batch([DESCRIPTION])
+
+    assert classifier.cache.get(DESCRIPTION) is None
+
+SAFE = {"category": "home", "confidence": 0.8, "flags": [], "is_safe": True}
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time() as seen by the cache, moved forward by hand"""
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(classification_cache.time, "time", lambda: now[0])
+    return now
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ClassificationCache(model_ids=["test"], max_entries=2)
+    cache.set("first", SAFE)
+    cache.set("second", SAFE)
+    cache.get("first")
+    cache.set("third", SAFE)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == cache.get("third") == SAFE
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ClassificationCache(model_ids=["test"], ttl_seconds=60)
+    cache.set(DESCRIPTION, SAFE)
+
+    clock[0] += 60
+    assert cache.get(DESCRIPTION) == SAFE
+    clock[0] += 1
+    assert cache.get(DESCRIPTION) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_restarted_cache_reads_through_the_persistent_tier(tmp_path):
+    path = str(tmp_path / "classifications.sqlite3")
+    ClassificationCache(model_ids=["test"], persist_path=path).set(DESCRIPTION, SAFE)
+
+    restarted = ClassificationCache(model_ids=["test"], persist_path=path)
+    # Normalized: whitespace and case don't matter
+    assert restarted.get("  " + DESCRIPTION.upper()) == SAFE
+    assert restarted.get(DESCRIPTION) == SAFE
+    assert (restarted.stats()["disk_hits"], restarted.stats()["hits"]) == (1, 1)
+
+def test_expired_persistent_entries_are_not_served(tmp_path, clock):
+    path = str(tmp_path / "classifications.sqlite3")
+    ClassificationCache(model_ids=["test"], ttl_seconds=60, persist_path=path).set(DESCRIPTION, SAFE)
+
+    clock[0] += 61
+    assert ClassificationCache(model_ids=["test"], ttl_seconds=60, persist_path=path).get(DESCRIPTION) is None
+
+def test_changing_a_model_invalidates_cached_results(tmp_path):
+    path = str(tmp_path / "classifications.sqlite3")
+    old = ClassificationCache(model_ids=["distilbert", "roberta"], persist_path=path)
+    old.set(DESCRIPTION, SAFE)
+
+    new = ClassificationCache(model_ids=["distilbert", "roberta-v2"], persist_path=path)
+
+    assert new.model_version != old.model_version
+    assert new.get(DESCRIPTION) is None
+    # The old model's rows were dropped when the new cache opened the file
+    assert ClassificationCache(model_ids=["distilbert", "roberta"], persist_path=path).get(DESCRIPTION) is None
+
+def test_lookups_are_exported_as_metrics():
+    cache = ClassificationCache(model_ids=["test"])
+    cache.set(DESCRIPTION, SAFE)
+    before = dict(CACHE_LOOKUPS._values)
+
+    cache.get(DESCRIPTION)
+    cache.get("never classified")
+
+    assert CACHE_LOOKUPS._values[("hit",)] == before.get(("hit",), 0) + 1
+    assert CACHE_LOOKUPS._values[("miss",)] == before.get(("miss",), 0) + 1
+    assert 'zuno_classification_cache_lookups_total{result="hit"}' in metrics.render()
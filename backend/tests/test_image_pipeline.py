@@ -0,0 +1,70 @@
+import asyncio
+import io
+import os
+import httpx
+import pytest
+from PIL import Image
+from backend.benchmarks.seed import sample_jpeg
+from backend.config import SessionLocal, UPLOAD_DIR, async_engine
+from backend.main import app
+from backend.models import ModerationJob, Product, User
+from backend.services.image_pipeline import ImagePipeline, _read_plaintext, _write_encrypted, image_pipeline
+
+def _image_size(file_name: str) -> int:
+    with Image.open(io.BytesIO(_read_plaintext(os.path.join(UPLOAD_DIR, file_name)))) as image:
+        return max(image.size)
+
+def test_pool_processes_use_the_parents_key(tmp_path, monkeypatch):
+    # Spawned children see this environment: without the key they'd make up their own
+    monkeypatch.delenv("ENCRYPTION_KEY")
+    source = str(tmp_path / "upload.jpg")
+    _write_encrypted(source, sample_jpeg(320))
+    pipeline = ImagePipeline(1)
+    try:
+        paths = asyncio.run(pipeline.render(source, "key-test"))
+    finally:
+        pipeline.shutdown()
+
+    assert _image_size(paths["thumbnail"]) == 160
+    for file_name in paths.values():
+        os.remove(os.path.join(UPLOAD_DIR, file_name))
+
+@pytest.fixture
+def placeholder_seller(migrated_database):
+    # create_product still writes this id (see the route); PostgreSQL enforces the foreign key
+    db = SessionLocal()
+    try:
+        db.merge(User(id="temp_seller", pgp_key="placeholder", is_seller=True))
+        db.commit()
+    finally:
+        db.close()
+
+def test_create_responds_before_the_render(placeholder_seller):
+    async def create() -> dict:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post(
+                "/api/products/",
+                data={"name": "Lamp", "description": "A brass desk lamp", "price": "20"},
+                files={"image": ("lamp.jpg", sample_jpeg(320), "image/jpeg")}
+            )
+            assert response.status_code == 200
+            # The ASGI call is over, the derivatives are still rendering
+            assert image_pipeline._tasks
+            await asyncio.gather(*image_pipeline._tasks)
+        await async_engine.dispose()
+        return response.json()
+
+    try:
+        product_id = asyncio.run(create())["id"]
+    finally:
+        image_pipeline.shutdown()
+
+    db = SessionLocal()
+    try:
+        product = db.get(Product, product_id)
+        assert _image_size(product.thumbnail_path) == 160
+        db.query(ModerationJob).delete()
+        db.delete(product)
+        db.commit()
+    finally:
+        db.close()
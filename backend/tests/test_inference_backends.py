@@ -0,0 +1,24 @@
+import pytest
+from backend.services import ai_classifier, inference_backends
+from backend.services.ai_classifier import classifier
+from backend.services.inference_backends import effective_backend
+
+@pytest.mark.parametrize("available, expected", [(True, "onnx"), (False, "quantized")])
+def test_onnx_falls_back_to_quantized_without_onnx_runtime(monkeypatch, available, expected):
+    monkeypatch.setattr(inference_backends, "_onnx_available", lambda: available)
+
+    assert effective_backend("onnx") == expected
+    assert effective_backend("torch") == "torch"
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        effective_backend("tensorrt")
+
+def test_cache_key_names_the_backend_that_runs(monkeypatch):
+    monkeypatch.setattr(ai_classifier, "AI_INFERENCE_BACKEND", "onnx")
+    monkeypatch.setattr(inference_backends, "_onnx_available", lambda: False)
+    fallback = classifier.model_ids()
+    monkeypatch.setattr(ai_classifier, "AI_INFERENCE_BACKEND", "quantized")
+
+    assert "onnx" not in fallback
+    assert fallback == classifier.model_ids()
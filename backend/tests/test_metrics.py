@@ -0,0 +1,72 @@
+import asyncio
+import httpx
+from sqlalchemy import text
+from backend.config import async_engine, engine
+from backend.main import app
+from backend.utils.metrics import DB_QUERY_SECONDS, HTTP_REQUESTS, MetricsRegistry
+
+def _series(histogram, *labels) -> int:
+    """Observations recorded in one histogram series"""
+    counts = histogram._series.get(labels)
+    return sum(counts[0]) if counts else 0
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_seconds", "Test latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "/a")
+
+    lines = registry.render().splitlines()
+    assert lines == [
+        "# HELP test_seconds Test latency",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="/a",le="0.1"} 2',
+        'test_seconds_bucket{route="/a",le="1"} 3',
+        'test_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_seconds_sum{route="/a"} 3.65',
+        'test_seconds_count{route="/a"} 4'
+    ]
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("test_total", "Test", ["value"]).inc('say "hi"\\\nbye')
+
+    assert 'test_total{value="say \\"hi\\"\\\\\\nbye"} 1' in registry.render()
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    first = registry.counter("test_total", "Test")
+    first.inc(amount=2)
+
+    assert registry.counter("test_total", "Test") is first
+    assert "test_total 2" in registry.render()
+    gauge = registry.gauge("test_live", "Read at scrape time", ["pool"], function=lambda: {("a",): 3})
+    assert gauge.samples() == ['test_live{pool="a"} 3']
+
+def test_requests_are_labelled_by_route_template(migrated_database):
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            missing = await client.get("/api/products/no-such-product")
+            unmatched = await client.get("/no/such/path")
+            scraped = await client.get("/metrics")
+        await async_engine.dispose()
+        return missing, unmatched, scraped
+
+    before = dict(HTTP_REQUESTS._values)
+    missing, unmatched, scraped = asyncio.run(send())
+
+    assert (missing.status_code, unmatched.status_code, scraped.status_code) == (404, 404, 200)
+    for labels in [("GET", "/api/products/{product_id}", "404"), ("GET", "<unmatched>", "404")]:
+        assert HTTP_REQUESTS._values[labels] == before.get(labels, 0) + 1
+    # Never the raw path, so label cardinality stays bounded
+    assert "/no/such/path" not in scraped.text
+    assert 'zuno_http_requests_total{method="GET",route="<unmatched>",status="404"}' in scraped.text
+    assert 'zuno_http_request_duration_seconds_bucket{method="GET",route="/api/products/{product_id}",le="+Inf"}' in scraped.text
+
+def test_engine_statements_are_timed(migrated_database):
+    before = _series(DB_QUERY_SECONDS, "sync", "SELECT")
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("select 2"))
+
+    assert _series(DB_QUERY_SECONDS, "sync", "SELECT") == before + 2
@@ -0,0 +1,96 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from backend.config import MODERATION_JOB_TIMEOUT, MODERATION_MAX_ATTEMPTS, SessionLocal
+from backend.models import ModerationJob, Product
+from backend.services import moderation_queue
+from backend.services.ai_classifier import classifier
+
+SAFE = {"category": "home", "confidence": 0.9, "flags": [], "is_safe": True}
+
+@pytest.fixture
+def db(migrated_database):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.query(ModerationJob).delete()
+        session.query(Product).delete()
+        session.commit()
+        session.close()
+
+@pytest.fixture(autouse=True)
+def stub_classifier(monkeypatch):
+    monkeypatch.setattr(classifier, "classify_batch", lambda descriptions: [dict(SAFE) for _ in descriptions])
+
+def _pending_product(db) -> Product:
+    product = Product(id=str(uuid.uuid4()), name="Lamp", description="A brass desk lamp", price=20.0)
+    db.add(product)
+    db.commit()
+    return product
+
+def _stuck_job(db, product: Product, attempts: int) -> ModerationJob:
+    job = ModerationJob(
+        id=str(uuid.uuid4()),
+        product_id=product.id,
+        status="running",
+        attempts=attempts,
+        claim_token=str(uuid.uuid4()),
+        started_at=datetime.utcnow() - timedelta(seconds=MODERATION_JOB_TIMEOUT + 60),
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+def test_stuck_job_is_requeued_while_attempts_remain(db):
+    job = _stuck_job(db, _pending_product(db), attempts=1)
+
+    claimed = moderation_queue.claim_jobs(db, 10)
+
+    assert [j.id for j in claimed] == [job.id]
+    assert claimed[0].attempts == 2
+
+def test_stuck_job_fails_after_max_attempts(db):
+    job = _stuck_job(db, _pending_product(db), attempts=MODERATION_MAX_ATTEMPTS)
+
+    assert moderation_queue.claim_jobs(db, 10) == []
+    db.refresh(job)
+    assert job.status == "failed"
+    assert job.claim_token is None
+    assert "did not finish" in job.last_error
+
+def test_late_result_from_a_reclaimed_job_is_discarded(db):
+    product = _pending_product(db)
+    stale = _stuck_job(db, product, attempts=1)
+    stale_token = stale.claim_token
+
+    # Another worker requeues and claims the job, then the original
+    # worker finishes with its old claim
+    moderation_queue.claim_jobs(db, 10)
+    stale.claim_token = stale_token
+    db.expunge(stale)
+    moderation_queue.process_jobs(db, [stale])
+
+    db.expire_all()
+    job = db.get(ModerationJob, stale.id)
+    assert job.status == "running"
+    assert job.claim_token not in (None, stale_token)
+    assert db.get(Product, product.id).status == "pending"
+
+def test_classifier_exception_is_recorded_on_the_job(db, monkeypatch):
+    def crash(descriptions):
+        raise RuntimeError("CUDA out of memory")
+
+    monkeypatch.setattr(classifier, "classify_batch", crash)
+    product = _pending_product(db)
+    moderation_queue.enqueue_job(db, product.id)
+    db.commit()
+
+    moderation_queue.run_once(db)
+
+    db.expire_all()
+    job = db.query(ModerationJob).filter(ModerationJob.product_id == product.id).one()
+    assert job.status == "queued"
+    assert job.last_error == "Classification failed: CUDA out of memory"
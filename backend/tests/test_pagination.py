@@ -0,0 +1,83 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from backend.config import SessionLocal, async_engine
+from backend.main import app
+from backend.models import Product, User
+from backend.services.response_cache import response_cache, PRODUCTS_TAG
+from backend.utils.pagination import next_cursor
+
+class Client:
+    """
+    Sends requests straight to the app, as benchmarks/api.py does, all on one
+    event loop (pooled async connections are bound to the loop they opened on)
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    def get(self, path: str, params: dict) -> httpx.Response:
+        return self.loop.run_until_complete(self.client.get(path, params=params))
+
+    def close(self):
+        self.loop.run_until_complete(self.client.aclose())
+        self.loop.run_until_complete(async_engine.dispose())
+        self.loop.close()
+
+@pytest.fixture
+def client(migrated_database):
+    client = Client()
+    try:
+        yield client
+    finally:
+        client.close()
+
+@pytest.fixture
+def products(migrated_database):
+    db = SessionLocal()
+    now = datetime.utcnow()
+    seller = User(id=str(uuid.uuid4()), pgp_key="key", is_seller=True)
+    ids = [str(uuid.uuid4()) for _ in range(25)]
+    db.add(seller)
+    db.add_all([
+        Product(id=product_id, name=f"Lamp {i}", description="A brass desk lamp", price=10.0 + i,
+                commission=0.5, seller_id=seller.id, status="published", created_at=now - timedelta(minutes=i))
+        for i, product_id in enumerate(ids)
+    ])
+    db.commit()
+    response_cache.invalidate(PRODUCTS_TAG)
+    try:
+        yield ids
+    finally:
+        db.query(Product).delete()
+        db.delete(seller)
+        db.commit()
+        db.close()
+
+@pytest.mark.parametrize("path", ["/api/products/", f"/api/comments/product/{uuid.uuid4()}"])
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": -1}, {"limit": 101}, {"skip": -1}])
+def test_invalid_page_parameters_are_rejected(client, path, params):
+    assert client.get(path, params=params).status_code == 422
+
+def test_next_cursor_of_empty_page():
+    assert next_cursor([], 10) is None
+
+def test_cursor_pages_match_offset_pages(client, products):
+    by_cursor = []
+    cursor = None
+    while True:
+        response = client.get("/api/products/", params={"limit": 10, **({"cursor": cursor} if cursor else {})})
+        by_cursor.append([product["id"] for product in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    by_offset = [
+        [product["id"] for product in client.get("/api/products/", params={"limit": 10, "skip": skip}).json()]
+        for skip in (0, 10, 20)
+    ]
+    assert by_cursor == by_offset
+    assert [product_id for page in by_cursor for product_id in page] == products
@@ -0,0 +1,33 @@
+import gnupg
+import pytest
+from backend.benchmarks.seed import fake_pgp_key, generate_pgp_keys
+from backend.utils.encryption import Encryption
+
+@pytest.fixture(scope="module")
+def home(tmp_path_factory) -> str:
+    return str(tmp_path_factory.mktemp("gpg"))
+
+@pytest.fixture(scope="module")
+def key(home):
+    (pgp_key, fingerprint), = generate_pgp_keys(1, home).items()
+    return pgp_key, fingerprint
+
+def test_fingerprint_is_gpgs(key):
+    pgp_key, fingerprint = key
+
+    assert Encryption().pgp_fingerprint(pgp_key) == fingerprint
+
+def test_fingerprint_survives_a_new_subkey(key, home):
+    pgp_key, fingerprint = key
+    # The key has no passphrase; keep gpg from asking for one
+    gpg = gnupg.GPG(gnupghome=home, options=["--pinentry-mode", "loopback", "--passphrase", ""])
+    assert gpg.add_subkey(fingerprint, algorithm="rsa1024", usage="encrypt").fingerprint
+    reexported = gpg.export_keys(fingerprint)
+
+    assert reexported != pgp_key
+    assert Encryption().pgp_fingerprint(reexported) == fingerprint
+
+def test_rejected_key_has_no_fingerprint():
+    import random
+
+    assert Encryption().pgp_fingerprint(fake_pgp_key(random.Random(0))) is None
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import uuid
+import httpx
+import pytest
+from backend.config import SessionLocal, UPLOAD_DIR, async_engine
+from backend.main import app
+from backend.models import Product, User
+from backend.services.image_cache import DecryptedBlobCache, image_cache
+from backend.services.image_pipeline import _write_encrypted
+
+# Spans several 64KB chunks, so streamed ranges cross chunk boundaries
+IMAGE = os.urandom(150 * 1024 + 7)
+SIZE = len(IMAGE)
+
+@pytest.fixture(scope="module")
+def product_id(migrated_database):
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    db = SessionLocal()
+    seller = User(id=str(uuid.uuid4()), pgp_key="key", is_seller=True)
+    product = Product(
+        id=str(uuid.uuid4()), name="Lamp", description="A brass desk lamp", price=10.0,
+        commission=0.25, seller_id=seller.id, status="published", image_path=f"{uuid.uuid4()}.jpg"
+    )
+    _write_encrypted(os.path.join(UPLOAD_DIR, product.image_path), IMAGE)
+    db.add_all([seller, product])
+    db.commit()
+    try:
+        yield product.id
+    finally:
+        os.remove(os.path.join(UPLOAD_DIR, product.image_path))
+        db.delete(product)
+        db.delete(seller)
+        db.commit()
+        db.close()
+
+@pytest.fixture(params=["cached", "streamed"])
+def image(request, product_id, monkeypatch):
+    """GET the image, served from the decrypted-blob cache or streamed by chunk"""
+    monkeypatch.setattr(image_cache, "max_item_bytes", SIZE if request.param == "cached" else 0)
+
+    def get(**headers) -> httpx.Response:
+        async def send():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.get(f"/api/products/{product_id}/image", headers=headers)
+            await async_engine.dispose()
+            return response
+        return asyncio.run(send())
+    return get
+
+def test_whole_image(image):
+    response = image()
+
+    assert response.status_code == 200
+    assert response.content == IMAGE
+    assert response.headers["accept-ranges"] == "bytes"
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=10-19", 10, 19),
+    ("bytes=65530-65545", 65530, 65545),
+    (f"bytes=100-{SIZE + 1000}", 100, SIZE - 1),
+    ("bytes=150000-", 150000, SIZE - 1),
+    ("bytes=-5", SIZE - 5, SIZE - 1),
+    (f"bytes=-{SIZE + 10}", 0, SIZE - 1),
+])
+def test_range_is_partial_content(image, header, start, end):
+    response = image(range=header)
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{SIZE}"
+    assert response.headers["content-length"] == str(end - start + 1)
+    assert response.content == IMAGE[start:end + 1]
+
+@pytest.mark.parametrize("header", [f"bytes={SIZE}-", f"bytes={SIZE + 5}-{SIZE + 10}", "bytes=-0"])
+def test_unsatisfiable_range(image, header):
+    response = image(range=header)
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{SIZE}"
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-9", "bytes=5-3", "items=0-5", "bytes=a-b", "bytes=-", "bytes=--5"])
+def test_multiple_or_invalid_ranges_get_the_whole_image(image, header):
+    response = image(range=header)
+
+    assert response.status_code == 200
+    assert response.content == IMAGE
+
+def test_matching_etag_is_not_modified(image):
+    etag = image().headers["etag"]
+
+    response = image(**{"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert image(**{"if-none-match": '"something-else"'}).status_code == 200
+
+def test_if_range_gates_the_range_on_the_etag(image):
+    etag = image().headers["etag"]
+
+    assert image(range="bytes=0-9", **{"if-range": etag}).status_code == 206
+    stale = image(range="bytes=0-9", **{"if-range": '"an-older-version"'})
+    assert stale.status_code == 200
+    assert stale.content == IMAGE
+
+def test_small_images_are_decrypted_once(image, monkeypatch):
+    monkeypatch.setattr(image_cache, "max_item_bytes", SIZE)
+    image()
+    hits = image_cache.hits
+
+    image(range="bytes=0-9")
+    assert image_cache.hits == hits + 1
+
+def test_blob_cache_evicts_least_recently_used_by_bytes():
+    cache = DecryptedBlobCache(max_bytes=10, max_item_bytes=6)
+    cache.put("a", "1", b"aaaa")
+    cache.put("b", "1", b"bbbb")
+    cache.get("a", "1")
+    cache.put("c", "1", b"cccc")
+    cache.put("d", "1", b"d" * 7)
+
+    assert cache.get("b", "1") is None
+    assert cache.get("a", "1") == b"aaaa"
+    # Keyed by etag: a replaced file is a miss
+    assert cache.get("a", "2") is None
+    # Too large to cache at all
+    assert cache.get("d", "1") is None
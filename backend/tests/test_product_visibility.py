@@ -0,0 +1,82 @@
+import asyncio
+import os
+import uuid
+from datetime import timedelta
+import httpx
+import pytest
+from backend.config import SessionLocal, UPLOAD_DIR, async_engine
+from backend.main import app
+from backend.models import Product, User
+from backend.routers.auth import create_access_token
+from backend.services.image_pipeline import _write_encrypted
+
+IMAGE = b"\xff\xd8not really a jpeg\xff\xd9"
+
+def _get(path: str, **params) -> httpx.Response:
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(path, params=params)
+        await async_engine.dispose()
+        return response
+    return asyncio.run(send())
+
+def _token(user_id: str) -> str:
+    return create_access_token({"sub": user_id, "is_seller": True}, timedelta(minutes=5))
+
+@pytest.fixture
+def listings(migrated_database):
+    """A seller with one listing in each moderation status, all with an image"""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    db = SessionLocal()
+    seller = User(id=str(uuid.uuid4()), pgp_key="key", is_seller=True)
+    db.add(seller)
+    products = {}
+    for status in ("published", "pending", "rejected"):
+        image_path = f"{uuid.uuid4()}.jpg"
+        _write_encrypted(os.path.join(UPLOAD_DIR, image_path), IMAGE)
+        products[status] = Product(
+            id=str(uuid.uuid4()), name=status, description="A brass desk lamp", price=10.0,
+            commission=0.25, seller_id=seller.id, status=status, image_path=image_path
+        )
+    db.add_all(products.values())
+    db.commit()
+    try:
+        yield seller.id, {status: product.id for status, product in products.items()}
+    finally:
+        for product in products.values():
+            os.remove(os.path.join(UPLOAD_DIR, product.image_path))
+            db.delete(product)
+        db.delete(seller)
+        db.commit()
+        db.close()
+
+@pytest.mark.parametrize("status", ["pending", "rejected"])
+def test_unpublished_listing_is_hidden_from_the_public(listings, status):
+    _, products = listings
+
+    assert _get(f"/api/products/{products[status]}").status_code == 404
+    assert _get(f"/api/products/{products[status]}/image").status_code == 404
+
+@pytest.mark.parametrize("status", ["pending", "rejected"])
+def test_unpublished_listing_is_hidden_from_other_users(listings, status):
+    _, products = listings
+    token = _token(str(uuid.uuid4()))
+
+    assert _get(f"/api/products/{products[status]}", token=token).status_code == 404
+    assert _get(f"/api/products/{products[status]}/image", token=token).status_code == 404
+
+@pytest.mark.parametrize("status", ["pending", "rejected"])
+def test_seller_sees_their_unpublished_listing(listings, status):
+    seller_id, products = listings
+    token = _token(seller_id)
+
+    response = _get(f"/api/products/{products[status]}", token=token)
+    assert response.status_code == 200
+    assert response.json()["name"] == status
+    assert _get(f"/api/products/{products[status]}/image", token=token).content == IMAGE
+
+def test_published_listing_is_public(listings):
+    _, products = listings
+
+    assert _get(f"/api/products/{products['published']}").status_code == 200
+    assert _get(f"/api/products/{products['published']}/image").content == IMAGE
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+import httpx
+import pytest
+from fastapi import FastAPI
+from backend.config import async_engine
+from backend.main import app as main_app
+from backend.routers import admin, auth
+from backend.routers.auth import create_access_token
+from backend.services.profiler import ProfilerManager, ProfilerMiddleware, SamplingProfiler
+
+def _token(user_id: str) -> str:
+    return create_access_token({"sub": user_id, "is_seller": False}, timedelta(minutes=5))
+
+@pytest.fixture
+def profiled(monkeypatch):
+    """An app with the admin routes and profiler middleware, on a fresh manager"""
+    manager = ProfilerManager(max_seconds=5, max_results=5)
+    monkeypatch.setattr(admin, "profiler_manager", manager)
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", {"admin"})
+    # Principals come from the token, so no users need to exist
+    monkeypatch.setattr(auth, "AUTH_TRUST_TOKEN_CLAIMS", True)
+
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/admin")
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.3)
+        return {}
+
+    @app.get("/fast")
+    async def fast():
+        return {}
+
+    app.add_middleware(ProfilerMiddleware, routes=app.routes, authorize=auth.is_admin_token, manager=manager)
+    yield app, manager
+    manager.stop()
+    if manager.current is not None:
+        manager.current.stop(wait=True)
+
+def _send(app, *requests):
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [await client.request(method, url, **kwargs) for method, url, kwargs in requests]
+    return asyncio.run(send())
+
+def _wait_finished(profiler: SamplingProfiler, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while profiler.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not profiler.running
+
+def test_admin_routes_require_an_admin(profiled):
+    app, manager = profiled
+    responses = _send(
+        app,
+        ("GET", "/api/admin/profiles", {"params": {"token": "not-a-token"}}),
+        ("GET", "/api/admin/profiles", {"params": {"token": _token("someone")}}),
+        ("POST", "/api/admin/profiles", {"params": {"token": _token("someone")}, "json": {}}),
+        ("GET", "/api/admin/profiles", {"params": {"token": _token("admin")}})
+    )
+
+    assert [response.status_code for response in responses] == [401, 403, 403, 200]
+    assert manager.current is None
+
+def test_one_profile_at_a_time(profiled):
+    app, manager = profiled
+    token = _token("admin")
+    started, busy, header_busy = _send(
+        app,
+        ("POST", "/api/admin/profiles", {"params": {"token": token}, "json": {"seconds": 5}}),
+        ("POST", "/api/admin/profiles", {"params": {"token": token}, "json": {"seconds": 5}}),
+        ("GET", "/fast", {"headers": {"X-Profile": "wall", "X-Profile-Token": token}})
+    )
+
+    assert started.status_code == 200 and started.json()["running"]
+    assert busy.status_code == 409
+    assert header_busy.status_code == 200
+    assert header_busy.headers["X-Profile-Status"] == "busy"
+    assert "X-Profile-Id" not in header_busy.headers
+
+    running = _send(app, ("GET", f"/api/admin/profiles/{started.json()['id']}", {"params": {"token": token}}))[0]
+    assert running.status_code == 409
+    stopped = _send(app, ("POST", "/api/admin/profiles/stop", {"params": {"token": token}}))[0]
+    assert stopped.json()["id"] == started.json()["id"]
+    _wait_finished(manager.current)
+    # Once it has finished another one may start
+    assert _send(app, ("POST", "/api/admin/profiles", {"params": {"token": token}, "json": {"seconds": 0.1}}))[0].status_code == 200
+
+def test_route_filter_only_samples_while_the_route_is_served(profiled):
+    app, manager = profiled
+    profiler = manager.start("wall", 5, route="/slow")
+
+    _send(app, ("GET", "/fast", {}))
+    time.sleep(0.1)
+    assert profiler.samples == 0
+
+    _send(app, ("GET", "/slow", {}))
+    assert profiler.samples > 0
+    assert manager.route_in_flight == 0
+    profiler.stop(wait=True)
+
+def spin(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_profiles_download_as_collapsed_stacks(profiled):
+    app, manager = profiled
+    token = _token("admin")
+    stop = threading.Event()
+    spinner = threading.Thread(target=spin, args=(stop,), name="spinner", daemon=True)
+    spinner.start()
+    try:
+        profiler = manager.start("wall", 0.2)
+        _wait_finished(profiler)
+    finally:
+        stop.set()
+        spinner.join()
+
+    downloaded = _send(app, ("GET", f"/api/admin/profiles/{profiler.id}", {"params": {"token": token}}))[0]
+    assert downloaded.status_code == 200
+    assert f'filename="profile-{profiler.id}.collapsed"' in downloaded.headers["Content-Disposition"]
+
+    lines = downloaded.text.splitlines()
+    assert lines
+    for line in lines:
+        stack, _, count = line.rpartition(" ")
+        assert stack and int(count) > 0
+    # Thread name first, then frames "function (dir/file:line)" from the
+    # outermost in; the spinner may be sampled inside Event.is_set
+    spinning = [line for line in lines if line.startswith("spinner;")]
+    assert spinning
+    for line in spinning:
+        frames = line.rpartition(" ")[0].split(";")
+        position = next(index for index, frame in enumerate(frames) if frame.startswith("spin (tests/test_profiler.py:"))
+        assert frames[position - 1].startswith("Thread.run (")
+    assert sum(int(line.rpartition(" ")[2]) for line in spinning) <= profiler.samples
+
+def test_single_request_profiles_need_an_admin_token(profiled):
+    app, manager = profiled
+    anonymous, profiled_request, invalid = _send(
+        app,
+        ("GET", "/fast", {"headers": {"X-Profile": "wall"}}),
+        ("GET", "/slow", {"headers": {"X-Profile": "wall", "X-Profile-Token": _token("admin")}}),
+        ("GET", "/fast", {"headers": {"X-Profile": "flame", "X-Profile-Token": _token("admin")}})
+    )
+
+    assert anonymous.headers["X-Profile-Status"] == "unauthorized"
+    assert profiled_request.headers["X-Profile-Status"] == "started"
+    profiler = manager.get(profiled_request.headers["X-Profile-Id"])
+    assert profiler.route == "/slow"
+    _wait_finished(profiler)
+    assert profiler.samples > 0
+    assert invalid.headers["X-Profile-Status"] == "invalid-mode"
+
+def test_app_is_unchanged_with_the_profiler_disabled(migrated_database):
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main_app), base_url="http://test") as client:
+            responses = [
+                await client.get("/api/admin/profiles", params={"token": _token("admin")}),
+                await client.get("/health", headers={"X-Profile": "wall", "X-Profile-Token": _token("admin")})
+            ]
+        await async_engine.dispose()
+        return responses
+
+    admin_routes, health = asyncio.run(send())
+    assert admin_routes.status_code == 404
+    assert health.status_code == 200
+    assert "X-Profile-Status" not in health.headers
+    assert not any(middleware.cls is ProfilerMiddleware for middleware in main_app.user_middleware)
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import httpx
+import pytest
+from backend.config import async_engine
+from backend.main import app
+from backend.services.response_cache import MemoryStore, response_cache
+
+class FailingStore(MemoryStore):
+    """A shared store that is down"""
+
+    blocking = True
+
+    def get(self, key):
+        raise ConnectionError("store is down")
+
+    def set(self, key, value, ttl):
+        raise ConnectionError("store is down")
+
+    def versions(self, tags):
+        raise ConnectionError("store is down")
+
+    def bump(self, tags):
+        raise ConnectionError("store is down")
+
+class RecordingStore(MemoryStore):
+    """A blocking store that records the threads it is called on"""
+
+    blocking = True
+
+    def __init__(self):
+        super().__init__(100)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def versions(self, tags):
+        self.threads.add(threading.get_ident())
+        return super().versions(tags)
+
+    def bump(self, tags):
+        self.threads.add(threading.get_ident())
+        super().bump(tags)
+
+def _list_products(times: int = 1) -> list:
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = [await client.get("/api/products/") for _ in range(times)]
+        await async_engine.dispose()
+        return responses
+    return asyncio.run(send())
+
+@pytest.fixture
+def store(monkeypatch):
+    def use(store):
+        monkeypatch.setattr(response_cache, "store", store)
+        monkeypatch.setattr(response_cache, "enabled", True)
+        return store
+    return use
+
+def test_failing_store_falls_through_to_render(migrated_database, store):
+    store(FailingStore(100))
+    errors = response_cache.errors
+
+    assert [response.status_code for response in _list_products(2)] == [200, 200]
+    # One failed lookup per request; without a key nothing is stored
+    assert response_cache.errors == errors + 2
+
+    response_cache.invalidate("products")
+    asyncio.run(response_cache.ainvalidate("products"))
+    assert response_cache.errors == errors + 4
+
+def test_blocking_store_runs_off_the_event_loop(migrated_database, store):
+    recording = store(RecordingStore())
+    loop_threads = set()
+
+    async def send():
+        loop_threads.add(threading.get_ident())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/products/", params={"limit": 3})
+        await async_engine.dispose()
+        return response
+
+    assert asyncio.run(send()).status_code == 200
+    assert recording.threads and not recording.threads & loop_threads
+
+def test_async_invalidation_runs_off_the_event_loop(store):
+    recording = store(RecordingStore())
+    invalidations = response_cache.invalidations
+
+    async def invalidate():
+        await response_cache.ainvalidate("products")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(invalidate())
+    assert recording.threads and loop_thread not in recording.threads
+    assert recording.versions(("products",)) == [1]
+    assert response_cache.invalidations == invalidations + 1
@@ -0,0 +1,56 @@
+import uuid
+import pytest
+from backend.config import SessionLocal
+from backend.models import Product, Review, User
+from backend.services.review_stats import reconcile_review_stats
+
+@pytest.fixture
+def db(migrated_database):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.query(Review).delete()
+        session.query(Product).delete()
+        session.query(User).delete()
+        session.commit()
+        session.close()
+
+def _product(db, ratings, **stored) -> Product:
+    user = User(id=str(uuid.uuid4()), pgp_key="key")
+    product = Product(id=str(uuid.uuid4()), name="Lamp", price=20.0, **stored)
+    db.add_all([user, product])
+    db.add_all([
+        Review(id=str(uuid.uuid4()), user_id=user.id, product_id=product.id, rating=rating)
+        for rating in ratings
+    ])
+    db.commit()
+    return product
+
+def test_drifted_stats_are_recomputed(db):
+    drifted = _product(db, [5, 4, 4, 0], review_count=1, rating_sum=5, rating_average=5.0, rating_5_count=1)
+    correct = _product(db, [2], review_count=1, rating_sum=2, rating_average=2.0, rating_2_count=1)
+    emptied = _product(db, [], review_count=2, rating_sum=6, rating_average=3.0, rating_3_count=2)
+
+    assert reconcile_review_stats(db, batch_size=2) == 2
+
+    for product in (drifted, correct, emptied):
+        db.refresh(product)
+    # The out-of-range rating isn't counted
+    assert (drifted.review_count, drifted.rating_sum, drifted.rating_average) == (3, 13, 13 / 3)
+    assert drifted.rating_histogram == {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1}
+    assert (correct.review_count, correct.rating_sum) == (1, 2)
+    assert (emptied.review_count, emptied.rating_sum, emptied.rating_average) == (0, 0, 0.0)
+    assert emptied.rating_histogram["3"] == 0
+
+    assert reconcile_review_stats(db) == 0
+
+def test_stale_average_is_recomputed(db):
+    stale = _product(db, [5, 4], review_count=2, rating_sum=9, rating_average=2.0, rating_4_count=1, rating_5_count=1)
+
+    assert reconcile_review_stats(db) == 1
+
+    db.refresh(stale)
+    assert (stale.review_count, stale.rating_sum, stale.rating_average) == (2, 9, 4.5)
+    assert reconcile_review_stats(db) == 0
@@ -0,0 +1,107 @@
+import asyncio
+import uuid
+from datetime import datetime
+import pytest
+from backend.config import AsyncSessionLocal, SessionLocal, async_engine
+from backend.models import ModerationJob, Product
+from backend.services.search_index import InvertedIndex, MemorySearchBackend, tokenize
+
+def test_tokenize_drops_stopwords_and_single_characters():
+    assert tokenize("The Brass LAMP, with a 2-way switch & café shade") == ["brass", "lamp", "way", "switch", "café", "shade"]
+    assert tokenize(None) == tokenize("") == []
+
+def _ids(results):
+    return [doc_id for doc_id, _ in results]
+
+def test_name_matches_outrank_description_matches():
+    index = InvertedIndex()
+    index.add("described", "Desk light", "A brass lamp for reading", None)
+    index.add("named", "Brass lamp", "For the reading desk", None)
+    index.add("categorised", "Reading light", "For the desk", "lamp")
+
+    assert _ids(index.search("lamp", 10)) == ["named", "categorised", "described"]
+
+def test_rare_terms_weigh_more_than_common_ones():
+    index = InvertedIndex()
+    for i in range(10):
+        index.add(f"common-{i}", "Lamp", "A brass desk lamp", None)
+    index.add("rare", "Lamp", "A copper desk lamp", None)
+
+    assert _ids(index.search("copper lamp", 1)) == ["rare"]
+
+def test_shorter_listings_rank_higher_for_the_same_matches():
+    index = InvertedIndex()
+    index.add("long", "Lamp", "brass " + "filler words here " * 20, None)
+    index.add("short", "Lamp", "brass", None)
+
+    results = index.search("brass", 10)
+    assert _ids(results) == ["short", "long"]
+    assert results[0][1] > results[1][1]
+
+def test_limit_and_unknown_terms():
+    index = InvertedIndex()
+    for i in range(5):
+        index.add(str(i), "Lamp", None, None)
+
+    assert len(index.search("lamp", 3)) == 3
+    assert index.search("sofa", 3) == []
+    assert index.search("the a", 3) == []
+
+def test_removed_listings_are_not_found_and_their_slots_are_reused():
+    index = InvertedIndex()
+    index.add("lamp", "Brass lamp", None, None)
+    index.add("sofa", "Velvet sofa", None, None)
+
+    index.remove("lamp")
+    index.remove("never-indexed")
+    assert index.search("lamp brass", 10) == []
+    assert index.stats() == {"documents": 1, "terms": 2}
+
+    index.add("chair", "Oak chair", None, None)
+    assert len(index._doc_ids) == 2
+    assert _ids(index.search("oak", 10)) == ["chair"]
+
+def test_adding_again_replaces_the_listing():
+    index = InvertedIndex()
+    index.add("p", "Brass lamp", None, None)
+    index.add("p", "Velvet sofa", None, None)
+
+    assert index.search("lamp", 10) == []
+    assert _ids(index.search("sofa", 10)) == ["p"]
+    assert len(index) == 1
+
+@pytest.fixture
+def db(migrated_database):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.query(ModerationJob).delete()
+        session.query(Product).delete()
+        session.commit()
+        session.close()
+
+def test_category_set_by_moderation_becomes_searchable(db):
+    backend = MemorySearchBackend(refresh_seconds=0)
+    product = Product(id=str(uuid.uuid4()), name="Brass fixture", description="Wall mounted", price=20.0)
+    db.add(product)
+    db.commit()
+    # Indexed at create time, before the moderation worker has run
+    backend.add(product)
+
+    async def search():
+        async with AsyncSessionLocal() as session:
+            found = await backend.search(session, "lighting", 10)
+        await async_engine.dispose()
+        return [p.id for p in found]
+
+    assert asyncio.run(search()) == []
+
+    # What the moderation worker does, in its own process
+    product.category = "lighting"
+    product.status = "published"
+    db.add(ModerationJob(id=str(uuid.uuid4()), product_id=product.id, status="succeeded", finished_at=datetime.utcnow()))
+    db.commit()
+
+    assert asyncio.run(search()) == [product.id]
+    assert backend.stats()["refreshed"] == 1
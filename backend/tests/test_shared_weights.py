@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from backend.services.shared_weights import export_shared_model, measure_workers
+
+WORKERS = 2
+
+@pytest.fixture(scope="module")
+def local_model(tmp_path_factory) -> str:
+    """A randomly initialised DistilBERT classifier with ~110MB of weights, saved locally"""
+    directory = tmp_path_factory.mktemp("model")
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "brand", "new", "headphones"]
+    (directory / "vocab.txt").write_text("\n".join(vocab) + "\n")
+    transformers.DistilBertTokenizerFast(str(directory / "vocab.txt")).save_pretrained(directory)
+    config = transformers.DistilBertConfig(vocab_size=len(vocab), dim=768, hidden_dim=3072, n_layers=4, n_heads=12)
+    model = transformers.DistilBertForSequenceClassification(config)
+    model.save_pretrained(directory)
+    weights = sum(parameter.numel() * parameter.element_size() for parameter in model.parameters())
+    return str(directory), weights
+
+def test_shared_weights_are_not_unique_to_each_worker(local_model, monkeypatch):
+    model_path, weights = local_model
+    # Spawned workers read their settings from the environment
+    monkeypatch.setenv("AI_MODEL_PATH", model_path)
+    monkeypatch.setenv("AI_INFERENCE_BACKEND", "torch")
+    # Export up front, as a deployment would: the worker that exports keeps
+    # the loaded model's freed heap, which would blur its unique memory
+    export_shared_model(model_path, "text-classification")
+
+    shared = measure_workers(WORKERS, True, ["category"])
+    private = measure_workers(WORKERS, False, ["category"])
+
+    models = shared["model_status"]["models"]
+    assert models["category"]["state"] == "ready"
+    # Only the requested model is loaded; nothing escalates to GPT-2
+    assert models["moderation"]["state"] == models["content_chain"]["state"] == "not_loaded"
+
+    weights_mb = weights / 1024 / 1024
+    for shared_worker, private_worker in zip(shared["per_worker_mb"], private["per_worker_mb"]):
+        # Each private worker holds its own copy; shared ones map one copy
+        assert private_worker["uss"] - shared_worker["uss"] > 0.8 * weights_mb
@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A worker should be serving non-classifying routes within about a second
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3"))
+HEAVY_MODULES = ("torch", "transformers", "langchain", "optimum", "onnxruntime")
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import backend.main
+seconds = time.perf_counter() - start
+from backend.utils.encryption import encryption
+print(json.dumps({{
+    "seconds": seconds,
+    "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+    "gpg_homes": len(encryption.gpg_pool._homes)
+}}))
+"""
+
+def _import_main() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_import_main_loads_no_models():
+    assert _import_main()["loaded"] == []
+
+def test_import_main_starts_no_gpg():
+    assert _import_main()["gpg_homes"] == 0
+
+def test_import_main_within_budget():
+    # The first run also compiles bytecode; worker restarts don't pay that
+    _import_main()
+    assert _import_main()["seconds"] < IMPORT_BUDGET_SECONDS
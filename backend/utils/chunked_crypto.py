@@ -0,0 +1,157 @@
+import os
+import struct
+from typing import BinaryIO, Iterator, Optional
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from ..config import ENCRYPTION_KEY
+
+# File layout:
+#   header  = MAGIC (4) | plaintext chunk size, u32 BE (4) | random nonce prefix (8)
+#   frame_i = ciphertext length, u32 BE (4) | AES-256-GCM(chunk_i) incl. 16-byte tag
+#
+# Chunk i is sealed with nonce = prefix | i (u32 BE) and the associated data
+# header | i | final-flag, so frames cannot be reordered, spliced between
+# files or silently truncated. Every frame but the last holds exactly
+# chunk_size plaintext bytes, which lets readers seek to any chunk.
+MAGIC = b"ZNC1"
+HEADER_SIZE = 16
+TAG_SIZE = 16
+LENGTH_SIZE = 4
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+class DecryptionError(Exception):
+    pass
+
+def _derive_key(secret: str) -> bytes:
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"zuno-chunked-file-v1"
+    ).derive(secret.encode() if isinstance(secret, str) else secret)
+
+_file_key = _derive_key(ENCRYPTION_KEY)
+
+def set_file_key(secret: str):
+    """
+    Derive the default file key from ``secret`` instead of the configured
+    ENCRYPTION_KEY (for pool processes, which must use their parent's key)
+    """
+    global _file_key
+    _file_key = _derive_key(secret)
+
+def _nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + struct.pack(">I", index)
+
+def _aad(header: bytes, index: int, final: bool) -> bytes:
+    return header + struct.pack(">IB", index, 1 if final else 0)
+
+def is_chunked_file(prefix: bytes) -> bool:
+    return prefix[:4] == MAGIC
+
+class ChunkEncryptor:
+    """
+    Incremental encryptor: feed plaintext with ``update`` and write out the
+    returned bytes, then write ``finalize()``. Holds at most one chunk.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, key: Optional[bytes] = None):
+        self.chunk_size = chunk_size
+        self._aead = AESGCM(key or _file_key)
+        self._prefix = os.urandom(8)
+        self.header = MAGIC + struct.pack(">I", chunk_size) + self._prefix
+        self._buffer = bytearray()
+        self._index = 0
+
+    def _seal(self, chunk: bytes, final: bool) -> bytes:
+        ciphertext = self._aead.encrypt(
+            _nonce(self._prefix, self._index),
+            chunk,
+            _aad(self.header, self._index, final)
+        )
+        self._index += 1
+        return struct.pack(">I", len(ciphertext)) + ciphertext
+
+    def update(self, data: bytes) -> bytes:
+        self._buffer.extend(data)
+        frames = []
+        # Keep the last full chunk back: it may turn out to be the final one
+        while len(self._buffer) > self.chunk_size:
+            frames.append(self._seal(bytes(self._buffer[:self.chunk_size]), final=False))
+            del self._buffer[:self.chunk_size]
+        return b"".join(frames)
+
+    def finalize(self) -> bytes:
+        frame = self._seal(bytes(self._buffer), final=True)
+        self._buffer.clear()
+        return frame
+
+class ChunkDecryptor:
+    """
+    Random-access decryptor for one chunked file, given its header
+    """
+
+    def __init__(self, header: bytes, key: Optional[bytes] = None):
+        if len(header) != HEADER_SIZE or not is_chunked_file(header):
+            raise DecryptionError("Not a chunked encrypted file")
+        self.header = header
+        self.chunk_size = struct.unpack(">I", header[4:8])[0]
+        self._prefix = header[8:16]
+        self._aead = AESGCM(key or _file_key)
+
+    @property
+    def frame_size(self) -> int:
+        """On-disk size of every full (non-final) frame"""
+        return LENGTH_SIZE + self.chunk_size + TAG_SIZE
+
+    def frame_offset(self, index: int) -> int:
+        return HEADER_SIZE + index * self.frame_size
+
+    def chunk_count(self, file_size: int) -> int:
+        body = file_size - HEADER_SIZE
+        return max(1, -(-body // self.frame_size))
+
+    def plaintext_size(self, file_size: int) -> int:
+        """Plaintext length implied by the encrypted file size"""
+        count = self.chunk_count(file_size)
+        last_frame = file_size - self.frame_offset(count - 1)
+        return (count - 1) * self.chunk_size + last_frame - LENGTH_SIZE - TAG_SIZE
+
+    def open_frame(self, frame: bytes, index: int, final: bool) -> bytes:
+        try:
+            return self._aead.decrypt(
+                _nonce(self._prefix, index),
+                frame,
+                _aad(self.header, index, final)
+            )
+        except InvalidTag:
+            raise DecryptionError(f"Chunk {index} failed authentication")
+
+def read_frame(f: BinaryIO) -> Optional[bytes]:
+    length = f.read(LENGTH_SIZE)
+    if not length:
+        return None
+    if len(length) != LENGTH_SIZE:
+        raise DecryptionError("Truncated frame header")
+    size = struct.unpack(">I", length)[0]
+    frame = f.read(size)
+    if len(frame) != size:
+        raise DecryptionError("Truncated frame")
+    return frame
+
+def decrypt_stream(f: BinaryIO) -> Iterator[bytes]:
+    """
+    Yield plaintext chunks from a chunked file opened in binary mode
+    """
+    decryptor = ChunkDecryptor(f.read(HEADER_SIZE))
+    index = 0
+    frame = read_frame(f)
+    while frame is not None:
+        following = read_frame(f)
+        yield decryptor.open_frame(frame, index, final=following is None)
+        frame = following
+        index += 1
+    if index == 0:
+        raise DecryptionError("Missing final chunk")
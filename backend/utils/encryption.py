@@ -7,21 +7,47 @@ import base64
 import os
 from nacl.public import PrivateKey, PublicKey, Box
 from nacl.secret import SecretBox
-from typing import Tuple, Optional
-import gnupg
-from ..config import ENCRYPTION_KEY
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional
+import asyncio
+import threading
+from ..config import (
+    ENCRYPTION_KEY,
+    PGP_KEY_CACHE_SIZE,
+    PGP_HOME_DIR,
+    PGP_POOL_SIZE,
+    PGP_MAX_KEYS_PER_ENGINE
+)
+from .metrics import metrics, timed, SPAN_BUCKETS
+from .pgp import key_digest
+from .pgp_pool import GPGPool
+
+ENCRYPTION_SECONDS = metrics.histogram(
+    "zuno_encryption_duration_seconds",
+    "Time spent in Encryption operations",
+    ["operation"],
+    buckets=SPAN_BUCKETS
+)
 
 class Encryption:
     def __init__(self):
         # Initialize Fernet for symmetric encryption
         self.fernet = Fernet(ENCRYPTION_KEY.encode() if isinstance(ENCRYPTION_KEY, str) else ENCRYPTION_KEY)
         
-        # Initialize GPG for PGP operations
-        self.gpg = gnupg.GPG(gnupghome=os.path.join(os.getcwd(), 'gpghome'))
-        
-        # Ensure GPG home directory exists
-        os.makedirs(self.gpg.gnupghome, exist_ok=True)
+        # Initialize a bounded pool of GPG engines for PGP operations
+        self.gpg_pool = GPGPool(
+            PGP_HOME_DIR,
+            size=PGP_POOL_SIZE,
+            max_keys=PGP_MAX_KEYS_PER_ENGINE
+        )
+        self._pgp_executor: Optional[ThreadPoolExecutor] = None
+
+        # Key digest -> OpenPGP fingerprint of keys gpg has accepted (bounded LRU)
+        self._fingerprints: "OrderedDict[str, str]" = OrderedDict()
+        self._fingerprints_lock = threading.Lock()
 
+    @timed(ENCRYPTION_SECONDS, "encrypt_file")
     def encrypt_file(self, file_data: bytes) -> Tuple[bytes, str]:
         """
         Encrypts file data using Fernet (symmetric encryption)
@@ -40,6 +66,7 @@ class Encryption:
         except Exception as e:
             raise Exception(f"File encryption failed: {str(e)}")
 
+    @timed(ENCRYPTION_SECONDS, "decrypt_file")
     def decrypt_file(self, encrypted_data: bytes, file_key: str) -> bytes:
         """
         Decrypts file data using the provided key
@@ -50,22 +77,24 @@ class Encryption:
         except Exception as e:
             raise Exception(f"File decryption failed: {str(e)}")
 
+    @timed(ENCRYPTION_SECONDS, "encrypt_message")
     def encrypt_message(self, message: str, recipient_pgp_key: str) -> str:
         """
         Encrypts a message using recipient's PGP public key
         """
         try:
-            # Import recipient's public key
-            import_result = self.gpg.import_keys(recipient_pgp_key)
-            if not import_result.fingerprints:
-                raise ValueError("Invalid PGP key")
-            
-            # Encrypt the message
-            encrypted_data = self.gpg.encrypt(
-                message,
-                import_result.fingerprints[0],
-                always_trust=True
-            )
+            with self.gpg_pool.acquire() as engine:
+                # Import recipient's public key (no-op if the keyring has it)
+                recipient = engine.import_key(recipient_pgp_key)
+                if recipient is None:
+                    raise ValueError("Invalid PGP key")
+
+                # Encrypt the message
+                encrypted_data = engine.gpg.encrypt(
+                    message,
+                    recipient,
+                    always_trust=True
+                )
             
             if not encrypted_data.ok:
                 raise Exception(f"Encryption failed: {encrypted_data.status}")
@@ -74,15 +103,65 @@ class Encryption:
         except Exception as e:
             raise Exception(f"Message encryption failed: {str(e)}")
 
-    def verify_pgp_key(self, pgp_key: str) -> bool:
+    @timed(ENCRYPTION_SECONDS, "encrypt_messages")
+    def encrypt_messages(self, message: str, recipient_pgp_keys: List[str]) -> List[str]:
         """
-        Verifies if a PGP key is valid
+        Encrypts one message for many recipients, using every engine in the pool
+        """
+        if self._pgp_executor is None:
+            self._pgp_executor = ThreadPoolExecutor(
+                max_workers=self.gpg_pool.size,
+                thread_name_prefix="pgp"
+            )
+        return list(self._pgp_executor.map(
+            lambda key: self.encrypt_message(message, key),
+            recipient_pgp_keys
+        ))
+
+    async def encrypt_message_batch(self, message: str, recipient_pgp_keys: List[str]) -> List[str]:
+        """
+        Async variant of encrypt_messages that keeps gpg off the event loop
         """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            self.encrypt_messages,
+            message,
+            recipient_pgp_keys
+        )
+
+    @timed(ENCRYPTION_SECONDS, "pgp_fingerprint")
+    def pgp_fingerprint(self, pgp_key: str) -> Optional[str]:
+        """
+        The OpenPGP fingerprint of a public key as gpg reports it on import,
+        or None if gpg rejects the key. Fingerprints are remembered by the
+        digest of the key text, so a repeated key costs no gpg subprocess.
+        """
+        digest = key_digest(pgp_key)
+        with self._fingerprints_lock:
+            fingerprint = self._fingerprints.get(digest)
+            if fingerprint is not None:
+                self._fingerprints.move_to_end(digest)
+                return fingerprint
+
         try:
-            import_result = self.gpg.import_keys(pgp_key)
-            return bool(import_result.fingerprints)
+            with self.gpg_pool.acquire() as engine:
+                fingerprint = engine.import_key(pgp_key)
         except Exception:
-            return False
+            return None
+
+        if fingerprint is not None:
+            with self._fingerprints_lock:
+                self._fingerprints[digest] = fingerprint
+                while len(self._fingerprints) > PGP_KEY_CACHE_SIZE:
+                    self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    def verify_pgp_key(self, pgp_key: str) -> bool:
+        """
+        Verifies if a PGP key is valid
+        """
+        return self.pgp_fingerprint(pgp_key) is not None
 
     def generate_file_key(self) -> str:
         """
@@ -97,24 +176,19 @@ encryption = Encryption()
 def encrypt_file_data(file_data: bytes) -> Tuple[bytes, str]:
     return encryption.encrypt_file(file_data)
 
-def decryptNext, let's create the encryption utility file to handle AES-256 encryption and decryption of files:
-
-<create_file>
-<path>backend/utils/encryption.py</path>
-<content>from cryptography.fernet import Fernet
-from backend.config import ENCRYPTION_KEY
-
-# Initialize Fernet cipher
-cipher = Fernet(ENCRYPTION_KEY.encode())
+def decrypt_file_data(encrypted_data: bytes, file_key: str) -> bytes:
+    return encryption.decrypt_file(encrypted_data, file_key)
 
+@timed(ENCRYPTION_SECONDS, "encrypt_data")
 def encrypt_data(data: bytes) -> bytes:
     """
     Encrypt data using Fernet symmetric encryption.
     """
-    return cipher.encrypt(data)
+    return encryption.fernet.encrypt(data)
 
+@timed(ENCRYPTION_SECONDS, "decrypt_data")
 def decrypt_data(token: bytes) -> bytes:
     """
     Decrypt data using Fernet symmetric encryption.
     """
-    return cipher.decrypt(token)
+    return encryption.fernet.decrypt(token)
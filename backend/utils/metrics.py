@@ -0,0 +1,344 @@
+import asyncio
+import bisect
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from ..config import METRICS_ENABLED
+
+# Request latency buckets in seconds; spans inside a request use the finer ones
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SPAN_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, or, with ``function``, is read at scrape
+    time (``function`` returns {label values: value})
+    """
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+    ):
+        super().__init__(name, help_text, label_names)
+        self.function = function
+
+    def dec(self, *label_values: str, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values: str, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+    def samples(self) -> List[str]:
+        if self.function is not None:
+            with self._lock:
+                self._values = dict(self.function())
+        return super().samples()
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets. ``observe`` only increments one
+    bucket; the cumulative counts are summed at scrape time.
+    """
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for edge, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(edge)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics rendered in the Prometheus text format.
+    Registering a name twice returns the existing metric.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = (), function=None) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names, function))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+# Create a global instance
+metrics = MetricsRegistry(enabled=METRICS_ENABLED)
+
+@contextmanager
+def span(histogram: Histogram, *label_values: str):
+    """
+    Time the enclosed block into ``histogram``
+    """
+    if not metrics.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, *label_values)
+
+def timed(histogram: Histogram, *label_values: str):
+    """
+    Decorator form of ``span`` for plain and async functions
+    """
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if not metrics.enabled:
+                    return await function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start, *label_values)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, *label_values)
+        return wrapper
+    return decorator
+
+HTTP_REQUESTS = metrics.counter(
+    "zuno_http_requests_total",
+    "HTTP requests by route template and status",
+    ["method", "route", "status"]
+)
+HTTP_LATENCY = metrics.histogram(
+    "zuno_http_request_duration_seconds",
+    "Time until the response was fully sent",
+    ["method", "route"]
+)
+HTTP_IN_FLIGHT = metrics.gauge(
+    "zuno_http_requests_in_flight",
+    "Requests being handled",
+    ["method", "route"]
+)
+
+def route_template(routes: List, scope) -> str:
+    """
+    Path template of the route that will handle ``scope``, or "<unmatched>"
+    """
+    from starlette.routing import Match
+
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "<unmatched>"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status and in-flight
+    counts. Routes are labelled by their path template (``/api/products/{product_id}``)
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app, routes: List):
+        self.app = app
+        # The application's route list, which later include_router calls extend
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.routes, scope)
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method, route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_LATENCY.observe(time.perf_counter() - start, method, route)
+            HTTP_IN_FLIGHT.dec(method, route)
+            HTTP_REQUESTS.inc(method, route, status)
+
+DB_QUERY_SECONDS = metrics.histogram(
+    "zuno_db_query_duration_seconds",
+    "SQL statement execution time by engine and statement type",
+    ["engine", "operation"],
+    buckets=SPAN_BUCKETS
+)
+DB_POOL_CHECKOUT_SECONDS = metrics.histogram(
+    "zuno_db_pool_checkout_seconds",
+    "Time spent waiting for a pooled connection (including connect and pre-ping)",
+    ["engine"],
+    buckets=SPAN_BUCKETS
+)
+
+_SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK", "CREATE", "ALTER", "DROP"}
+_pools: Dict[str, object] = {}
+
+def _checked_out() -> Dict[Tuple[str, ...], float]:
+    return {
+        (name,): pool.checkedout()
+        for name, pool in _pools.items()
+        if hasattr(pool, "checkedout")
+    }
+
+DB_POOL_CHECKED_OUT = metrics.gauge(
+    "zuno_db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["engine"],
+    function=_checked_out
+)
+
+def instrument_engine(engine, name: str):
+    """
+    Time every statement on a (sync) Engine and the pool checkouts feeding
+    it. For an AsyncEngine pass ``async_engine.sync_engine``.
+    """
+    from sqlalchemy import event
+
+    if not metrics.enabled:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        DB_QUERY_SECONDS.observe(
+            time.perf_counter() - started,
+            name,
+            operation if operation in _SQL_OPERATIONS else "OTHER"
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None:
+            started = context.connection.info.get("query_started")
+            if started:
+                started.pop()
+
+    # The pool has no "before checkout" event, so time Engine.raw_connection's
+    # call into it. A dispose() replaces the pool; instrument the new one again.
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start, name)
+
+    pool.connect = timed_connect
+    _pools[name] = pool
@@ -0,0 +1,74 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+
+def encode_cursor(sort_value: Any, row_id: str) -> str:
+    """
+    Encode the (sort value, id) of the last row on a page as an opaque cursor
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_type: type = datetime) -> Tuple[Any, str]:
+    """
+    Decode a cursor produced by encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if sort_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        else:
+            sort_value = sort_type(sort_value)
+        return sort_value, str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(
+    query: Select,
+    sort_column: Any,
+    id_column: Any,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = None,
+    descending: bool = True
+) -> Select:
+    """
+    Apply a stable ordering on (sort_column, id), newest/largest first unless
+    ``descending`` is False, and either seek past ``cursor`` (keyset mode) or
+    fall back to OFFSET ``skip``.
+
+    One extra row is fetched so callers can tell whether another page exists.
+    """
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, sort_column.type.python_type)
+        if descending:
+            query = query.where(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+        else:
+            query = query.where(tuple_(sort_column, id_column) > tuple_(sort_value, row_id))
+    elif skip:
+        query = query.offset(skip)
+
+    return query.limit(limit + 1)
+
+def next_cursor(rows: list, limit: int, sort_attribute: str = "created_at") -> Optional[str]:
+    """
+    Trim the extra look-ahead row and return the cursor for the next page
+    """
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    if not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, sort_attribute), last.id)
@@ -0,0 +1,29 @@
+import base64
+import hashlib
+
+def normalize_pgp_key(pgp_key: str) -> bytes:
+    """
+    Return the decoded body of an ASCII-armored key, ignoring armor headers,
+    line wrapping and the CRC line. Non-armored input falls back to its
+    whitespace-collapsed text.
+    """
+    body = []
+    for line in pgp_key.strip().splitlines():
+        line = line.strip()
+        if not line or line.startswith("-----") or ":" in line:
+            continue
+        if line.startswith("=") and len(line) == 5:
+            continue
+        body.append(line)
+    try:
+        return base64.b64decode("".join(body), validate=True)
+    except Exception:
+        return " ".join(pgp_key.split()).encode()
+
+def key_digest(pgp_key: str) -> str:
+    """
+    Hex SHA-256 of a normalized key. A cheap, fixed-length stand-in for the
+    key text when caching gpg results; it is not the OpenPGP fingerprint
+    (the same key re-exported with other signatures digests differently).
+    """
+    return hashlib.sha256(normalize_pgp_key(pgp_key)).hexdigest()
@@ -0,0 +1,112 @@
+import atexit
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import gnupg
+from .pgp import key_digest
+
+class GPGEngine:
+    """
+    One gpg home directory with a bounded, deduplicated public keyring.
+
+    Keys are tracked by the digest of their text, so importing a key the
+    keyring already holds costs no gpg subprocess. When the keyring grows
+    past ``max_keys`` the least recently used keys are deleted from it.
+    """
+
+    def __init__(self, gnupghome: str, max_keys: int):
+        self.gpg = gnupg.GPG(gnupghome=gnupghome)
+        self.max_keys = max_keys
+        # key digest -> OpenPGP fingerprint
+        self._keys: "OrderedDict[str, str]" = OrderedDict()
+
+    def import_key(self, pgp_key: str) -> Optional[str]:
+        """
+        Make sure a key is in this keyring and return its OpenPGP
+        fingerprint, or None if gpg rejects it
+        """
+        digest = key_digest(pgp_key)
+        fingerprint = self._keys.get(digest)
+        if fingerprint is not None:
+            self._keys.move_to_end(digest)
+            return fingerprint
+
+        import_result = self.gpg.import_keys(pgp_key)
+        if not import_result.fingerprints:
+            return None
+
+        fingerprint = import_result.fingerprints[0]
+        self._keys[digest] = fingerprint
+        if len(self._keys) > self.max_keys:
+            _, evicted = self._keys.popitem(last=False)
+            # Another export of the same key may still be tracked
+            if evicted not in self._keys.values():
+                self.gpg.delete_keys(evicted)
+        return fingerprint
+
+class GPGPool:
+    """
+    Bounded pool of gpg engines, each with a private home directory.
+
+    Engines (each a gpg home directory plus a ``gpg --version`` probe) are
+    created on first use, up to ``size``, so importing the app costs no gpg
+    work. Home directories are created per process under ``home_root`` and
+    removed at exit, so uvicorn workers no longer share (and endlessly grow)
+    a single on-disk keyring.
+    """
+
+    def __init__(self, home_root: str, size: int = 4, max_keys: int = 1000):
+        self.size = max(1, size)
+        self.home_root = home_root
+        self.max_keys = max_keys
+        self._homes = []
+        self._engines: "queue.Queue[GPGEngine]" = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_engine(self) -> GPGEngine:
+        with self._lock:
+            if not self._homes:
+                os.makedirs(self.home_root, exist_ok=True)
+                atexit.register(self.close)
+            home = tempfile.mkdtemp(prefix=f"gpg-{os.getpid()}-{len(self._homes)}-", dir=self.home_root)
+            self._homes.append(home)
+        return GPGEngine(home, self.max_keys)
+
+    @contextmanager
+    def acquire(self) -> Iterator[GPGEngine]:
+        """
+        Borrow an engine for the duration of the block, creating one if all
+        are busy and the pool isn't full yet (waits otherwise)
+        """
+        try:
+            engine = self._engines.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    engine = self._new_engine()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                engine = self._engines.get()
+        try:
+            yield engine
+        finally:
+            self._engines.put(engine)
+
+    def close(self):
+        with self._lock:
+            for home in self._homes:
+                shutil.rmtree(home, ignore_errors=True)
+            self._homes = []
@@ -0,0 +1,155 @@
+import os
+import struct
+import uuid
+from typing import AsyncIterator, Optional
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+from ..config import UPLOAD_CHUNK_SIZE
+from .metrics import metrics, span, timed, SPAN_BUCKETS
+from .chunked_crypto import (
+    ChunkDecryptor,
+    ChunkEncryptor,
+    HEADER_SIZE,
+    LENGTH_SIZE,
+    is_chunked_file
+)
+
+FILE_IO_SECONDS = metrics.histogram(
+    "zuno_file_io_duration_seconds",
+    "Time spent in stored-file operations",
+    ["operation"],
+    buckets=SPAN_BUCKETS
+)
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds the {max_size} byte limit")
+        self.max_size = max_size
+
+@timed(FILE_IO_SECONDS, "save_upload")
+async def save_encrypted_upload(upload: UploadFile, file_path: str, max_size: int) -> int:
+    """
+    Stream an upload to ``file_path`` in the chunked AEAD format.
+
+    The upload is read UPLOAD_CHUNK_SIZE bytes at a time and the size limit is
+    enforced as it arrives. Data goes to a temporary file that is renamed into
+    place only once complete, so readers never see a partial image.
+    Returns the plaintext size.
+    """
+    encryptor = ChunkEncryptor(chunk_size=UPLOAD_CHUNK_SIZE)
+    temp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    size = 0
+
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            await out.write(encryptor.header)
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(max_size)
+                await out.write(encryptor.update(chunk))
+            await out.write(encryptor.finalize())
+            await out.flush()
+            await aiofiles.os.wrap(os.fsync)(out.fileno())
+
+        await aiofiles.os.replace(temp_path, file_path)
+        return size
+    except BaseException:
+        if os.path.exists(temp_path):
+            await aiofiles.os.remove(temp_path)
+        raise
+
+@timed(FILE_IO_SECONDS, "remove")
+async def remove_file(file_path: str):
+    """
+    Delete a stored file if it exists, without blocking the event loop
+    """
+    try:
+        await aiofiles.os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+class EncryptedFile:
+    """
+    Metadata of a stored encrypted file, read from its header and size
+    """
+
+    def __init__(self, file_path: str, file_size: int, decryptor: Optional[ChunkDecryptor]):
+        self.file_path = file_path
+        self.file_size = file_size
+        self.decryptor = decryptor
+
+    @property
+    def chunked(self) -> bool:
+        return self.decryptor is not None
+
+    @property
+    def etag(self) -> str:
+        # The random nonce prefix is unique per stored file, so it makes a
+        # strong validator without hashing the contents
+        if self.decryptor is not None:
+            return f'"{self.decryptor.header[8:16].hex()}-{self.file_size:x}"'
+        return f'"legacy-{self.file_size:x}"'
+
+    @property
+    def plaintext_size(self) -> Optional[int]:
+        if self.decryptor is None:
+            return None
+        return self.decryptor.plaintext_size(self.file_size)
+
+@timed(FILE_IO_SECONDS, "open")
+async def open_encrypted(file_path: str) -> EncryptedFile:
+    """
+    Stat a stored file and parse its header. Files written before the chunked
+    format (single Fernet tokens) are reported with ``chunked == False``.
+    """
+    stat = await aiofiles.os.stat(file_path)
+    async with aiofiles.open(file_path, "rb") as f:
+        header = await f.read(HEADER_SIZE)
+    decryptor = ChunkDecryptor(header) if is_chunked_file(header) else None
+    return EncryptedFile(file_path, stat.st_size, decryptor)
+
+async def iter_decrypted(encrypted: EncryptedFile, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Yield the plaintext bytes ``start``..``end`` (inclusive) of a chunked file,
+    decrypting only the chunks that overlap the range
+    """
+    decryptor = encrypted.decryptor
+    size = encrypted.plaintext_size
+    end = size - 1 if end is None else min(end, size - 1)
+    if size == 0 or start > end:
+        return
+
+    last_chunk = decryptor.chunk_count(encrypted.file_size) - 1
+    first = start // decryptor.chunk_size
+    final = end // decryptor.chunk_size
+
+    async with aiofiles.open(encrypted.file_path, "rb") as f:
+        await f.seek(decryptor.frame_offset(first))
+        for index in range(first, final + 1):
+            with span(FILE_IO_SECONDS, "read_chunk"):
+                length = struct.unpack(">I", await f.read(LENGTH_SIZE))[0]
+                frame = await f.read(length)
+            chunk = decryptor.open_frame(frame, index, final=index == last_chunk)
+
+            chunk_start = index * decryptor.chunk_size
+            lo = max(start - chunk_start, 0)
+            hi = min(end - chunk_start + 1, len(chunk))
+            yield chunk[lo:hi]
+
+@timed(FILE_IO_SECONDS, "read")
+async def read_decrypted(encrypted: EncryptedFile) -> bytes:
+    """
+    Decrypt a whole stored file into memory
+    """
+    if encrypted.chunked:
+        return b"".join([chunk async for chunk in iter_decrypted(encrypted)])
+
+    from .encryption import decrypt_data
+
+    async with aiofiles.open(encrypted.file_path, "rb") as f:
+        return decrypt_data(await f.read())
@@ -13,6 +13,7 @@ interface Product {
   price: number;
   category: string;
   image_path?: string;
+  image_url?: string;
   commission: number;
   created_at: string;
 }
@@ -247,10 +248,10 @@ export default function SellerPage() {
                 {products.map((product) => (
                   <li key={product.id} className="px-4 py-4 sm:px-6">
                     <div className="flex items-center space-x-4">
-                      {product.image_path && (
+                      {product.image_url && (
                         <div className="flex-shrink-0 h-16 w-16 relative">
                           <Image
-                            src={`${process.env.NEXT_PUBLIC_API_URL}/uploads/${product.image_path}`}
+                            src={new URL(product.image_url, process.env.NEXT_PUBLIC_API_URL).toString()}
                             alt={product.name}
                             fill
                             className="object-cover rounded-md"
@@ -39,6 +39,7 @@ export interface Product {
   price: number;
   category?: string;
   image_path?: string;
+  image_url?: string;
   commission: number;
   seller_id: string;
   created_at: string;